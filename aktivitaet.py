@@ -0,0 +1,462 @@
+"""
+Sitzungen starten und beenden - einzeln und als Sammel-Aktion für ganze Trupps
+
+Sammel-Aktion (beide Versionen, POST /aktivitäten):
+    {"aktionen": [{"aktion": "starten", "projekt_id": 7, "mitarbeiter": "Max",
+                   "teilbereich": "aufmass"},
+                  {"aktion": "beenden", "projekt_id": 7, "mitarbeiter": "Eva"}, ...]}
+Alle Einträge laufen in einer Transaktion (bzw. unter einer Journal-Sperre),
+die Antwort enthält je Eintrag einen Status ('gestartet', 'beendet',
+'arbeitet bereits', 'keine aktive Sitzung', ...) in derselben Reihenfolge.
+
+Offline-Warteschlange (static/warteschlange.js, POST /aktivitäten/ereignisse):
+gleiche Einträge plus "schluessel" (UUID des Clients) und "zeit" (Zeitpunkt
+des Tippens). Jeder Schlüssel wird höchstens einmal ausgeführt - ein
+wiederholter Upload bekommt das gespeicherte Ergebnis mit "wiederholt": true.
+Nur hier zählt die Client-Zeit (die Sammel-Aktion bucht immer "jetzt"): nie
+in der Zukunft, ein Stopp nie vor seinem Start, und höchstens
+AKTIVITAET_OFFLINE_STUNDEN (Standard 48) alt - ältere Einträge bekommen
+'zu alt' und werden nicht ausgeführt. Den Wert unter QUITTUNG_TAGE halten,
+sonst könnte ein Schlüssel nach dem Aufräumen ein zweites Mal laufen.
+Alte Quittungen entfernen:  python aktivitaet.py --quittungen-aufraeumen
+
+PostgreSQL (app_db.py) - je Sitzung ein einziges Statement:
+
+Starten: INSERT ... ON CONFLICT DO NOTHING auf dem UNIQUE-Constraint
+(projekt_id, mitarbeiter) statt erst zu prüfen und dann einzufügen. Tippen
+mehrere gleichzeitig auf Start, gewinnt genau ein INSERT; die anderen
+bekommen keine Zeile zurück ("arbeitet bereits"). Auf beendeten Projekten
+fügt es gar nichts ein ("Projekt beendet"). Projekt-Status, erster/letzter
+Start, Zähler und NOTIFY hängen am selben Statement.
+
+Beenden: ein datenverändernder CTE erledigt alles, was beim Stoppen passiert:
+  DELETE aus aktive_sitzungen ... RETURNING  (Dauer in der Datenbank gerechnet)
+  -> INSERT in sitzungen
+  -> Tages-Rollup (sitzungen_tage) fortschreiben
+  -> Projekt-Zähler und Status ('pausiert', wenn niemand mehr arbeitet)
+  -> NOTIFY für Live-Clients und Berichts-Cache
+Ein Round-Trip statt fünf. Drücken zwei Personen gleichzeitig Stopp, wartet
+das zweite DELETE auf die Zeilensperre des ersten, findet die Zeile danach
+nicht mehr und liefert nichts - eine Sitzung wird nie doppelt gebucht.
+
+Zähler und Status: aktive_mitarbeiter allein reicht nicht, ein verrutschter
+Zähler hielte das Projekt für immer 'laufend'. Starten nimmt mindestens die
+Zahl der übrigen aktiven Sitzungen, Beenden höchstens - so korrigiert sich
+ein falscher Zähler beim nächsten Start/Stopp, und 'pausiert' folgt den
+Sitzungen. Der Zähler selbst bleibt nötig: das Statement sieht nur die
+Sitzungen von seinem Beginn, erst die Zeilensperre auf dem Projekt ordnet
+parallele Stopps. Alles auf einmal reparieren: projekt_zaehler.py --abgleichen
+"""
+import os
+import sys
+import json
+import zeit
+from datetime import timedelta
+from berichte import LOKALER_TAG_SQL, ROLLUP_KONFLIKT_SQL
+from berichtcache import KANAL as BERICHTE_KANAL, berichte_geaendert_lokal
+from live import KANAL as LIVE_KANAL
+from projekt_daten import teilbereich_sql
+from projekt_zaehler import beendet_zuweisungen
+from zeit import ISO_UTC_SQL
+
+
+SAMMEL_MAX = int(os.environ.get('AKTIVITAET_SAMMEL_MAX', '50'))
+QUITTUNG_TAGE = int(os.environ.get('AKTIVITAET_QUITTUNG_TAGE', '30'))
+OFFLINE_MAX = timedelta(hours=int(os.environ.get('AKTIVITAET_OFFLINE_STUNDEN', '48')))
+SCHLUESSEL_MAX = 64
+AKTIONEN = ('starten', 'beenden')
+
+
+def aktionen_lesen(roh, mit_schluessel=False):
+    """
+    Liest die Aktionsliste aus dem Request -> (aktionen, ergebnisse).
+    ergebnisse hat einen Platz je Eintrag; ungültige Einträge stehen dort
+    schon drin. ValueError, wenn es keine Liste ist oder zu viele Einträge hat.
+    mit_schluessel - Offline-Warteschlange: jeder Eintrag braucht einen
+    Idempotenz-Schlüssel, "zeit" wird übernommen (sonst ignoriert)
+    """
+    if not isinstance(roh, list) or not roh:
+        raise ValueError('Keine Aktionen übergeben')
+    if len(roh) > SAMMEL_MAX:
+        raise ValueError(f'Höchstens {SAMMEL_MAX} Aktionen auf einmal')
+
+    aktionen, ergebnisse = [], [None] * len(roh)
+    aeltester = zeit.jetzt() - OFFLINE_MAX
+    for nr, eintrag in enumerate(roh):
+        eintrag = eintrag if isinstance(eintrag, dict) else {}
+        aktion = {
+            'nr': nr,
+            'aktion': eintrag.get('aktion'),
+            'projekt_id': eintrag.get('projekt_id'),
+            'mitarbeiter': str(eintrag.get('mitarbeiter') or '').strip(),
+            'teilbereich': str(eintrag.get('teilbereich') or '').strip(),
+            'schluessel': str(eintrag.get('schluessel') or '').strip(),
+            'zeit': None,
+        }
+        gueltig = True
+        try:
+            aktion['projekt_id'] = int(aktion['projekt_id'])
+            if mit_schluessel:
+                aktion['zeit'] = zeit.als_utc(eintrag.get('zeit'))
+        except (TypeError, ValueError, AttributeError):
+            gueltig = False
+        if mit_schluessel and not 0 < len(aktion['schluessel']) <= SCHLUESSEL_MAX:
+            gueltig = False
+
+        if (not gueltig or aktion['aktion'] not in AKTIONEN or not aktion['mitarbeiter']
+                or (aktion['aktion'] == 'starten' and not aktion['teilbereich'])):
+            ergebnisse[nr] = ergebnis(aktion, 'ungültig')
+        elif aktion['zeit'] and aktion['zeit'] < aeltester:
+            ergebnisse[nr] = ergebnis(aktion, 'zu alt')
+        else:
+            aktionen.append(aktion)
+    return aktionen, ergebnisse
+
+
+def ergebnis(aktion, status, sitzung=None):
+    eintrag = {
+        'aktion': aktion['aktion'],
+        'projekt_id': aktion['projekt_id'],
+        'mitarbeiter': aktion['mitarbeiter'],
+        'status': status,
+    }
+    if aktion.get('schluessel'):
+        eintrag['schluessel'] = aktion['schluessel']
+    if sitzung:
+        eintrag['sitzung'] = sitzung
+    return eintrag
+
+
+def _reihenfolge(aktionen):
+    """Nach Projekt sortiert - parallele Sammel-Aktionen sperren in derselben Reihenfolge"""
+    return sorted(aktionen, key=lambda a: (a['projekt_id'], a['nr']))
+
+
+# ---------------------------------------------------------------------------
+# JSON-Dateien (app.py)
+# ---------------------------------------------------------------------------
+
+def aktionen_im_journal(journal, aktionen, ergebnisse, darf_sehen):
+    """
+    Führt die Aktionen unter der Schreibsperre des Journals aus (journal =
+    projekte_journal.schreiben()). Quittungen für Schlüssel liegen am Projekt
+    (journal.py) und werden im selben Journal-Eintrag geschrieben.
+    """
+    for aktion in _reihenfolge(aktionen):
+        projekt_id, mitarbeiter = aktion['projekt_id'], aktion['mitarbeiter']
+        projekt = journal.projekt(projekt_id)
+        aktive = (projekt or {}).get('aktive_sitzungen', {})
+        vorher = (projekt or {}).get('quittungen', {}).get(aktion['schluessel']) if aktion['schluessel'] else None
+        eintrag = None
+        jetzt = zeit.jetzt()
+
+        if vorher:
+            ergebnisse[aktion['nr']] = dict(vorher, wiederholt=True)
+            continue
+
+        if not projekt:
+            status, sitzung = 'nicht gefunden', None
+        elif not darf_sehen(projekt):
+            status, sitzung = 'keine Berechtigung', None
+        elif aktion['aktion'] == 'starten':
+            if projekt.get('status') == 'beendet':
+                status, sitzung = 'Projekt beendet', None
+            elif mitarbeiter in aktive:
+                status, sitzung = 'arbeitet bereits', None
+            else:
+                start = min(aktion['zeit'] or jetzt, jetzt).isoformat()
+                eintrag = {'art': 'start', 'projekt_id': projekt_id, 'mitarbeiter': mitarbeiter,
+                           'teilbereich': aktion['teilbereich'], 'start': start}
+                status = 'gestartet'
+                sitzung = {'projekt_id': projekt_id, 'typ': 'gestartet', 'mitarbeiter': mitarbeiter,
+                           'teilbereich': aktion['teilbereich'], 'start': zeit.iso_utc(start)}
+        elif mitarbeiter not in aktive:
+            status, sitzung = 'keine aktive Sitzung', None
+        else:
+            aktive_sitzung = aktive[mitarbeiter]
+            end_zeit = max(min(aktion['zeit'] or jetzt, jetzt), zeit.als_utc(aktive_sitzung['start']))
+            dauer_minuten = zeit.minuten_zwischen(aktive_sitzung['start'], end_zeit)
+            eintrag = {
+                'art': 'stopp',
+                'projekt_id': projekt_id,
+                'teilbereich': aktive_sitzung['teilbereich'],
+                'sitzung': {'mitarbeiter': mitarbeiter, 'start': aktive_sitzung['start'],
+                            'end': end_zeit.isoformat(), 'dauer_minuten': dauer_minuten},
+            }
+            status = 'beendet'
+            sitzung = {'projekt_id': projekt_id, 'typ': 'beendet', 'mitarbeiter': mitarbeiter,
+                       'teilbereich': aktive_sitzung['teilbereich'],
+                       'start': zeit.iso_utc(aktive_sitzung['start']), 'end': zeit.iso_utc(end_zeit),
+                       'dauer_minuten': dauer_minuten}
+
+        ergebnisse[aktion['nr']] = ergebnis(aktion, status, sitzung)
+        if projekt and aktion['schluessel']:
+            eintrag = eintrag or {'art': 'quittung', 'projekt_id': projekt_id}
+            eintrag['quittung'] = {'schluessel': aktion['schluessel'], 'ergebnis': ergebnisse[aktion['nr']]}
+        if eintrag:
+            journal.anhaengen(eintrag)
+    return ergebnisse
+
+
+# ---------------------------------------------------------------------------
+# PostgreSQL (app_db.py)
+# ---------------------------------------------------------------------------
+
+def _iso(spalte):
+    return ISO_UTC_SQL.format(spalte=spalte)
+
+
+def _tag(spalte):
+    return f"to_char({LOKALER_TAG_SQL.format(spalte=spalte)}, 'YYYY-MM-DD')"
+
+
+# Stopp-Zeitpunkt: Client-Zeit (Offline-Warteschlange) oder jetzt, nie in der Zukunft, nie vor dem Start
+_ENDE_SQL = 'GREATEST(start_zeit, LEAST(COALESCE(%(zeitpunkt)s::timestamptz, now()), now()))'
+
+# Laufende Sitzungen nach dem Stopp: der Zähler (unter der Zeilensperre aktuell)
+# höchstens so hoch wie die Sitzungen, die das Statement noch sieht
+_NOCH_AKTIV_SQL = 'GREATEST(LEAST(p.aktive_mitarbeiter - 1, andere.anzahl), 0)'
+
+SITZUNG_STARTEN_SQL = f'''
+    WITH neu AS (
+        INSERT INTO aktive_sitzungen (projekt_id, mitarbeiter, teilbereich, start_zeit)
+        SELECT id, %(mitarbeiter)s, %(teilbereich)s, LEAST(COALESCE(%(zeitpunkt)s::timestamptz, now()), now())
+        FROM projekte
+        WHERE id = %(projekt_id)s AND status <> 'beendet'
+        ON CONFLICT (projekt_id, mitarbeiter) DO NOTHING
+        RETURNING projekt_id, mitarbeiter, teilbereich, start_zeit
+    ),
+    projekt AS (
+        UPDATE projekte p SET
+            status = 'laufend',
+            letzter_start = neu.start_zeit,
+            erster_start = COALESCE(p.erster_start, neu.start_zeit),
+            -- neu selbst ist für das Statement noch unsichtbar: zählt nur die anderen
+            aktive_mitarbeiter = GREATEST(p.aktive_mitarbeiter, (
+                SELECT COUNT(*) FROM aktive_sitzungen a WHERE a.projekt_id = neu.projekt_id
+            )) + 1
+        FROM neu
+        WHERE p.id = neu.projekt_id AND p.status <> 'beendet'
+        RETURNING p.id
+    ),
+    meldung AS (
+        SELECT json_build_object(
+                   'projekt_id', neu.projekt_id,
+                   'typ', 'gestartet',
+                   'mitarbeiter', neu.mitarbeiter,
+                   'teilbereich', neu.teilbereich,
+                   'start', {_iso('neu.start_zeit')}
+               ) AS ereignis
+        FROM neu JOIN projekt ON projekt.id = neu.projekt_id
+    )
+    SELECT ereignis, pg_notify(%(live_kanal)s, ereignis::text)
+    FROM meldung
+'''
+
+SITZUNG_BEENDEN_SQL = f'''
+    WITH weg AS (
+        DELETE FROM aktive_sitzungen
+        WHERE projekt_id = %(projekt_id)s AND mitarbeiter = %(mitarbeiter)s
+        RETURNING projekt_id, mitarbeiter, teilbereich, start_zeit, {_ENDE_SQL} AS end_zeit,
+                  GREATEST(1, floor(extract(epoch FROM {_ENDE_SQL} - start_zeit) / 60))::int AS dauer_minuten
+    ),
+    gebucht AS (
+        INSERT INTO sitzungen (projekt_id, mitarbeiter, teilbereich, start_zeit, end_zeit, dauer_minuten)
+        SELECT projekt_id, mitarbeiter, teilbereich, start_zeit, end_zeit, dauer_minuten FROM weg
+    ),
+    rollup AS (
+        INSERT INTO sitzungen_tage (tag, projekt_id, mitarbeiter, teilbereich, minuten, anzahl)
+        SELECT {LOKALER_TAG_SQL.format(spalte='start_zeit')}, projekt_id, mitarbeiter,
+               {teilbereich_sql('teilbereich')}, dauer_minuten, 1
+        FROM weg
+        {ROLLUP_KONFLIKT_SQL}
+    ),
+    andere AS (
+        -- Snapshot vor dem DELETE: weg selbst steht noch drin
+        SELECT COUNT(*) AS anzahl
+        FROM aktive_sitzungen a JOIN weg ON a.projekt_id = weg.projekt_id
+        WHERE a.mitarbeiter <> weg.mitarbeiter
+    ),
+    projekt AS (
+        -- Zeilensperre auf dem Projekt: parallele Stopps zählen nacheinander herunter
+        UPDATE projekte p SET
+            {beendet_zuweisungen('weg.dauer_minuten', teilbereich_sql('weg.teilbereich'), 'weg.start_zeit',
+                                 _NOCH_AKTIV_SQL)},
+            status = CASE WHEN {_NOCH_AKTIV_SQL} = 0 THEN 'pausiert' ELSE p.status END
+        FROM weg, andere
+        WHERE p.id = weg.projekt_id
+        RETURNING p.id, p.ersteller, p.beendet_am, p.aktive_mitarbeiter
+    ),
+    meldung AS (
+        SELECT weg.dauer_minuten, projekt.aktive_mitarbeiter,
+               json_build_object(
+                   'projekt_id', weg.projekt_id,
+                   'typ', 'beendet',
+                   'mitarbeiter', weg.mitarbeiter,
+                   'teilbereich', weg.teilbereich,
+                   'start', {_iso('weg.start_zeit')},
+                   'end', {_iso('weg.end_zeit')},
+                   'dauer_minuten', weg.dauer_minuten
+               ) AS ereignis,
+               json_build_object(
+                   'projekt_id', projekt.id,
+                   'ersteller', projekt.ersteller,
+                   'tag_von', {_tag('weg.start_zeit')},
+                   'tag_bis', {_tag('weg.start_zeit')},
+                   'beendet_am', {_tag('projekt.beendet_am')}
+               ) AS aenderung
+        FROM weg JOIN projekt ON projekt.id = weg.projekt_id
+    )
+    SELECT dauer_minuten, aktive_mitarbeiter, ereignis, aenderung,
+           pg_notify(%(live_kanal)s, ereignis::text),
+           pg_notify(%(berichte_kanal)s, json_build_object('aenderungen', json_build_array(aenderung))::text)
+    FROM meldung
+'''
+
+
+def _json(wert):
+    return json.loads(wert) if isinstance(wert, str) else wert
+
+
+def sitzung_starten(cursor, projekt_id, mitarbeiter, teilbereich, zeitpunkt=None):
+    """
+    Startet eine Sitzung (zeitpunkt=None: jetzt) -> (status, Live-Ereignis).
+    status wie in der Sammel-Aktion: 'gestartet', 'arbeitet bereits',
+    'Projekt beendet' oder 'nicht gefunden' (Ereignis dann None).
+    """
+    cursor.execute(SITZUNG_STARTEN_SQL, {
+        'projekt_id': projekt_id,
+        'mitarbeiter': mitarbeiter,
+        'teilbereich': teilbereich,
+        'zeitpunkt': zeitpunkt,
+        'live_kanal': LIVE_KANAL,
+    })
+    row = cursor.fetchone()
+    if row:
+        return 'gestartet', _json(row['ereignis'])
+
+    # Nur im Fehlerfall: warum nicht?
+    cursor.execute('SELECT status FROM projekte WHERE id = %s', (projekt_id,))
+    projekt = cursor.fetchone()
+    if not projekt:
+        return 'nicht gefunden', None
+    return ('Projekt beendet' if projekt['status'] == 'beendet' else 'arbeitet bereits'), None
+
+
+def sitzung_beenden(cursor, projekt_id, mitarbeiter, zeitpunkt=None):
+    """
+    Beendet die aktive Sitzung des Mitarbeiters (zeitpunkt=None: jetzt). Liefert
+    {'ereignis', 'dauer_minuten', 'projekt_pausiert'} oder None, wenn es keine
+    (mehr) gibt. Die NOTIFYs werden mit dem COMMIT zugestellt.
+    """
+    cursor.execute(SITZUNG_BEENDEN_SQL, {
+        'projekt_id': projekt_id,
+        'mitarbeiter': mitarbeiter,
+        'zeitpunkt': zeitpunkt,
+        'live_kanal': LIVE_KANAL,
+        'berichte_kanal': BERICHTE_KANAL,
+    })
+    row = cursor.fetchone()
+    if not row:
+        return None
+
+    # Eigener Worker sofort, die anderen über das NOTIFY
+    berichte_geaendert_lokal([_json(row['aenderung'])])
+    return {
+        'ereignis': _json(row['ereignis']),
+        'dauer_minuten': row['dauer_minuten'],
+        'projekt_pausiert': row['aktive_mitarbeiter'] == 0,
+    }
+
+
+def aktionen_ausfuehren(cursor, aktionen, ergebnisse, ersteller=None):
+    """
+    Führt die Aktionen in der Transaktion des Cursors aus - ein Statement je
+    Sitzung, alles oder nichts. ersteller wie ersteller_filter() (None = alle Projekte).
+    """
+    ids = sorted({a['projekt_id'] for a in aktionen})
+    cursor.execute('SELECT id, ersteller FROM projekte WHERE id = ANY(%s)', (ids,))
+    projekte = {row['id']: row for row in cursor.fetchall()}
+
+    for aktion in _reihenfolge(aktionen):
+        projekt = projekte.get(aktion['projekt_id'])
+        sitzung = None
+        if not projekt:
+            status = 'nicht gefunden'
+        elif ersteller is not None and projekt['ersteller'] != ersteller:
+            status = 'keine Berechtigung'
+        elif aktion['aktion'] == 'starten':
+            # 'Projekt beendet' prüft das Statement selbst
+            status, sitzung = sitzung_starten(cursor, aktion['projekt_id'], aktion['mitarbeiter'],
+                                              aktion['teilbereich'], aktion['zeit'])
+        else:
+            beendet = sitzung_beenden(cursor, aktion['projekt_id'], aktion['mitarbeiter'], aktion['zeit'])
+            sitzung = beendet['ereignis'] if beendet else None
+            status = 'beendet' if beendet else 'keine aktive Sitzung'
+
+        ergebnisse[aktion['nr']] = ergebnis(aktion, status, sitzung)
+    return ergebnisse
+
+
+def ereignisse_ausfuehren(cursor, aktionen, ergebnisse, benutzer, ersteller=None):
+    """
+    Wie aktionen_ausfuehren, aber jeder Schlüssel höchstens einmal: Schlüssel
+    und Ergebnis werden in derselben Transaktion in ereignis_quittungen
+    festgehalten. Ein paralleler Upload desselben Schlüssels wartet am
+    Primärschlüssel, bis diese Transaktion fertig ist.
+    """
+    schluessel = sorted({a['schluessel'] for a in aktionen})
+    cursor.execute('''
+        INSERT INTO ereignis_quittungen (schluessel, benutzer)
+        SELECT unnest(%s::text[]), %s
+        ON CONFLICT (schluessel) DO NOTHING
+        RETURNING schluessel
+    ''', (schluessel, benutzer))
+    neu = {row['schluessel'] for row in cursor.fetchall()}
+
+    vorher = {}
+    if len(neu) < len(schluessel):
+        cursor.execute('SELECT schluessel, ergebnis FROM ereignis_quittungen WHERE schluessel = ANY(%s)',
+                       ([k for k in schluessel if k not in neu],))
+        vorher = {row['schluessel']: _json(row['ergebnis']) for row in cursor.fetchall()}
+
+    ausfuehren, wiederholt = [], []
+    for aktion in aktionen:
+        if aktion['schluessel'] in neu:
+            neu.discard(aktion['schluessel'])
+            ausfuehren.append(aktion)
+        else:
+            wiederholt.append(aktion)
+
+    if ausfuehren:
+        aktionen_ausfuehren(cursor, ausfuehren, ergebnisse, ersteller=ersteller)
+        cursor.execute('''
+            UPDATE ereignis_quittungen q SET ergebnis = e.value
+            FROM jsonb_each(%s::jsonb) e
+            WHERE q.schluessel = e.key
+        ''', (json.dumps({a['schluessel']: ergebnisse[a['nr']] for a in ausfuehren}),))
+
+    # Doppelte Schlüssel im selben Upload bekommen das Ergebnis des ersten
+    erste = {a['schluessel']: ergebnisse[a['nr']] for a in ausfuehren}
+    for aktion in wiederholt:
+        frueher = vorher.get(aktion['schluessel']) or erste.get(aktion['schluessel'])
+        ergebnisse[aktion['nr']] = dict(frueher or ergebnis(aktion, 'bereits verarbeitet'), wiederholt=True)
+    return ergebnisse
+
+
+def quittungen_aufraeumen(cursor, tage=QUITTUNG_TAGE):
+    cursor.execute("DELETE FROM ereignis_quittungen WHERE verarbeitet_am < now() - make_interval(days => %s)",
+                   (tage,))
+    return cursor.rowcount
+
+
+if __name__ == '__main__':
+    if '--quittungen-aufraeumen' not in sys.argv:
+        print("Aufruf: python aktivitaet.py --quittungen-aufraeumen")
+        sys.exit(1)
+
+    from database import db_verbindung
+
+    with db_verbindung() as conn:
+        geloescht = quittungen_aufraeumen(conn.cursor())
+    print(f"🧹 {geloescht} Quittungen älter als {QUITTUNG_TAGE} Tage entfernt")
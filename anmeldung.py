@@ -0,0 +1,126 @@
+"""
+Anmeldung: einzelne Benutzer per E-Mail nachschlagen und Passwort prüfen
+
+Beide Versionen gehen denselben Weg (BenutzerVerzeichnis), nur die Quelle
+unterscheidet sich:
+  - PostgreSQL (app_db.py): genau eine Zeile über den UNIQUE-Index auf email
+  - JSON-Datei (app.py):    Index E-Mail -> Benutzer im Speicher, die Datei
+                            wird nur nach einer Änderung neu gelesen
+Gefundene Benutzer werden ANMELDUNG_CACHE_TTL Sekunden gemerkt, unbekannte
+E-Mails ANMELDUNG_NEGATIV_TTL Sekunden. Nach Registrierung oder
+Passwort-Änderung vergessen(email) aufrufen - andere Worker sehen die
+Änderung spätestens nach Ablauf der TTL.
+"""
+import os
+import json
+import time
+import hmac
+import hashlib
+import threading
+from collections import OrderedDict
+from stammdaten import datei_version
+
+CACHE_TTL = float(os.environ.get('ANMELDUNG_CACHE_TTL', '30'))
+NEGATIV_TTL = float(os.environ.get('ANMELDUNG_NEGATIV_TTL', '5'))
+CACHE_MAX = int(os.environ.get('ANMELDUNG_CACHE_MAX', '1000'))
+
+
+def passwort_hash(passwort):
+    return hashlib.sha256(passwort.encode()).hexdigest()
+
+
+class BenutzerVerzeichnis:
+    """Lädt Benutzer einzeln über laden(email) und merkt sich Treffer und Fehlschläge kurz"""
+
+    def __init__(self, laden, ttl=CACHE_TTL, negativ_ttl=NEGATIV_TTL, max_eintraege=CACHE_MAX):
+        self._laden = laden
+        self.ttl = ttl
+        self.negativ_ttl = negativ_ttl
+        self.max_eintraege = max_eintraege
+
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()     # email -> (benutzer oder None, ablauf) (LRU)
+
+    def holen(self, email):
+        """Benutzer-Dict (Kopie) oder None, wenn es die E-Mail nicht gibt"""
+        email = (email or '').strip().lower()
+        if not email:
+            return None
+
+        jetzt = time.monotonic()
+        with self._lock:
+            eintrag = self._cache.get(email)
+            if eintrag and eintrag[1] > jetzt:
+                self._cache.move_to_end(email)
+                return dict(eintrag[0]) if eintrag[0] else None
+
+        # Außerhalb des Locks laden - ein langsamer Lookup blockiert keine anderen
+        benutzer = self._laden(email)
+        ablauf = jetzt + (self.ttl if benutzer else self.negativ_ttl)
+        with self._lock:
+            self._cache[email] = (benutzer, ablauf)
+            self._cache.move_to_end(email)
+            while len(self._cache) > self.max_eintraege:
+                self._cache.popitem(last=False)
+        return dict(benutzer) if benutzer else None
+
+    def anmelden(self, email, passwort):
+        """Benutzer-Dict bei passendem Passwort, sonst None"""
+        benutzer = self.holen(email)
+        if not benutzer:
+            return None
+        if not hmac.compare_digest(benutzer.get('password_hash') or '', passwort_hash(passwort)):
+            return None
+        return benutzer
+
+    def vergessen(self, email=None):
+        """Einen Benutzer (oder alle) beim nächsten Zugriff neu laden"""
+        with self._lock:
+            if email is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(email.strip().lower(), None)
+
+
+# ---------------------------------------------------------------------------
+# JSON-Datei (app.py)
+# ---------------------------------------------------------------------------
+
+def datei_benutzer(pfad):
+    """Verzeichnis über benutzer.json ({email: {...}})"""
+    version = datei_version(pfad)
+    lock = threading.Lock()
+    stand = {'version': None, 'index': {}}
+
+    def laden(email):
+        aktuell = version()
+        with lock:
+            if aktuell != stand['version']:
+                index = {}
+                if aktuell is not None:
+                    with open(pfad, 'r', encoding='utf-8') as f:
+                        index = {e.strip().lower(): daten for e, daten in json.load(f).items()}
+                stand['version'], stand['index'] = aktuell, index
+            daten = stand['index'].get(email)
+        return dict(daten, email=email) if daten else None
+
+    return BenutzerVerzeichnis(laden)
+
+
+# ---------------------------------------------------------------------------
+# PostgreSQL (app_db.py)
+# ---------------------------------------------------------------------------
+
+def _db_laden(email):
+    from database import db_verbindung
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT email, password_hash, name, team_code_verwendet
+            FROM benutzer WHERE email = %s
+        ''', (email,))
+        row = cursor.fetchone()
+    return dict(row) if row else None
+
+
+db_benutzer = BenutzerVerzeichnis(_db_laden)
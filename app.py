@@ -1,15 +1,19 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file
-from datetime import datetime, timedelta
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_from_directory
 from functools import wraps
 import json
 import os
-import hashlib
 import secrets
-import io
-import time
-# In app.py ganz oben nach den imports:
-import pytz
-
+import copy
+import zeit
+from stammdaten import StammdatenCache, datei_version
+from anmeldung import datei_benutzer, passwort_hash
+from projekt_daten import projekt_ids_lesen
+from dashboard import seite_aus_liste, zaehler_aus_liste, cursor_lesen, seiten_groesse
+from journal import ProjektJournal
+from aktivitaet import aktionen_lesen, aktionen_im_journal
+from protokoll import einrichten as logging_einrichten
+
+logging_einrichten()
 
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)
@@ -55,10 +59,16 @@ def save_data(filename, data):
     with open(filename, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
+# Projekte: Journal + Snapshot (projekte.json), Index nach Projekt-ID im Speicher
+projekte_journal = ProjektJournal(PROJEKTE_FILE)
+
 def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    return passwort_hash(password)
 
-def load_mitarbeiter():
+# Benutzer einzeln nachschlagen (Index im Speicher, kurz gecacht) statt benutzer.json pro Request
+benutzer_verzeichnis = datei_benutzer(BENUTZER_FILE)
+
+def _lade_mitarbeiter_datei():
     if os.path.exists(MITARBEITER_FILE):
         with open(MITARBEITER_FILE, 'r', encoding='utf-8') as f:
             return json.load(f)
@@ -66,7 +76,7 @@ def load_mitarbeiter():
         save_data(MITARBEITER_FILE, STANDARD_MITARBEITER)
         return STANDARD_MITARBEITER
 
-def load_kunden():
+def _lade_kunden_datei():
     if os.path.exists(KUNDEN_FILE):
         with open(KUNDEN_FILE, 'r', encoding='utf-8') as f:
             return json.load(f)
@@ -74,6 +84,16 @@ def load_kunden():
         save_data(KUNDEN_FILE, STANDARD_KUNDEN)
         return STANDARD_KUNDEN
 
+# Stammdaten nur neu lesen, wenn sich die Datei geändert hat (auch durch andere Worker)
+_mitarbeiter_cache = StammdatenCache(_lade_mitarbeiter_datei, datei_version(MITARBEITER_FILE))
+_kunden_cache = StammdatenCache(_lade_kunden_datei, datei_version(KUNDEN_FILE))
+
+def load_mitarbeiter():
+    return _mitarbeiter_cache.get()
+
+def load_kunden():
+    return _kunden_cache.get()
+
 def berechne_dauer_text(minuten):
     """Konvertiert Minuten in lesbaren Text"""
     if minuten < 60:
@@ -158,14 +178,10 @@ def erstelle_projekt_bericht(projekt):
     
     for teilbereich_name, teilbereich_data in projekt['teilbereiche'].items():
         for sitzung in teilbereich_data.get('sitzungen', []):
-            start_datum = sitzung['start'][:10]
-            alle_arbeitsdaten.append(start_datum)
+            alle_arbeitsdaten.append(zeit.lokaler_tag(sitzung['start']))
     
     if alle_arbeitsdaten:
-        alle_arbeitsdaten.sort()
-        erstes_datum = datetime.strptime(alle_arbeitsdaten[0], '%Y-%m-%d')
-        letztes_datum = datetime.strptime(alle_arbeitsdaten[-1], '%Y-%m-%d')
-        kalendertage = (letztes_datum - erstes_datum).days + 1
+        kalendertage = (max(alle_arbeitsdaten) - min(alle_arbeitsdaten)).days + 1
     else:
         kalendertage = 0
     
@@ -183,6 +199,13 @@ def erstelle_projekt_bericht(projekt):
     }
 
 
+@app.route('/sw.js')
+def service_worker():
+    """Service Worker muss unter / liegen, damit er Dashboard und Projektseiten abdeckt"""
+    antwort = send_from_directory(app.static_folder, 'sw.js', mimetype='application/javascript')
+    antwort.headers['Cache-Control'] = 'no-cache'
+    return antwort
+
 @app.route('/')
 def index():
     if 'benutzer_email' in session:
@@ -213,12 +236,13 @@ def registrieren():
     # ✅ Benutzer erstellen
     benutzer[email] = {
         'password_hash': hash_password(password),
-        'registriert_am': datetime.now().isoformat(),
+        'registriert_am': zeit.jetzt().isoformat(),
         'name': email.split('@')[0].title(),
         'team_code_verwendet': team_code
     }
 
     save_data(BENUTZER_FILE, benutzer)
+    benutzer_verzeichnis.vergessen(email)
 
     # ✅ Automatisch anmelden bei gültigem Team-Code
     session['benutzer_email'] = email
@@ -235,13 +259,13 @@ def login():
     email = request.form['email'].strip().lower()
     password = request.form['password']
 
-    benutzer = load_data(BENUTZER_FILE)
+    benutzer = benutzer_verzeichnis.anmelden(email, password)
 
-    if email not in benutzer or benutzer[email]['password_hash'] != hash_password(password):
+    if benutzer is None:
         return jsonify({'status': 'error', 'message': 'Ungültige Anmeldedaten'})
 
     session['benutzer_email'] = email
-    session['benutzer_name'] = benutzer[email]['name']
+    session['benutzer_name'] = benutzer['name']
     return jsonify({'status': 'success'})
 
 @app.route('/logout')
@@ -249,55 +273,60 @@ def logout():
     session.clear()
     return redirect('/')
 
+def darf_projekt_sehen(projekt):
+    """Team-Mitglieder dürfen alles, andere nur ihre eigenen Projekte"""
+    benutzer_email = session['benutzer_email']
+    benutzer_info = benutzer_verzeichnis.holen(benutzer_email) or {}
+    return benutzer_info.get('team_code_verwendet') == TEAM_CODE or projekt.get('ersteller') == benutzer_email
+
+def sichtbare_projekte(benutzer_email):
+    """Team-Mitglieder sehen alle Projekte, andere nur ihre eigenen"""
+    alle_projekte = projekte_journal.alle()
+    benutzer_info = benutzer_verzeichnis.holen(benutzer_email) or {}
+    if benutzer_info.get('team_code_verwendet') == TEAM_CODE:
+        return alle_projekte
+    return [p for p in alle_projekte if p.get('ersteller') == benutzer_email]
+
 @app.route('/dashboard')
 def dashboard():
     if 'benutzer_email' not in session:
         return redirect('/')
 
-    alle_projekte = load_data(PROJEKTE_FILE)
-    benutzer_email = session['benutzer_email']
-
-    # ✅ TEAM-CODE PRÜFEN UND TEAM-PROJEKTE ANZEIGEN
-    benutzer_data = load_data(BENUTZER_FILE)
-    benutzer_info = benutzer_data.get(benutzer_email, {})
-    team_code = benutzer_info.get('team_code_verwendet')
-    
-    if team_code == TEAM_CODE:
-        # ✅ TEAM-MITGLIED → ALLE PROJEKTE SEHEN
-        projekte = alle_projekte
-    else:
-        # ❌ KEIN TEAM-MITGLIED → NUR EIGENE PROJEKTE
-        projekte = [p for p in alle_projekte if p.get('ersteller') == benutzer_email]
-
-    # ✅ ERWEITERTE SORTIERUNG
-    def erweiterte_sortierung(projekt):
-        status_prioritäten = {
-            'laufend': 2,
-            'pausiert': 3,
-            'gestoppt': 1,
-            'beendet': 4
-        }
-
-        status_prio = status_prioritäten.get(projekt['status'], 5)
-
-        if projekt['status'] == 'beendet':
-            beendet_am = projekt.get('beendet_am', '2000-01-01')
-            return (status_prio, beendet_am)
-        else:
-            erstellt_am = projekt.get('erstellt_am', '2000-01-01')
-            return (status_prio, erstellt_am)
-
-    projekte = sorted(projekte, key=erweiterte_sortierung)
+    # Nur die erste Seite - weitere lädt dashboard.html beim Scrollen nach
+    projekte = sichtbare_projekte(session['benutzer_email'])
+    seite = seite_aus_liste(projekte)
     mitarbeiter = load_mitarbeiter()
     kunden = load_kunden()
 
     return render_template('dashboard.html',
-                         projekte=projekte,
+                         projekte=seite['projekte'],
+                         weiter=seite['weiter'],
+                         zaehler=zaehler_aus_liste(projekte),
                          teilbereiche=TEILBEREICHE,
                          mitarbeiter=mitarbeiter,
                          kunden=kunden,
                          benutzer_name=session['benutzer_name'])
 
+@app.route('/dashboard/projekte')
+def dashboard_projekte():
+    if 'benutzer_email' not in session:
+        return jsonify({'status': 'error', 'message': 'Nicht angemeldet'})
+
+    try:
+        nach = cursor_lesen(request.args.get('nach'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    seite = seite_aus_liste(sichtbare_projekte(session['benutzer_email']), nach=nach,
+                            limit=seiten_groesse(request.args.get('anzahl')))
+    html = ''.join(render_template('projekt_karte.html', projekt=p) for p in seite['projekte'])
+    return jsonify({
+        'status': 'success',
+        'html': html,
+        'anzahl': len(seite['projekte']),
+        'weiter': seite['weiter'],
+    })
+
 @app.route('/projekt/neu', methods=['POST'])
 def neues_projekt():
     if 'benutzer_email' not in session:
@@ -310,32 +339,30 @@ def neues_projekt():
     if not kunde:
         return jsonify({'status': 'error', 'message': 'Kunde erforderlich'})
 
-    alle_projekte = load_data(PROJEKTE_FILE)
-    projekt_id = max([p['id'] for p in alle_projekte], default=0) + 1
-
-    jetzt = datetime.now().isoformat()
-
-    projekt = {
-        'id': projekt_id,
-        'name': name,
-        'kunde': kunde,
-        'ersteller': session['benutzer_email'],
-        'benutzer_email': session['benutzer_email'],
-        'status': 'gestoppt',
-        'erstellt_am': jetzt,  # ✅ WIRD NIE GEÄNDERT
-        'erster_start': None,  # ✅ NEU: Wird beim ersten Start gesetzt
-        'letzter_start': None,  # ✅ NEU: Wird bei jedem Start aktualisiert
-        'beendet_am': None,
-        'aktive_sitzungen': {},
-        'teilbereiche': {
-            'besprechung': {'sitzungen': [], 'gesamt_minuten': 0},
-            'zeichnung': {'sitzungen': [], 'gesamt_minuten': 0},
-            'aufmass': {'sitzungen': [], 'gesamt_minuten': 0}
+    jetzt = zeit.jetzt().isoformat()
+
+    with projekte_journal.schreiben() as journal:
+        projekt_id = journal.naechste_id()
+        projekt = {
+            'id': projekt_id,
+            'name': name,
+            'kunde': kunde,
+            'ersteller': session['benutzer_email'],
+            'benutzer_email': session['benutzer_email'],
+            'status': 'gestoppt',
+            'erstellt_am': jetzt,  # ✅ WIRD NIE GEÄNDERT
+            'erster_start': None,  # ✅ NEU: Wird beim ersten Start gesetzt
+            'letzter_start': None,  # ✅ NEU: Wird bei jedem Start aktualisiert
+            'beendet_am': None,
+            'aktive_sitzungen': {},
+            'teilbereiche': {
+                'besprechung': {'sitzungen': [], 'gesamt_minuten': 0},
+                'zeichnung': {'sitzungen': [], 'gesamt_minuten': 0},
+                'aufmass': {'sitzungen': [], 'gesamt_minuten': 0}
+            }
         }
-    }
+        journal.anhaengen({'art': 'projekt', 'projekt': projekt})
 
-    alle_projekte.append(projekt)
-    save_data(PROJEKTE_FILE, alle_projekte)
     return jsonify({'status': 'success', 'projekt_id': projekt_id})
 
 @app.route('/projekt/<int:projekt_id>')
@@ -343,16 +370,14 @@ def projekt_details(projekt_id):
     if 'benutzer_email' not in session:
         return redirect(url_for('index'))
 
-    alle_projekte = load_data(PROJEKTE_FILE)
-    projekt = next((p for p in alle_projekte if p['id'] == projekt_id), None)
+    projekt = projekte_journal.projekt(projekt_id)
 
     if not projekt:
         return "Projekt nicht gefunden", 404
 
     # ✅ TEAM-BERECHTIGUNG PRÜFEN
     benutzer_email = session['benutzer_email']
-    benutzer_data = load_data(BENUTZER_FILE)
-    benutzer_info = benutzer_data.get(benutzer_email, {})
+    benutzer_info = benutzer_verzeichnis.holen(benutzer_email) or {}
     user_team_code = benutzer_info.get('team_code_verwendet')
     
     projekt_ersteller = projekt.get('ersteller')
@@ -367,6 +392,9 @@ def projekt_details(projekt_id):
     else:
         return "Keine Berechtigung für dieses Projekt", 403
 
+    # Kopie - das Projekt aus dem Journal-Index darf nicht verändert werden
+    projekt = zeit.projekt_anzeige_vorbereiten(copy.deepcopy(projekt))
+
     mitarbeiter = load_mitarbeiter()
     return render_template('projekt_details.html',
                          projekt=projekt,
@@ -382,31 +410,27 @@ def aktivität_starten(projekt_id):
     mitarbeiter = request.form['mitarbeiter']
     teilbereich = request.form['teilbereich']
 
-    alle_projekte = load_data(PROJEKTE_FILE)
-    projekt = next((p for p in alle_projekte if p['id'] == projekt_id), None)
+    # Prüfen und Schreiben unter derselben Sperre - kein paralleler Doppelstart
+    with projekte_journal.schreiben() as journal:
+        projekt = journal.projekt(projekt_id)
 
-    if not projekt:
-        return jsonify({'status': 'error', 'message': 'Projekt nicht gefunden'})
+        if not projekt:
+            return jsonify({'status': 'error', 'message': 'Projekt nicht gefunden'})
 
-    if mitarbeiter in projekt.get('aktive_sitzungen', {}):
-        return jsonify({'status': 'error', 'message': f'{mitarbeiter} arbeitet bereits'})
-
-    jetzt = datetime.now().isoformat()
-    
-    # ✅ ERSTER START MERKEN
-    if projekt.get('erster_start') is None:
-        projekt['erster_start'] = jetzt
-    
-    # ✅ LETZTEN START MERKEN
-    projekt['letzter_start'] = jetzt
+        if projekt.get('status') == 'beendet':
+            return jsonify({'status': 'error', 'message': 'Projekt ist bereits beendet'})
 
-    projekt['aktive_sitzungen'][mitarbeiter] = {
-        'teilbereich': teilbereich,
-        'start': jetzt
-    }
+        if mitarbeiter in projekt.get('aktive_sitzungen', {}):
+            return jsonify({'status': 'error', 'message': f'{mitarbeiter} arbeitet bereits'})
 
-    projekt['status'] = 'laufend'
-    save_data(PROJEKTE_FILE, alle_projekte)
+        # ✅ Setzt auch erster_start / letzter_start und Status 'laufend'
+        journal.anhaengen({
+            'art': 'start',
+            'projekt_id': projekt_id,
+            'mitarbeiter': mitarbeiter,
+            'teilbereich': teilbereich,
+            'start': zeit.jetzt().isoformat()
+        })
 
     return jsonify({'status': 'success'})
 
@@ -417,76 +441,90 @@ def aktivität_beenden(projekt_id):
 
     mitarbeiter = request.form['mitarbeiter']
 
-    alle_projekte = load_data(PROJEKTE_FILE)
-    projekt = next((p for p in alle_projekte if p['id'] == projekt_id), None)
-
-    if not projekt or mitarbeiter not in projekt.get('aktive_sitzungen', {}):
-        return jsonify({'status': 'error', 'message': 'Keine aktive Sitzung'})
+    with projekte_journal.schreiben() as journal:
+        projekt = journal.projekt(projekt_id)
 
-    aktive_sitzung = projekt['aktive_sitzungen'][mitarbeiter]
-    start_zeit = datetime.fromisoformat(aktive_sitzung['start'])
-    end_zeit = datetime.now()
-    dauer_minuten = int((end_zeit - start_zeit).total_seconds() / 60)
+        if not projekt or mitarbeiter not in projekt.get('aktive_sitzungen', {}):
+            return jsonify({'status': 'error', 'message': 'Keine aktive Sitzung'})
 
-    teilbereich = aktive_sitzung['teilbereich']
-
-    sitzung = {
-        'mitarbeiter': mitarbeiter,
-        'start': aktive_sitzung['start'],
-        'end': end_zeit.isoformat(),
-        'dauer_minuten': dauer_minuten
-    }
-
-    projekt['teilbereiche'][teilbereich]['sitzungen'].append(sitzung)
-    projekt['teilbereiche'][teilbereich]['gesamt_minuten'] += dauer_minuten
-
-    del projekt['aktive_sitzungen'][mitarbeiter]
-
-    if not projekt['aktive_sitzungen']:
-        projekt['status'] = 'pausiert'
-
-    save_data(PROJEKTE_FILE, alle_projekte)
+        aktive_sitzung = projekt['aktive_sitzungen'][mitarbeiter]
+        end_zeit = zeit.jetzt()
+        dauer_minuten = zeit.minuten_zwischen(aktive_sitzung['start'], end_zeit)
+
+        # ✅ Bucht die Sitzung, entfernt die aktive Sitzung, ggf. Status 'pausiert'
+        journal.anhaengen({
+            'art': 'stopp',
+            'projekt_id': projekt_id,
+            'teilbereich': aktive_sitzung['teilbereich'],
+            'sitzung': {
+                'mitarbeiter': mitarbeiter,
+                'start': aktive_sitzung['start'],
+                'end': end_zeit.isoformat(),
+                'dauer_minuten': dauer_minuten
+            }
+        })
 
     return jsonify({
         'status': 'success',
         'dauer_text': berechne_dauer_text(dauer_minuten)
     })
 
-@app.route('/projekt/<int:projekt_id>/beenden', methods=['POST'])
-def projekt_beenden(projekt_id):
+@app.route('/aktivitäten', methods=['POST'])
+def aktivitäten_sammel():
     if 'benutzer_email' not in session:
         return jsonify({'status': 'error', 'message': 'Nicht angemeldet'})
+    return aktionen_einspielen((request.get_json(silent=True) or {}).get('aktionen'))
 
-    alle_projekte = load_data(PROJEKTE_FILE)
-    projekt = next((p for p in alle_projekte if p['id'] == projekt_id), None)
-
-    if not projekt:
-        return jsonify({'status': 'error', 'message': 'Projekt nicht gefunden'})
+@app.route('/aktivitäten/ereignisse', methods=['POST'])
+def aktivitäten_ereignisse():
+    """Upload der Offline-Warteschlange - Quittungen liegen im Journal am Projekt"""
+    if 'benutzer_email' not in session:
+        return jsonify({'status': 'error', 'message': 'Nicht angemeldet'})
+    return aktionen_einspielen((request.get_json(silent=True) or {}).get('ereignisse'), mit_schluessel=True)
 
-    # Alle aktiven Sitzungen beenden
-    for mitarbeiter in list(projekt.get('aktive_sitzungen', {}).keys()):
-        aktive_sitzung = projekt['aktive_sitzungen'][mitarbeiter]
-        start_zeit = datetime.fromisoformat(aktive_sitzung['start'])
-        end_zeit = datetime.now()
-        dauer_minuten = int((end_zeit - start_zeit).total_seconds() / 60)
+def aktionen_einspielen(roh, mit_schluessel=False):
+    try:
+        aktionen, ergebnisse = aktionen_lesen(roh, mit_schluessel=mit_schluessel)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
 
-        teilbereich = aktive_sitzung['teilbereich']
+    # Alle Aktionen unter einer Sperre - wie eine Transaktion
+    with projekte_journal.schreiben() as journal:
+        aktionen_im_journal(journal, aktionen, ergebnisse, darf_projekt_sehen)
 
-        sitzung = {
-            'mitarbeiter': mitarbeiter,
-            'start': aktive_sitzung['start'],
-            'end': end_zeit.isoformat(),
-            'dauer_minuten': dauer_minuten
-        }
+    return jsonify({'status': 'success', 'ergebnisse': ergebnisse})
 
-        projekt['teilbereiche'][teilbereich]['sitzungen'].append(sitzung)
-        projekt['teilbereiche'][teilbereich]['gesamt_minuten'] += dauer_minuten
+@app.route('/projekt/<int:projekt_id>/beenden', methods=['POST'])
+def projekt_beenden(projekt_id):
+    if 'benutzer_email' not in session:
+        return jsonify({'status': 'error', 'message': 'Nicht angemeldet'})
 
-    projekt['status'] = 'beendet'
-    projekt['beendet_am'] = datetime.now().isoformat()
-    projekt['aktive_sitzungen'] = {}
+    with projekte_journal.schreiben() as journal:
+        projekt = journal.projekt(projekt_id)
+
+        if not projekt:
+            return jsonify({'status': 'error', 'message': 'Projekt nicht gefunden'})
+
+        # Alle aktiven Sitzungen beenden
+        end_zeit = zeit.jetzt()
+        sitzungen = []
+        for mitarbeiter, aktive_sitzung in projekt.get('aktive_sitzungen', {}).items():
+            dauer_minuten = zeit.minuten_zwischen(aktive_sitzung['start'], end_zeit)
+
+            sitzungen.append((aktive_sitzung['teilbereich'], {
+                'mitarbeiter': mitarbeiter,
+                'start': aktive_sitzung['start'],
+                'end': end_zeit.isoformat(),
+                'dauer_minuten': dauer_minuten
+            }))
+
+        journal.anhaengen({
+            'art': 'beenden',
+            'projekt_id': projekt_id,
+            'sitzungen': sitzungen,
+            'beendet_am': end_zeit.isoformat()
+        })
 
-    save_data(PROJEKTE_FILE, alle_projekte)
     return jsonify({'status': 'success'})
 
 @app.route('/projekte/löschen', methods=['POST'])
@@ -494,25 +532,34 @@ def projekte_löschen():
     if 'benutzer_email' not in session:
         return jsonify({'status': 'error', 'message': 'Nicht angemeldet'})
 
-    projekt_ids = request.json.get('projekt_ids', [])
-
-    alle_projekte = load_data(PROJEKTE_FILE)
-    neue_projekte = []
-
-    for projekt in alle_projekte:
-        if projekt['id'] not in projekt_ids:
-            neue_projekte.append(projekt)
+    try:
+        projekt_ids, ergebnisse = projekt_ids_lesen((request.get_json(silent=True) or {}).get('projekt_ids'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    # Prüfen und Löschen unter derselben Sperre - wie projekte_loeschen() in app_db.py
+    with projekte_journal.schreiben() as journal:
+        loeschen = []
+        for projekt_id in sorted(set(projekt_ids)):
+            projekt = journal.projekt(projekt_id)
+            if not projekt:
+                ergebnisse[str(projekt_id)] = 'nicht gefunden'
+            elif not darf_projekt_sehen(projekt):
+                ergebnisse[str(projekt_id)] = 'keine Berechtigung'
+            else:
+                ergebnisse[str(projekt_id)] = 'gelöscht'
+                loeschen.append(projekt_id)
+        if loeschen:
+            journal.anhaengen({'art': 'loeschen', 'projekt_ids': loeschen})
 
-    save_data(PROJEKTE_FILE, neue_projekte)
-    return jsonify({'status': 'success'})
+    return jsonify({'status': 'success', 'ergebnisse': ergebnisse})
 
 @app.route('/projekt/<int:projekt_id>/bericht')
 def projekt_bericht(projekt_id):
     if 'benutzer_email' not in session:
         return redirect(url_for('index'))
 
-    alle_projekte = load_data(PROJEKTE_FILE)
-    projekt = next((p for p in alle_projekte if p['id'] == projekt_id), None)
+    projekt = projekte_journal.projekt(projekt_id)
 
     if not projekt:
         return "Projekt nicht gefunden", 404
@@ -531,12 +578,11 @@ def gesamt_bericht():
     von_datum = request.args.get('von', '2025-01-01')
     bis_datum = request.args.get('bis', '2025-12-31')
     
-    alle_projekte_data = load_data(PROJEKTE_FILE)
+    alle_projekte_data = projekte_journal.alle()
     benutzer_email = session['benutzer_email']
     
     # ✅ TEAM-CODE PRÜFEN
-    benutzer_data = load_data(BENUTZER_FILE)
-    benutzer_info = benutzer_data.get(benutzer_email, {})
+    benutzer_info = benutzer_verzeichnis.holen(benutzer_email) or {}
     user_team_code = benutzer_info.get('team_code_verwendet')
     
     beendete_projekte = []
@@ -556,7 +602,7 @@ def gesamt_bericht():
         if projekt.get('status') != 'beendet':
             continue
             
-        created_date = projekt.get('erstellt_am', '2025-01-01')[:10]
+        created_date = str(zeit.lokaler_tag(projekt.get('erstellt_am') or '2025-01-01'))
         if not (von_datum <= created_date <= bis_datum):
             continue
         
@@ -581,6 +627,7 @@ def gesamt_bericht():
             'kunde': projekt.get('kunde', 'Unbekannt'),
             'status': projekt.get('status', 'beendet'),
             'erstellt_am': projekt.get('erstellt_am', ''),
+            'beendet_datum': zeit.datum(projekt.get('beendet_am')),
             'teilbereiche': teilbereiche_data
         })
     
@@ -606,12 +653,11 @@ def export_vorschau():
 
     # ✅ TEAM-BERECHTIGUNG PRÜFEN
     benutzer_email = session['benutzer_email']
-    benutzer_data = load_data(BENUTZER_FILE)
-    benutzer_info = benutzer_data.get(benutzer_email, {})
+    benutzer_info = benutzer_verzeichnis.holen(benutzer_email) or {}
     user_team_code = benutzer_info.get('team_code_verwendet')
 
     # ✅ Alle beendeten Projekte finden
-    alle_projekte = load_data(PROJEKTE_FILE)
+    alle_projekte = projekte_journal.alle()
     gefundene_projekte = []
     gesamt_minuten = 0
     
@@ -662,8 +708,8 @@ def export_vorschau():
                 'name': projekt['name'],
                 'kunde': projekt['kunde'],
                 'status': projekt['status'],
-                'erstellt_datum': projekt.get('erstellt_am', '2024-01-01')[:10],
-                'beendet_datum': projekt.get('beendet_am', '2024-12-31')[:10],
+                'erstellt_datum': str(zeit.lokaler_tag(projekt.get('erstellt_am') or '2024-01-01')),
+                'beendet_datum': str(zeit.lokaler_tag(projekt.get('beendet_am') or '2024-12-31')),
                 'gesamt_zeit': format_zeit(projekt_gesamt),
                 'besprechung_zeit': format_zeit(besprechung_min),
                 'zeichnung_zeit': format_zeit(zeichnung_min),
@@ -690,12 +736,11 @@ def export_pdf():
 
     # ✅ TEAM-BERECHTIGUNG PRÜFEN
     benutzer_email = session['benutzer_email']
-    benutzer_data = load_data(BENUTZER_FILE)
-    benutzer_info = benutzer_data.get(benutzer_email, {})
+    benutzer_info = benutzer_verzeichnis.holen(benutzer_email) or {}
     user_team_code = benutzer_info.get('team_code_verwendet')
 
     # ✅ SAMMLE ALLE BEENDETEN PROJEKTE IM ZEITRAUM
-    alle_projekte_data = load_data(PROJEKTE_FILE)
+    alle_projekte_data = projekte_journal.alle()
     beendete_projekte = []
 
     for projekt in alle_projekte_data:
@@ -750,12 +795,11 @@ def export_vorschau_pdf():
     try:
         # ✅ TEAM-BERECHTIGUNG PRÜFEN
         benutzer_email = session['benutzer_email']
-        benutzer_data = load_data(BENUTZER_FILE)
-        benutzer_info = benutzer_data.get(benutzer_email, {})
+        benutzer_info = benutzer_verzeichnis.holen(benutzer_email) or {}
         user_team_code = benutzer_info.get('team_code_verwendet')
         
         # ✅ RICHTIGES DATEN-LADEN
-        alle_projekte = load_data(PROJEKTE_FILE)
+        alle_projekte = projekte_journal.alle()
         projekte = []
         
         # ✅ ZEIT FORMATIEREN FUNKTION
@@ -804,7 +848,7 @@ def export_vorschau_pdf():
                     'name': projekt_data['name'],
                     'kunde': projekt_data['kunde'],
                     'status': projekt_data['status'],
-                    'erstellt_datum': projekt_data.get('erstellt_am', '2025-01-01')[:10],
+                    'erstellt_datum': str(zeit.lokaler_tag(projekt_data.get('erstellt_am') or '2025-01-01')),
                     'gesamt_zeit': format_zeit(projekt_gesamt),
                     'besprechung_zeit': format_zeit(besprechung_min),
                     'zeichnung_zeit': format_zeit(zeichnung_min),
@@ -882,7 +926,7 @@ def export_vorschau_pdf():
             </div>
             
             <div style="margin-top: 30px; text-align: center; font-size: 12px; color: #6c757d;">
-                Erstellt am: {datetime.now().strftime('%d.%m.%Y um %H:%M')}
+                Erstellt am: {zeit.lokal(zeit.jetzt()).strftime('%d.%m.%Y um %H:%M')}
             </div>
             
             <script>
@@ -917,6 +961,7 @@ def mitarbeiter_hinzufügen():
 
     mitarbeiter.append(name)
     save_data(MITARBEITER_FILE, mitarbeiter)
+    _mitarbeiter_cache.invalidieren()
     return jsonify({'status': 'success'})
 
 @app.route('/mitarbeiter/löschen', methods=['POST'])
@@ -930,6 +975,7 @@ def mitarbeiter_löschen():
     if name in mitarbeiter:
         mitarbeiter.remove(name)
         save_data(MITARBEITER_FILE, mitarbeiter)
+        _mitarbeiter_cache.invalidieren()
 
     return jsonify({'status': 'success'})
 
@@ -948,6 +994,7 @@ def kunde_hinzufügen():
 
     kunden.append(name)
     save_data(KUNDEN_FILE, kunden)
+    _kunden_cache.invalidieren()
     return jsonify({'status': 'success'})
 
 @app.route('/kunde/löschen', methods=['POST'])
@@ -961,6 +1008,7 @@ def kunde_löschen():
     if name in kunden:
         kunden.remove(name)
         save_data(KUNDEN_FILE, kunden)
+        _kunden_cache.invalidieren()
 
     return jsonify({'status': 'success'})
 
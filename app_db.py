@@ -1,26 +1,71 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for,render_template_string
-from datetime import datetime, timedelta
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for,render_template_string, Response, stream_with_context, send_from_directory
+from datetime import datetime
 from functools import wraps
-import time
-import hashlib
 import secrets
-from database import *
-import pytz
+from database import db_verbindung, pool_metriken
+from projekt_daten import lade_projekt_aggregat, lade_live_stand, projekt_ids_lesen, projekte_loeschen
+from dashboard import lade_dashboard_seite, lade_dashboard_zaehler, cursor_lesen, seiten_groesse
+from berichte import lade_projekt_summen, iter_projekt_summen, lade_bericht_summe
+from projekt_zaehler import aktive_verworfen
+from aktivitaet import (sitzung_starten, sitzung_beenden, aktionen_lesen, aktionen_ausfuehren,
+                        ereignisse_ausfuehren)
+from anmeldung import db_benutzer, passwort_hash
+from berechtigung import (TEAM_CODE, berechtigung_merken, berechtigung_vergessen, ersteller_filter,
+                          darf_projekt_sehen, darf_projekt_id_sehen)
+from stammdaten import db_mitarbeiter, db_kunden, stammdaten_geaendert, stammdaten_invalidieren
+from live import get_verteiler, jetzt_id, sse_stream, platz_belegen, platz_freigeben, POLL_PAUSE
+from export import sitzungen_csv, EXPORT_ITERSIZE
+from berichtcache import (bericht_schluessel, bericht_holen, bericht_speichern, bericht_antwort,
+                          bericht_mitschreiben, berichte_geaendert, aenderung)
+from metriken import anfrage_beginnen, anfrage_beenden, prometheus_text
+import zeit
 import json
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import uuid
 import logging
-logging.basicConfig(level=logging.DEBUG)
+from protokoll import einrichten as logging_einrichten, felder, request_id, request_id_setzen
+
+logging_einrichten()
+log = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', secrets.token_hex(16))
 
-# Team-Code Definition
-TEAM_CODE = 'RAUSCH2025'
 TEILBEREICHE = ['besprechung', 'zeichnung', 'aufmass']
+SITZUNGEN_PRO_SEITE = 50
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+LOG_LANGSAM_MS = float(os.environ.get('LOG_LANGSAM_MS', '1000'))
+
+# Pro Request: Request-ID fürs Logging, Messung von Latenz, SQL-Anzahl und DB-Zeit
+@app.before_request
+def anfrage_starten():
+    rid = request.headers.get('X-Request-ID', '')
+    if not (0 < len(rid) <= 64 and rid.replace('-', '').isalnum()):
+        rid = uuid.uuid4().hex[:16]
+    request_id_setzen(rid)
+    anfrage_beginnen()
+
+@app.after_request
+def anfrage_abschliessen(response):
+    endpoint, methode, pfad = request.endpoint, request.method, request.path
+    response.headers['X-Request-ID'] = request_id()
+
+    # Erst verbuchen, wenn auch gestreamte Antworten komplett gesendet sind
+    def verbuchen():
+        stand = anfrage_beenden(endpoint, methode, response.status_code)
+        if stand is None:
+            return
+        dauer, sql_anzahl, db_zeit = stand
+        level = logging.WARNING if dauer * 1000 >= LOG_LANGSAM_MS else logging.DEBUG
+        log.log(level, 'Request', extra=felder(
+            endpoint=endpoint, methode=methode, pfad=pfad, status=response.status_code,
+            dauer_ms=round(dauer * 1000, 1), sql=sql_anzahl, db_ms=round(db_zeit * 1000, 1)
+        ))
+
+    response.call_on_close(verbuchen)
+    return response
+
 #Login
 def login_required(f):
     @wraps(f)
@@ -31,7 +76,15 @@ def login_required(f):
     return decorated_function
 
 def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    return passwort_hash(password)
+
+def load_mitarbeiter():
+    """Mitarbeiterliste aus dem Stammdaten-Cache"""
+    return db_mitarbeiter()
+
+def load_kunden():
+    """Kundenliste aus dem Stammdaten-Cache"""
+    return db_kunden()
 
 def berechne_dauer_text(minuten):
     """Konvertiert Minuten in lesbaren Text"""
@@ -68,58 +121,33 @@ def berechne_dauer_text(minuten):
 
     return result
 
+def parse_datum(date_str):
+    """Datum aus Formularen - mehrere Formate unterstützen"""
+    formats = ['%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y']
+    for fmt in formats:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Ungültiges Datumsformat: {date_str}")
 
-@app.template_filter('german_time')
-def german_time_filter(utc_string):
-    try:
-        utc_time = datetime.fromisoformat(utc_string.replace('Z', '+00:00'))
-        german_tz = pytz.timezone('Europe/Berlin')
-        german_time = utc_time.astimezone(german_tz)
-        return german_time.strftime('%H:%M')
-    except:
-        return utc_string[11:16]
-    
+def format_minuten(minuten):
+    """Minuten für Berichte (z.B. 45min, 2h, 2h 15min)"""
+    if minuten < 60:
+        return f"{minuten}min"
+    stunden = minuten // 60
+    rest_min = minuten % 60
+    if rest_min == 0:
+        return f"{stunden}h"
+    return f"{stunden}h {rest_min}min"
 
-@app.template_filter('german_date')
-def german_date_filter(utc_string):
-    """Konvertiert UTC Datum zu deutschem Datum (DD.MM.)"""
-    try:
-        utc_time = datetime.fromisoformat(utc_string.replace('Z', '+00:00'))
-        german_tz = pytz.timezone('Europe/Berlin')
-        german_time = utc_time.astimezone(german_tz)
-        return german_time.strftime('%d.%m.')
-    except:
-        if isinstance(utc_string, str) and len(utc_string) > 10:
-            return f"{utc_string[8:10]}.{utc_string[5:7]}."
-        return "01.01."
-os.environ['TZ'] = 'Europe/Berlin'
-time.tzset()
-def berechne_aktuelle_dauer(start_zeit):
-    """Berechnet die aktuelle Dauer einer laufenden Sitzung"""
-    try:
-        if isinstance(start_zeit, str):
-            start = datetime.fromisoformat(start_zeit.replace('Z', '+00:00'))
-        else:
-            start = start_zeit
-        
-        jetzt = datetime.now()
-        if start.tzinfo is not None:
-            jetzt = datetime.now(pytz.UTC)
-        
-        diff = jetzt - start
-        total_minuten = max(0, int(diff.total_seconds() / 60))
-        
-        stunden = total_minuten // 60
-        minuten = total_minuten % 60
-        
-        return f"{stunden}h {minuten}m"
-    except:
-        return "0h 0m"
-    
 
-@app.template_filter('aktuelle_dauer')
-def aktuelle_dauer_filter(start_zeit):
-    return berechne_aktuelle_dauer(start_zeit)
+@app.route('/sw.js')
+def service_worker():
+    """Service Worker muss unter / liegen, damit er Dashboard und Projektseiten abdeckt"""
+    antwort = send_from_directory(app.static_folder, 'sw.js', mimetype='application/javascript')
+    antwort.headers['Cache-Control'] = 'no-cache'
+    return antwort
 
 
 @app.route('/')
@@ -138,52 +166,51 @@ def registrieren():
     if len(password) < 8:
         return jsonify({'status': 'error', 'message': 'Passwort muss mindestens 8 Zeichen haben'})
 
-    # Prüfen ob E-Mail bereits existiert
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT email FROM benutzer WHERE email = %s', (email,))
-    if cursor.fetchone():
-        conn.close()
-        return jsonify({'status': 'error', 'message': 'E-Mail bereits registriert'})
-
     if not team_code:
-        conn.close()
         return jsonify({'status': 'error', 'message': 'Team-Code ist erforderlich'})
 
     if team_code != TEAM_CODE:
-        conn.close()
         return jsonify({'status': 'error', 'message': 'Ungültiger Team-Code'})
 
     # Benutzer in Datenbank speichern
     try:
-        cursor.execute('''
-            INSERT INTO benutzer (email, password_hash, name, team_code_verwendet, registriert_am)
-            VALUES (%s, %s, %s, %s, %s)
-        ''', (
-            email, 
-            hash_password(password),
-            email.split('@')[0].title(),
-            team_code,
-            datetime.now()
-        ))
-        
-        conn.commit()
-        conn.close()
+        with db_verbindung() as conn:
+            cursor = conn.cursor()
+
+            # Prüfen ob E-Mail bereits existiert
+            cursor.execute('SELECT email FROM benutzer WHERE email = %s', (email,))
+            if cursor.fetchone():
+                return jsonify({'status': 'error', 'message': 'E-Mail bereits registriert'})
+
+            cursor.execute('''
+                INSERT INTO benutzer (email, password_hash, name, team_code_verwendet, registriert_am)
+                VALUES (%s, %s, %s, %s, %s)
+            ''', (
+                email, 
+                hash_password(password),
+                email.split('@')[0].title(),
+                team_code,
+                zeit.jetzt()
+            ))
+
+        # Negativ-Eintrag aus einem früheren Login-Versuch verwerfen
+        db_benutzer.vergessen(email)
+        berechtigung_vergessen(email)
 
         # SESSION SETZEN
         session['benutzer_email'] = email
         session['benutzer_name'] = email.split('@')[0].title()
+        berechtigung_merken(email, team_code)
 
         # BESTÄTIGUNGS-EMAIL SENDEN
         try:
-            print(f"📧 REGISTRIERUNG ERFOLGREICH für {email}")
-            print(f"🎉 Willkommen {session['benutzer_name']}!")
+            log.info('Registrierung erfolgreich', extra=felder(email=email))
             
             # HIER KÖNNTEST DU ECHTE EMAIL SENDEN:
             # send_registration_email(email, session['benutzer_name'])
             
         except Exception as e:
-            print(f"⚠️ Email-Versand fehlgeschlagen: {e}")
+            log.warning('Email-Versand fehlgeschlagen', extra=felder(email=email, fehler=str(e)))
 
         return jsonify({
             'status': 'success',
@@ -192,8 +219,6 @@ def registrieren():
         })
 
     except Exception as e:
-        conn.rollback()
-        conn.close()
         return jsonify({'status': 'error', 'message': f'Registrierung fehlgeschlagen: {str(e)}'})
     
 
@@ -202,12 +227,14 @@ def login():
     email = request.form['email'].strip().lower()
     password = request.form['password']
 
-    benutzer = load_benutzer()
-    if email not in benutzer or benutzer[email]['password_hash'] != hash_password(password):
+    # Ein Benutzer über den Index auf email, kurz gecacht (auch Fehlschläge)
+    benutzer = db_benutzer.anmelden(email, password)
+    if benutzer is None:
         return jsonify({'status': 'error', 'message': 'Ungültige Anmeldedaten'})
 
     session['benutzer_email'] = email
-    session['benutzer_name'] = benutzer[email]['name']
+    session['benutzer_name'] = benutzer['name']
+    berechtigung_merken(email, benutzer.get('team_code_verwendet'))
     return jsonify({'status': 'success'})
 
 
@@ -220,18 +247,48 @@ def logout():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    projekte = load_projekte_for_user(session['benutzer_email'])
+    # Nur die erste Seite - weitere lädt dashboard.html beim Scrollen nach
+    ersteller = ersteller_filter()
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        seite = lade_dashboard_seite(cursor, ersteller)
+        zaehler = lade_dashboard_zaehler(cursor, ersteller)
     mitarbeiter = load_mitarbeiter()
     kunden = load_kunden()
 
     return render_template('dashboard.html',
-                         projekte=projekte,
+                         projekte=seite['projekte'],
+                         weiter=seite['weiter'],
+                         zaehler=zaehler,
                          teilbereiche=TEILBEREICHE,
                          mitarbeiter=mitarbeiter,
                          kunden=kunden,
                          benutzer_name=session['benutzer_name'])
 
 
+@app.route('/dashboard/projekte')
+@login_required
+def dashboard_projekte():
+    """Nächste Dashboard-Seite ab ?nach=<cursor> - Karten als HTML plus Cursor"""
+    try:
+        nach = cursor_lesen(request.args.get('nach'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        seite = lade_dashboard_seite(cursor, ersteller_filter(), nach=nach,
+                                     limit=seiten_groesse(request.args.get('anzahl')))
+
+    html = ''.join(render_template('projekt_karte.html', projekt=p) for p in seite['projekte'])
+    return jsonify({
+        'status': 'success',
+        'html': html,
+        'anzahl': len(seite['projekte']),
+        'weiter': seite['weiter'],
+    })
+
+
 @app.route('/projekt/neu', methods=['POST'])
 @login_required
 def neues_projekt():
@@ -242,18 +299,16 @@ def neues_projekt():
     if not kunde:
         return jsonify({'status': 'error', 'message': 'Kunde erforderlich'})
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        INSERT INTO projekte (name, kunde, ersteller, status, erstellt_am)
-        VALUES (%s, %s, %s, %s, %s)
-        RETURNING id
-    ''', (name, kunde, session['benutzer_email'], 'gestoppt', datetime.now().isoformat()))
-    
-    projekt_id = cursor.fetchone()['id']
-    conn.commit()
-    conn.close()
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            INSERT INTO projekte (name, kunde, ersteller, status, erstellt_am)
+            VALUES (%s, %s, %s, %s, %s)
+            RETURNING id
+        ''', (name, kunde, session['benutzer_email'], 'gestoppt', zeit.jetzt()))
+
+        projekt_id = cursor.fetchone()['id']
     
     return jsonify({'status': 'success', 'projekt_id': projekt_id})
 
@@ -261,227 +316,160 @@ def neues_projekt():
 @app.route('/projekt/<int:projekt_id>')
 @login_required
 def projekt_details(projekt_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM projekte WHERE id = %s', (projekt_id,))
-    projekt_row = cursor.fetchone()
-    
-    if not projekt_row:
-        conn.close()
+    # Optionale Seitenweise-Anzeige des Verlaufs (?seite=2&pro_seite=50)
+    seite = request.args.get('seite', type=int)
+    pro_seite = max(1, request.args.get('pro_seite', SITZUNGEN_PRO_SEITE, type=int))
+    limit = pro_seite if seite else None
+    offset = (seite - 1) * pro_seite if seite and seite > 1 else 0
+
+    # Stand vor dem Laden merken - Live-Updates setzen ab hier an
+    get_verteiler()
+    live_seit = jetzt_id()
+
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+
+        # Projekt, aktive und beendete Sitzungen in einem Round-Trip
+        projekt = lade_projekt_aggregat(cursor, projekt_id, limit=limit, offset=offset)
+
+    if not projekt:
         return "Projekt nicht gefunden", 404
 
-    projekt = dict(projekt_row)
-    
-    # Team-Berechtigung prüfen
-    benutzer_email = session['benutzer_email']
-    cursor.execute('SELECT team_code_verwendet FROM benutzer WHERE email = %s', (benutzer_email,))
-    benutzer_info = cursor.fetchone()
-    user_team_code = benutzer_info['team_code_verwendet'] if benutzer_info else None
-    
-    if user_team_code == TEAM_CODE:
-        pass  # Team-Mitglied hat Zugriff
-    elif projekt['ersteller'] == benutzer_email:
-        pass  # Eigenes Projekt
-    else:
-        conn.close()
+    # Team-Berechtigung prüfen (Team-Mitglied oder eigenes Projekt)
+    if not darf_projekt_sehen(projekt):
         return "Keine Berechtigung für dieses Projekt", 403
 
-    # Aktive Sitzungen laden
-    cursor.execute('''
-        SELECT mitarbeiter, teilbereich, start_zeit 
-        FROM aktive_sitzungen 
-        WHERE projekt_id = %s
-    ''', (projekt_id,))
-    
-    aktive_sitzungen = {}
-    for sitzung in cursor.fetchall():
-        # Start-Zeit korrekt für JavaScript formatieren
-        start_zeit = sitzung['start_zeit']
-        if isinstance(start_zeit, datetime):
-            if start_zeit.tzinfo is None:
-                # Keine Timezone = UTC annehmen
-                start_zeit = pytz.UTC.localize(start_zeit)
-            start_iso = start_zeit.isoformat()
-        else:
-            # String-Format zu ISO mit Z-Suffix
-            start_iso = str(start_zeit).replace(' ', 'T') + 'Z'
+    # Für das Template/JavaScript als einheitliche UTC-Strings
+    projekt['erstellt_am'] = zeit.iso_utc(projekt['erstellt_am'])
+    projekt['beendet_am'] = zeit.iso_utc(projekt['beendet_am'])
 
-        aktive_sitzungen[sitzung['mitarbeiter']] = {
-            'teilbereich': sitzung['teilbereich'],
-            'start': start_iso,
-            'dauer': berechne_aktuelle_dauer(sitzung['start_zeit'])
-        }
-    
-    projekt['aktive_sitzungen'] = aktive_sitzungen
-    
-    # Teilbereiche laden
-    teilbereiche = {}
-    for tb in TEILBEREICHE:
-        cursor.execute('''
-            SELECT mitarbeiter, start_zeit, end_zeit, dauer_minuten 
-            FROM sitzungen 
-            WHERE projekt_id = %s AND teilbereich = %s
-            ORDER BY start_zeit DESC
-        ''', (projekt_id, tb))
-        
-        sitzungen = []
-        gesamt_minuten = 0
-        
-        for sitzung in cursor.fetchall():
-            sitzung_dict = {
-                'mitarbeiter': sitzung['mitarbeiter'],
-                'start': sitzung['start_zeit'].isoformat(),
-                'end': sitzung['end_zeit'].isoformat(),
-                'dauer_minuten': sitzung['dauer_minuten']
-            }
-            sitzungen.append(sitzung_dict)
-            gesamt_minuten += sitzung['dauer_minuten']
-        
-        teilbereiche[tb] = {
-            'sitzungen': sitzungen,
-            'gesamt_minuten': gesamt_minuten
+    seiten = None
+    if seite:
+        seiten = {
+            'aktuell': seite,
+            'gesamt': max(1, -(-projekt['anzahl_sitzungen'] // pro_seite)),
+            'pro_seite': pro_seite
         }
-    
-    projekt['teilbereiche'] = teilbereiche
-    
-    # Datumskonvertierung
-    if projekt['erstellt_am']:
-        projekt['erstellt_am'] = projekt['erstellt_am'].isoformat()
-    if projekt['beendet_am']:
-        projekt['beendet_am'] = projekt['beendet_am'].isoformat()
-    
-    conn.close()
-    
+
     mitarbeiter = load_mitarbeiter()
     return render_template('projekt_details.html',
                          projekt=projekt,
                          teilbereiche=TEILBEREICHE,
                          mitarbeiter=mitarbeiter,
+                         seiten=seiten,
+                         live_seit=live_seit,
                          benutzer_name=session['benutzer_name'])
 
 
+def _live_stand(projekt_id):
+    # ID vor dem Lesen - was danach committet wird, kommt als Ereignis nach
+    stand_id = jetzt_id()
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        aktive = lade_live_stand(cursor, projekt_id)
+    return {'id': stand_id, 'projekt_id': projekt_id, 'typ': 'stand', 'aktive': aktive}
+
+
+@app.route('/projekt/<int:projekt_id>/live')
+@login_required
+def projekt_live(projekt_id):
+    """Server-Sent Events: Starts und Stopps der aktiven Sitzungen"""
+    if not darf_projekt_id_sehen(projekt_id):
+        return "Keine Berechtigung für dieses Projekt", 403
+
+    # Alle Live-Plätze dieses Workers belegt - der Browser wechselt auf Long-Poll
+    if not platz_belegen():
+        return Response('Zu viele Live-Verbindungen\n', status=503, mimetype='text/plain')
+
+    try:
+        verteiler = get_verteiler()
+        seit = request.headers.get('Last-Event-ID', type=int) or request.args.get('seit', 0, type=int)
+
+        # Nur bei Lücke (neuer Worker, Puffer übergelaufen) den Stand neu laden
+        stand = None
+        if verteiler.luecke(seit):
+            stand = _live_stand(projekt_id)
+            seit = stand['id']
+    except Exception:
+        platz_freigeben()
+        raise
+
+    antwort = Response(sse_stream(projekt_id, seit, stand),
+                       mimetype='text/event-stream',
+                       headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    antwort.call_on_close(platz_freigeben)
+    return antwort
+
+
+@app.route('/projekt/<int:projekt_id>/live/poll')
+@login_required
+def projekt_live_poll(projekt_id):
+    """Long-Poll-Fallback für Clients ohne SSE: wartet bis zu 25s auf Ereignisse (wenn ein Platz frei ist)"""
+    if not darf_projekt_id_sehen(projekt_id):
+        return jsonify({'status': 'error', 'message': 'Keine Berechtigung'}), 403
+
+    verteiler = get_verteiler()
+    seit = request.args.get('seit', 0, type=int)
+
+    if verteiler.luecke(seit):
+        stand = _live_stand(projekt_id)
+        return jsonify({'status': 'success', 'stand': stand, 'ereignisse': [], 'seit': stand['id'], 'pause': 0})
+
+    # Ohne freien Live-Platz nicht warten - der Client fragt nach `pause` Sekunden wieder
+    pause = 0
+    if platz_belegen():
+        try:
+            ereignisse = verteiler.warten(projekt_id, seit)
+        finally:
+            platz_freigeben()
+    else:
+        ereignisse = verteiler.warten(projekt_id, seit, timeout=0)
+        pause = POLL_PAUSE
+
+    if ereignisse:
+        seit = ereignisse[-1]['id']
+    return jsonify({'status': 'success', 'stand': None, 'ereignisse': ereignisse, 'seit': seit, 'pause': pause})
+
+
 @app.route('/projekt/<int:projekt_id>/aktivität/starten', methods=['POST'])
 @login_required
 def aktivität_starten(projekt_id):
     mitarbeiter = request.form['mitarbeiter']
     teilbereich = request.form['teilbereich']
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Prüfen ob Mitarbeiter bereits aktiv
-    cursor.execute('SELECT id FROM aktive_sitzungen WHERE projekt_id = %s AND mitarbeiter = %s', 
-                   (projekt_id, mitarbeiter))
-    if cursor.fetchone():
-        conn.close()
-        return jsonify({'status': 'error', 'message': f'{mitarbeiter} arbeitet bereits'})
+    # Ein Statement: INSERT ... ON CONFLICT, Projekt-Update, NOTIFY (aktivitaet.py)
+    with db_verbindung() as conn:
+        status, ereignis = sitzung_starten(conn.cursor(), projekt_id, mitarbeiter, teilbereich)
 
-    jetzt = datetime.now(pytz.UTC)
-    
-    # Aktive Sitzung einfügen
-    cursor.execute('''
-        INSERT INTO aktive_sitzungen (projekt_id, mitarbeiter, teilbereich, start_zeit)
-        VALUES (%s, %s, %s, %s)
-    ''', (projekt_id, mitarbeiter, teilbereich, jetzt))
-    
-    # Projekt-Status auf laufend setzen
-    cursor.execute('''
-        UPDATE projekte 
-        SET status = 'laufend', letzter_start = %s
-        WHERE id = %s
-    ''', (jetzt, projekt_id))
-    
-    # Erster Start setzen falls noch nicht gesetzt
-    cursor.execute('''
-        UPDATE projekte 
-        SET erster_start = %s
-        WHERE id = %s AND erster_start IS NULL
-    ''', (jetzt, projekt_id))
-    
-    conn.commit()
-    conn.close()
+    if status == 'arbeitet bereits':
+        return jsonify({'status': 'error', 'message': f'{mitarbeiter} arbeitet bereits'})
+    if status == 'Projekt beendet':
+        return jsonify({'status': 'error', 'message': 'Projekt ist bereits beendet'})
+    if status == 'nicht gefunden':
+        return jsonify({'status': 'error', 'message': 'Projekt nicht gefunden'})
 
-    return jsonify({'status': 'success'})
+    return jsonify({'status': 'success', 'sitzung': ereignis})
 
 
 @app.route('/projekt/<int:projekt_id>/aktivität/beenden', methods=['POST'])
 @login_required
 def aktivität_beenden(projekt_id):
     try:
-        print(f"Beende Aktivität für Projekt {projekt_id}")
-        
         # Mitarbeiter aus Form holen
         mitarbeiter = request.form.get('mitarbeiter')
         if not mitarbeiter:
             return jsonify({'status': 'error', 'message': 'Mitarbeiter fehlt'})
         
-        print(f"Mitarbeiter: {mitarbeiter}")
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Aktive Sitzung finden
-        cursor.execute('''
-            SELECT teilbereich, start_zeit FROM aktive_sitzungen 
-            WHERE projekt_id = %s AND mitarbeiter = %s
-        ''', (projekt_id, mitarbeiter))
-        
-        aktive_sitzung = cursor.fetchone()
-        print(f"Aktive Sitzung gefunden: {aktive_sitzung}")
-        
-        if not aktive_sitzung:
-            conn.close()
+        # Ein Statement: Sitzung buchen, Rollup, Zähler, Status, NOTIFY (aktivitaet.py)
+        with db_verbindung() as conn:
+            beendet = sitzung_beenden(conn.cursor(), projekt_id, mitarbeiter)
+
+        if not beendet:
             return jsonify({'status': 'error', 'message': 'Keine aktive Sitzung gefunden'})
 
-        # Jetzige Zeit
-        end_zeit = datetime.now(pytz.UTC)
-        start_zeit = aktive_sitzung['start_zeit']
-        
-        print(f"Start: {start_zeit}, End: {end_zeit}")
-        
-        # Timezone handling
-        if isinstance(start_zeit, str):
-            start_zeit = datetime.fromisoformat(start_zeit.replace('Z', '+00:00'))
-        elif start_zeit.tzinfo is None:
-            start_zeit = pytz.UTC.localize(start_zeit)
-        
-        # Dauer berechnen
-        time_diff = end_zeit - start_zeit
-        dauer_minuten = max(1, int(time_diff.total_seconds() / 60))
-        
-        print(f"Dauer: {dauer_minuten} Minuten")
+        ereignis = beendet['ereignis']
+        dauer_minuten = beendet['dauer_minuten']
 
-        # Sitzung in beendete Sitzungen einfügen
-        cursor.execute('''
-            INSERT INTO sitzungen (projekt_id, mitarbeiter, teilbereich, start_zeit, end_zeit, dauer_minuten)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        ''', (projekt_id, mitarbeiter, aktive_sitzung['teilbereich'], 
-              start_zeit, end_zeit, dauer_minuten))
-        
-        print("Sitzung in DB eingefügt")
-        
-        # Aktive Sitzung löschen
-        cursor.execute('''
-            DELETE FROM aktive_sitzungen 
-            WHERE projekt_id = %s AND mitarbeiter = %s
-        ''', (projekt_id, mitarbeiter))
-        
-        deleted_rows = cursor.rowcount
-        print(f"Aktive Sitzungen gelöscht: {deleted_rows}")
-        
-        # Prüfen ob noch aktive Sitzungen vorhanden - FIXED
-        cursor.execute('SELECT COUNT(*) as count FROM aktive_sitzungen WHERE projekt_id = %s', (projekt_id,))
-        result = cursor.fetchone()
-        aktive_count = result['count'] if result else 0
-        print(f"Verbleibende aktive Sitzungen: {aktive_count}")
-        
-        if aktive_count == 0:
-            cursor.execute('UPDATE projekte SET status = %s WHERE id = %s', ('pausiert', projekt_id))
-            print("Projekt-Status auf 'pausiert' gesetzt")
-        
-        conn.commit()
-        conn.close()
-        
         # Dauer-Text erstellen
         stunden = dauer_minuten // 60
         minuten = dauer_minuten % 60
@@ -490,26 +478,22 @@ def aktivität_beenden(projekt_id):
         else:
             dauer_text = f"{minuten}m"
 
-        print(f"Erfolgreich beendet: {dauer_text}")
+        log.info('Aktivität beendet', extra=felder(
+            projekt_id=projekt_id, mitarbeiter=mitarbeiter,
+            teilbereich=ereignis['teilbereich'], dauer_minuten=dauer_minuten,
+            projekt_pausiert=beendet['projekt_pausiert']
+        ))
         
         return jsonify({
             'status': 'success',
             'message': 'Aktivität beendet',
             'dauer_text': dauer_text,
-            'dauer_minuten': dauer_minuten
+            'dauer_minuten': dauer_minuten,
+            'sitzung': ereignis
         })
         
     except Exception as e:
-        print(f"FEHLER in aktivität_beenden: {str(e)}")
-        print(f"Exception type: {type(e).__name__}")
-        import traceback
-        traceback.print_exc()
-        
-        if 'conn' in locals():
-            try:
-                conn.close()
-            except:
-                pass
+        log.exception('Fehler in aktivität_beenden', extra=felder(projekt_id=projekt_id))
                 
         return jsonify({
             'status': 'error', 
@@ -518,53 +502,96 @@ def aktivität_beenden(projekt_id):
         })
 
 
+@app.route('/aktivitäten', methods=['POST'])
+@login_required
+def aktivitäten_sammel():
+    """Mehrere Mitarbeiter (auch auf mehreren Projekten) in einer Transaktion starten/stoppen"""
+    try:
+        aktionen, ergebnisse = aktionen_lesen((request.get_json(silent=True) or {}).get('aktionen'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    try:
+        if aktionen:
+            with db_verbindung() as conn:
+                aktionen_ausfuehren(conn.cursor(), aktionen, ergebnisse, ersteller=ersteller_filter())
+    except Exception as e:
+        log.exception('Fehler in der Sammel-Aktion', extra=felder(aktionen=len(ergebnisse)))
+        return jsonify({'status': 'error', 'message': f'Server-Fehler: {str(e)}'}), 500
+
+    log.info('Sammel-Aktion', extra=felder(
+        aktionen=len(ergebnisse),
+        erfolgreich=sum(1 for e in ergebnisse if e['status'] in ('gestartet', 'beendet'))
+    ))
+    return jsonify({'status': 'success', 'ergebnisse': ergebnisse})
+
+
+@app.route('/aktivitäten/ereignisse', methods=['POST'])
+@login_required
+def aktivitäten_ereignisse():
+    """Upload der Offline-Warteschlange - jeder Schlüssel wird höchstens einmal ausgeführt"""
+    try:
+        aktionen, ergebnisse = aktionen_lesen((request.get_json(silent=True) or {}).get('ereignisse'),
+                                              mit_schluessel=True)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    try:
+        if aktionen:
+            with db_verbindung() as conn:
+                ereignisse_ausfuehren(conn.cursor(), aktionen, ergebnisse, session.get('benutzer_email'),
+                                      ersteller=ersteller_filter())
+    except Exception as e:
+        log.exception('Fehler beim Einspielen der Offline-Ereignisse', extra=felder(ereignisse=len(ergebnisse)))
+        return jsonify({'status': 'error', 'message': f'Server-Fehler: {str(e)}'}), 500
+
+    log.info('Offline-Ereignisse eingespielt', extra=felder(
+        ereignisse=len(ergebnisse),
+        wiederholt=sum(1 for e in ergebnisse if e.get('wiederholt'))
+    ))
+    return jsonify({'status': 'success', 'ergebnisse': ergebnisse})
+
+
 @app.route('/projekte/<int:projekt_id>/beenden', methods=['POST'])
 @login_required
 def projekt_beenden(projekt_id):
     try:
-        print(f"🏁 BEENDEN-REQUEST für Projekt ID: {projekt_id}")
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Erst prüfen ob Projekt existiert und Namen holen
-        cursor.execute('SELECT id, name, status FROM projekte WHERE id = %s', (projekt_id,))
-        projekt_row = cursor.fetchone()
-        
-        if not projekt_row:
-            conn.close()
-            return jsonify({
-                'status': 'error', 
-                'message': f'Projekt {projekt_id} nicht gefunden'
-            }), 404
-        
-        # ✅ SICHERER ZUGRIFF AUF PROJEKT-DATEN
-        projekt = dict(projekt_row)
-        projekt_name = projekt['name']
-        
-        print(f"📋 Gefundenes Projekt: {projekt}")
-        
-        # Alle aktiven Sitzungen für dieses Projekt beenden
-        cursor.execute('SELECT COUNT(*) as count FROM aktive_sitzungen WHERE projekt_id = %s', (projekt_id,))
-        aktive_count = cursor.fetchone()['count']
-        
-        if aktive_count > 0:
-            print(f"⚠️ Beende {aktive_count} aktive Sitzungen")
-            cursor.execute('DELETE FROM aktive_sitzungen WHERE projekt_id = %s', (projekt_id,))
-        
-        # Status auf 'beendet' setzen
-        cursor.execute(
-            'UPDATE projekte SET status = %s, beendet_am = %s WHERE id = %s', 
-            ('beendet', datetime.now().isoformat(), projekt_id)
-        )
-        
-        affected_rows = cursor.rowcount
-        print(f"📝 Betroffene Zeilen: {affected_rows}")
-        
-        conn.commit()
-        conn.close()
+        with db_verbindung() as conn:
+            cursor = conn.cursor()
+
+            # Erst prüfen ob Projekt existiert und Namen holen
+            cursor.execute('SELECT id, name, status, ersteller FROM projekte WHERE id = %s', (projekt_id,))
+            projekt_row = cursor.fetchone()
+
+            if not projekt_row:
+                return jsonify({
+                    'status': 'error', 
+                    'message': f'Projekt {projekt_id} nicht gefunden'
+                }), 404
+
+            # ✅ SICHERER ZUGRIFF AUF PROJEKT-DATEN
+            projekt = dict(projekt_row)
+            projekt_name = projekt['name']
+
+            # Alle aktiven Sitzungen für dieses Projekt beenden
+            cursor.execute('SELECT COUNT(*) as count FROM aktive_sitzungen WHERE projekt_id = %s', (projekt_id,))
+            aktive_count = cursor.fetchone()['count']
+
+            if aktive_count > 0:
+                cursor.execute('DELETE FROM aktive_sitzungen WHERE projekt_id = %s', (projekt_id,))
+                aktive_verworfen(cursor, projekt_id)
+
+            # Status auf 'beendet' setzen
+            beendet_am = zeit.jetzt()
+            cursor.execute(
+                'UPDATE projekte SET status = %s, beendet_am = %s WHERE id = %s', 
+                ('beendet', beendet_am, projekt_id)
+            )
+
+            # Projekt erscheint ab jetzt in Gesamt-/Vollberichten mit diesem Datum
+            berichte_geaendert(cursor, [aenderung(projekt_id, projekt['ersteller'], beendet_am=beendet_am)])
         
-        print(f"✅ Projekt {projekt_id} erfolgreich beendet")
+        log.info('Projekt beendet', extra=felder(projekt_id=projekt_id, aktive_sitzungen_verworfen=aktive_count))
         
         return jsonify({
             'status': 'success',
@@ -572,15 +599,7 @@ def projekt_beenden(projekt_id):
         })
         
     except Exception as e:
-        print(f"❌ FEHLER beim Beenden von Projekt {projekt_id}: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        
-        if 'conn' in locals():
-            try:
-                conn.close()
-            except:
-                pass
+        log.exception('Fehler beim Beenden des Projekts', extra=felder(projekt_id=projekt_id))
         
         return jsonify({
             'status': 'error',
@@ -596,17 +615,15 @@ def mitarbeiter_hinzufügen():
     if not name:
         return jsonify({'status': 'error', 'message': 'Name ist erforderlich'})
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('INSERT INTO mitarbeiter (name) VALUES (%s)', (name,))
-        conn.commit()
-        return jsonify({'status': 'success'})
+        with db_verbindung() as conn:
+            cursor = conn.cursor()
+            cursor.execute('INSERT INTO mitarbeiter (name) VALUES (%s)', (name,))
+            stammdaten_geaendert(cursor, 'mitarbeiter')
     except:
         return jsonify({'status': 'error', 'message': 'Mitarbeiter existiert bereits'})
-    finally:
-        conn.close()
+    stammdaten_invalidieren('mitarbeiter')
+    return jsonify({'status': 'success'})
 
 
 #Mitarbeiter löschen
@@ -614,11 +631,11 @@ def mitarbeiter_hinzufügen():
 @login_required
 def mitarbeiter_löschen():
     name = request.form['name']
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM mitarbeiter WHERE name = %s', (name,))
-    conn.commit()
-    conn.close()
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM mitarbeiter WHERE name = %s', (name,))
+        stammdaten_geaendert(cursor, 'mitarbeiter')
+    stammdaten_invalidieren('mitarbeiter')
     return jsonify({'status': 'success'})
 
 
@@ -630,17 +647,15 @@ def kunde_hinzufügen():
     if not name:
         return jsonify({'status': 'error', 'message': 'Name ist erforderlich'})
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('INSERT INTO kunden (name) VALUES (%s)', (name,))
-        conn.commit()
-        return jsonify({'status': 'success'})
+        with db_verbindung() as conn:
+            cursor = conn.cursor()
+            cursor.execute('INSERT INTO kunden (name) VALUES (%s)', (name,))
+            stammdaten_geaendert(cursor, 'kunden')
     except:
         return jsonify({'status': 'error', 'message': 'Kunde existiert bereits'})
-    finally:
-        conn.close()
+    stammdaten_invalidieren('kunden')
+    return jsonify({'status': 'success'})
 
 
 #Kunde löschen
@@ -648,11 +663,11 @@ def kunde_hinzufügen():
 @login_required
 def kunde_löschen():
     name = request.form['name']
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM kunden WHERE name = %s', (name,))
-    conn.commit()
-    conn.close()
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM kunden WHERE name = %s', (name,))
+        stammdaten_geaendert(cursor, 'kunden')
+    stammdaten_invalidieren('kunden')
     return jsonify({'status': 'success'})
 
 
@@ -660,18 +675,55 @@ def kunde_löschen():
 @app.route('/projekte/löschen', methods=['POST'])
 @login_required
 def projekte_löschen():
-    projekt_ids = request.json.get('projekt_ids', [])
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    for projekt_id in projekt_ids:
-        cursor.execute('DELETE FROM projekte WHERE id = %s', (projekt_id,))
-    
-    conn.commit()
-    conn.close()
-    
-    return jsonify({'status': 'success'})
+    try:
+        projekt_ids, ergebnisse = projekt_ids_lesen((request.get_json(silent=True) or {}).get('projekt_ids'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        geloescht, betroffen = projekte_loeschen(cursor, projekt_ids, ersteller=ersteller_filter())
+        ergebnisse.update(geloescht)
+        if betroffen:
+            berichte_geaendert(cursor, [aenderung(**p) for p in betroffen])
+
+    return jsonify({'status': 'success', 'ergebnisse': ergebnisse})
+
+
+#Export Roh-Sitzungen (CSV)
+@app.route('/export/sitzungen.csv')
+@login_required
+def export_sitzungen_csv():
+    """Alle Sitzungen im Zeitraum als CSV - gleiche Zeitraum- und Team-Regeln wie die Vorschau"""
+    von_datum_str = request.args.get('von', '')
+    bis_datum_str = request.args.get('bis', '')
+
+    if not von_datum_str or not bis_datum_str:
+        return jsonify({'status': 'error', 'message': 'Von- und Bis-Datum sind erforderlich'}), 400
+
+    try:
+        von_datum = parse_datum(von_datum_str)
+        bis_datum = parse_datum(bis_datum_str)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    if von_datum > bis_datum:
+        return jsonify({'status': 'error', 'message': 'Von-Datum darf nicht nach Bis-Datum liegen'}), 400
+
+    ersteller = ersteller_filter()
+    itersize = request.args.get('itersize', EXPORT_ITERSIZE, type=int)
+
+    def erzeugen():
+        with db_verbindung() as conn:
+            yield from sitzungen_csv(conn, von_datum, bis_datum, ersteller=ersteller, itersize=itersize)
+
+    dateiname = f"sitzungen_{von_datum:%Y-%m-%d}_{bis_datum:%Y-%m-%d}.csv"
+    return Response(stream_with_context(erzeugen()),
+                    mimetype='text/csv',
+                    headers={
+                        'Content-Disposition': f'attachment; filename="{dateiname}"',
+                        'X-Accel-Buffering': 'no'
+                    })
 
 
 #Export-Vorschau
@@ -684,7 +736,7 @@ def export_vorschau():
         bis_datum_str = request.form.get('bis_datum', '')
         format_type = request.form.get('format', 'pdf')
         
-        print(f"Export-Vorschau Request: von={von_datum_str}, bis={bis_datum_str}, format={format_type}")
+        log.debug('Export-Vorschau', extra=felder(von=von_datum_str, bis=bis_datum_str, format=format_type))
         
         # Validierung der Eingaben
         if not von_datum_str or not bis_datum_str:
@@ -693,19 +745,9 @@ def export_vorschau():
                 'message': 'Von- und Bis-Datum sind erforderlich'
             })
         
-        # Datum parsen - mehrere Formate unterstützen
-        def parse_date(date_str):
-            formats = ['%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y']
-            for fmt in formats:
-                try:
-                    return datetime.strptime(date_str, fmt)
-                except ValueError:
-                    continue
-            raise ValueError(f"Ungültiges Datumsformat: {date_str}")
-        
         try:
-            von_datum = parse_date(von_datum_str)
-            bis_datum = parse_date(bis_datum_str)
+            von_datum = parse_datum(von_datum_str)
+            bis_datum = parse_datum(bis_datum_str)
         except ValueError as e:
             return jsonify({
                 'status': 'error',
@@ -722,103 +764,38 @@ def export_vorschau():
                 'message': 'Von-Datum darf nicht nach Bis-Datum liegen'
             })
         
-        # Datenbank-Verbindung
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Benutzer-Berechtigung prüfen
-        benutzer_email = session.get('benutzer_email')
-        if not benutzer_email:
-            conn.close()
-            return jsonify({
-                'status': 'error',
-                'message': 'Nicht angemeldet'
-            })
-        
-        cursor.execute('SELECT team_code_verwendet FROM benutzer WHERE email = %s', (benutzer_email,))
-        benutzer_info = cursor.fetchone()
-        user_team_code = benutzer_info['team_code_verwendet'] if benutzer_info else None
-        
-        # Team-Code definieren (falls nicht vorhanden)
-        TEAM_CODE = "MASTER2024"  # Passen Sie dies an Ihren Code an
-        
-        # Projekte mit Sitzungen im Zeitraum laden
-        if user_team_code == TEAM_CODE:
-            # Admin kann alle Projekte sehen
-            projekte_query = '''
-                SELECT DISTINCT p.* FROM projekte p 
-                JOIN sitzungen s ON p.id = s.projekt_id 
-                WHERE s.start_zeit >= %s AND s.start_zeit <= %s
-                ORDER BY p.name
-            '''
-            cursor.execute(projekte_query, (von_datum, bis_datum))
-        else:
-            # Normale Benutzer nur ihre eigenen Projekte
-            projekte_query = '''
-                SELECT DISTINCT p.* FROM projekte p 
-                JOIN sitzungen s ON p.id = s.projekt_id 
-                WHERE p.ersteller = %s AND s.start_zeit >= %s AND s.start_zeit <= %s
-                ORDER BY p.name
-            '''
-            cursor.execute(projekte_query, (benutzer_email, von_datum, bis_datum))
-        
-        projekte_rows = cursor.fetchall()
-        projekte_data = []
-        gesamt_minuten_periode = 0
-        
-        for projekt_row in projekte_rows:
-            projekt = dict(projekt_row)
-            
-            # Sitzungen für dieses Projekt im Zeitraum laden
-            cursor.execute('''
-                SELECT mitarbeiter, teilbereich, start_zeit, end_zeit, dauer_minuten 
-                FROM sitzungen 
-                WHERE projekt_id = %s AND start_zeit >= %s AND start_zeit <= %s
-                AND end_zeit IS NOT NULL
-                ORDER BY start_zeit ASC
-            ''', (projekt['id'], von_datum, bis_datum))
-            
-            sitzungen = cursor.fetchall()
-            
-            if not sitzungen:  # Überspringen wenn keine abgeschlossenen Sitzungen
-                continue
+        # Team-Mitglieder sehen alle Projekte, andere nur ihre eigenen
+        ersteller = ersteller_filter()
+        schluessel = bericht_schluessel('vorschau', ersteller, von_datum, bis_datum)
+        eintrag, stand = bericht_holen(schluessel)
+
+        if eintrag is None:
+            # Datenbank-Verbindung
+            with db_verbindung() as conn:
+                cursor = conn.cursor()
             
-            # Daten nach Mitarbeiter gruppieren
-            mitarbeiter_stats = {}
-            gesamt_minuten_projekt = 0
+                # Summen je Projekt/Mitarbeiter/Teilbereich in einer Abfrage
+                projekte = lade_projekt_summen(
+                    cursor,
+                    sitzungen_von=von_datum,
+                    sitzungen_bis=bis_datum,
+                    ersteller=ersteller
+                )
             
-            for sitzung in sitzungen:
-                mitarbeiter = sitzung['mitarbeiter']
-                teilbereich = sitzung['teilbereich']
-                minuten = sitzung['dauer_minuten'] or 0
-                
-                if mitarbeiter not in mitarbeiter_stats:
-                    mitarbeiter_stats[mitarbeiter] = {
-                        'besprechung': 0,
-                        'zeichnung': 0,
-                        'aufmass': 0,
-                        'gesamt': 0
-                    }
-                
-                mitarbeiter_stats[mitarbeiter][teilbereich] += minuten
-                mitarbeiter_stats[mitarbeiter]['gesamt'] += minuten
-                gesamt_minuten_projekt += minuten
-            
-            projekt_dict = {
+            projekte_data = [{
                 'id': projekt['id'],
                 'name': projekt['name'],
                 'kunde': projekt['kunde'],
-                'mitarbeiter_stats': mitarbeiter_stats,
-                'gesamt_minuten': gesamt_minuten_projekt
-            }
-            
-            projekte_data.append(projekt_dict)
-            gesamt_minuten_periode += gesamt_minuten_projekt
-        
-        conn.close()
+                'mitarbeiter_stats': projekt['mitarbeiter_stats'],
+                'gesamt_minuten': projekt['gesamt_minuten']
+            } for projekt in projekte]
+            eintrag = bericht_speichern(schluessel, json.dumps(projekte_data), 'application/json', stand)
+
+        projekte_data = json.loads(eintrag['body'])
+        gesamt_minuten_periode = sum(p['gesamt_minuten'] for p in projekte_data)
         
-        # Erfolgreiche Response zurückgeben
-        return jsonify({
+        # Erfolgreiche Response zurückgeben (ETag des gecachten Stands)
+        antwort = jsonify({
             'status': 'success',
             'projekte': projekte_data,
             'gesamt_minuten': gesamt_minuten_periode,
@@ -828,11 +805,11 @@ def export_vorschau():
             'format': format_type,
             'zeitraum_text': f"{von_datum.strftime('%d.%m.%Y')} bis {bis_datum.strftime('%d.%m.%Y')}"
         })
+        antwort.set_etag(eintrag['etag'])
+        return antwort
         
     except Exception as e:
-        print(f"Fehler bei Export-Vorschau: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception('Fehler bei Export-Vorschau')
         return jsonify({
             'status': 'error', 
             'message': f'Server-Fehler: {str(e)}'
@@ -844,113 +821,36 @@ def export_vorschau():
 @login_required
 def projekt_bericht(projekt_id):
     try:
-        print(f"📊 Bericht für Projekt {projekt_id}")
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        schluessel = bericht_schluessel('projekt', projekt_id)
+        eintrag, stand = bericht_holen(schluessel)
+        if eintrag is not None:
+            return bericht_antwort(eintrag)
         
-        # ✅ PROJEKT-DETAILS HOLEN
-        cursor.execute('SELECT id, name, kunde, status, erstellt_am, beendet_am FROM projekte WHERE id = %s', (projekt_id,))
-        projekt_row = cursor.fetchone()
-        
-        if not projekt_row:
-            conn.close()
+        with db_verbindung() as conn:
+            cursor = conn.cursor()
+
+            # ✅ PROJEKT + SUMMEN IN EINEM ROUND-TRIP (ohne Sitzungsliste)
+            projekt = lade_projekt_aggregat(cursor, projekt_id, limit=0)
+
+        if not projekt:
             return "Projekt nicht gefunden", 404
-        
-        projekt = dict(projekt_row)
-        print(f"📋 Projekt gefunden: {projekt['name']}")
-        
-        # ✅ ALLE SITZUNGEN FÜR DIESES PROJEKT
-        cursor.execute('''
-            SELECT mitarbeiter, teilbereich, start_zeit, end_zeit, dauer_minuten
-            FROM sitzungen 
-            WHERE projekt_id = %s
-            ORDER BY start_zeit ASC
-        ''', (projekt_id,))
-        
-        sitzungen = cursor.fetchall()
-        print(f"📊 {len(sitzungen)} Sitzungen gefunden")
-        
-        # ✅ DATEN AUFBEREITEN
-        mitarbeiter_stats = {}
+
+        mitarbeiter_stats = projekt['mitarbeiter_stats']
         teilbereiche_gesamt = {
-            'besprechung': {'gesamt_minuten': 0, 'anzahl_sitzungen': 0},
-            'zeichnung': {'gesamt_minuten': 0, 'anzahl_sitzungen': 0},
-            'aufmass': {'gesamt_minuten': 0, 'anzahl_sitzungen': 0}
+            tb: {
+                'gesamt_minuten': projekt['teilbereiche'][tb]['gesamt_minuten'],
+                'anzahl_sitzungen': projekt['teilbereiche'][tb]['anzahl_sitzungen']
+            }
+            for tb in TEILBEREICHE
         }
+        gesamt_minuten = projekt['gesamt_minuten']
+        start_datum = projekt['erste_sitzung']
+        end_datum = projekt['letzte_sitzung']
         
-        gesamt_minuten = 0
-        start_datum = None
-        end_datum = None
-        
-        for sitzung in sitzungen:
-            mitarbeiter = sitzung['mitarbeiter']
-            teilbereich = sitzung['teilbereich'].lower().strip()
-            minuten = sitzung['dauer_minuten'] or 0
-            
-            # Datum tracking
-            if sitzung['start_zeit']:
-                if start_datum is None or sitzung['start_zeit'] < start_datum:
-                    start_datum = sitzung['start_zeit']
-                if end_datum is None or sitzung['start_zeit'] > end_datum:
-                    end_datum = sitzung['start_zeit']
-            
-            # Mitarbeiter initialisieren
-            if mitarbeiter not in mitarbeiter_stats:
-                mitarbeiter_stats[mitarbeiter] = {
-                    'besprechung': 0,
-                    'zeichnung': 0,
-                    'aufmass': 0,
-                    'gesamt': 0,
-                    'sitzungen': 0
-                }
-            
-            # Teilbereich zuordnen
-            if teilbereich in ['besprechung', 'zeichnung', 'aufmass']:
-                mitarbeiter_stats[mitarbeiter][teilbereich] += minuten
-                mitarbeiter_stats[mitarbeiter]['gesamt'] += minuten
-                mitarbeiter_stats[mitarbeiter]['sitzungen'] += 1
-                
-                teilbereiche_gesamt[teilbereich]['gesamt_minuten'] += minuten
-                teilbereiche_gesamt[teilbereich]['anzahl_sitzungen'] += 1
-                
-            elif teilbereich == 'aufmaß':
-                mitarbeiter_stats[mitarbeiter]['aufmass'] += minuten
-                mitarbeiter_stats[mitarbeiter]['gesamt'] += minuten
-                mitarbeiter_stats[mitarbeiter]['sitzungen'] += 1
-                
-                teilbereiche_gesamt['aufmass']['gesamt_minuten'] += minuten
-                teilbereiche_gesamt['aufmass']['anzahl_sitzungen'] += 1
-            
-            gesamt_minuten += minuten
-        
-        # ✅ ZEIT FORMATIERUNG
-        def format_minuten(minuten):
-            if minuten < 60:
-                return f"{minuten}min"
-            stunden = minuten // 60
-            rest_min = minuten % 60
-            if rest_min == 0:
-                return f"{stunden}h"
-            return f"{stunden}h {rest_min}min"
-        
-        # ✅ KALENDERTAGE BERECHNEN
+        # ✅ KALENDERTAGE BERECHNEN (lokale Tage)
         kalendertage = 0
         if start_datum and end_datum:
-            try:
-                if isinstance(start_datum, str):
-                    start_dt = datetime.fromisoformat(start_datum.replace('Z', '+00:00'))
-                else:
-                    start_dt = start_datum
-                
-                if isinstance(end_datum, str):
-                    end_dt = datetime.fromisoformat(end_datum.replace('Z', '+00:00'))
-                else:
-                    end_dt = end_datum
-                
-                kalendertage = (end_dt.date() - start_dt.date()).days + 1
-            except:
-                kalendertage = 1
+            kalendertage = (zeit.lokaler_tag(end_datum) - zeit.lokaler_tag(start_datum)).days + 1
         
         # ✅ MITARBEITER DATEN FORMATIEREN
         mitarbeiter_formatted = {}
@@ -973,283 +873,64 @@ def projekt_bericht(projekt_id):
             'teilbereiche': teilbereiche_gesamt
         }
         
-        conn.close()
-        
-        print(f"✅ Bericht erstellt: {gesamt_minuten} min, {len(mitarbeiter_stats)} Mitarbeiter")
+        log.debug('Projekt-Bericht erstellt', extra=felder(
+            projekt_id=projekt_id, sitzungen=projekt['anzahl_sitzungen'], gesamt_minuten=gesamt_minuten
+        ))
         
-        # ✅ TEMPLATE RENDERN
-        return render_template('bericht.html', 
+        # ✅ TEMPLATE RENDERN (und für Wiederholungen cachen)
+        html = render_template('bericht.html', 
                              projekt=projekt,
                              bericht=bericht_data)
+        return bericht_antwort(bericht_speichern(schluessel, html, 'text/html', stand))
         
     except Exception as e:
-        print(f"❌ Fehler beim Bericht: {e}")
+        log.exception('Fehler beim Projekt-Bericht', extra=felder(projekt_id=projekt_id))
         import traceback
-        traceback.print_exc()
         return f"<h1>❌ Fehler beim Laden des Berichts</h1><p>{str(e)}</p><pre>{traceback.format_exc()}</pre>", 500
  #Gesamt-Bericht mit sicherer ID-Extraktion   
 
 
 @app.route('/gesamt-bericht')
 def gesamt_bericht():
-    """Gesamt-Bericht mit korrekter Zeit-Berechnung"""
-    try:
-        von_datum_str = request.args.get('von', '2024-01-01')
-        bis_datum_str = request.args.get('bis', '2025-12-31')
-        
-        print(f"📊 Gesamt-Bericht: {von_datum_str} bis {bis_datum_str}")
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # ✅ BEENDETE PROJEKTE IM ZEITRAUM HOLEN
-        cursor.execute('''
-            SELECT id, name, kunde, status, beendet_am, erstellt_am
-            FROM projekte 
-            WHERE status = 'beendet' 
-            AND beendet_am IS NOT NULL
-            AND DATE(beendet_am) BETWEEN %s AND %s
-            ORDER BY beendet_am DESC
-        ''', (von_datum_str, bis_datum_str))
-        
-        beendete_projekte = cursor.fetchall()
-        print(f"🔍 Gefundene beendete Projekte: {len(beendete_projekte)}")
-        
-        projekte_data = []
-        
-        # ✅ GESAMT-ZEITEN FÜR ALLE TEILBEREICHE
-        gesamt_teilbereiche = {
-            'besprechung': 0,
-            'zeichnung': 0,
-            'aufmass': 0
-        }
-        
-        for projekt_row in beendete_projekte:
-            projekt = dict(projekt_row)
-            
-            # Sitzungen für dieses Projekt laden
-            cursor.execute('''
-                SELECT mitarbeiter, teilbereich, dauer_minuten
-                FROM sitzungen 
-                WHERE projekt_id = %s
-                AND dauer_minuten IS NOT NULL
-                ORDER BY start_zeit ASC
-            ''', (projekt['id'],))
-            
-            sitzungen = cursor.fetchall()
-            
-            # Mitarbeiter-Statistiken und Teilbereich-Summen
-            mitarbeiter_stats = {}
-            projekt_teilbereiche = {
-                'besprechung': 0,
-                'zeichnung': 0,  
-                'aufmass': 0
-            }
-            gesamt_minuten = 0
-            
-            for sitzung in sitzungen:
-                mitarbeiter = sitzung['mitarbeiter']
-                teilbereich = sitzung['teilbereich'].lower().strip()
-                minuten = sitzung['dauer_minuten'] or 0
-                
-                if mitarbeiter not in mitarbeiter_stats:
-                    mitarbeiter_stats[mitarbeiter] = {
-                        'besprechung': 0,
-                        'zeichnung': 0,
-                        'aufmass': 0,
-                        'gesamt': 0
-                    }
-                
-                # ✅ TEILBEREICH KORREKT ZUORDNEN
-                if teilbereich in ['besprechung', 'zeichnung', 'aufmass']:
-                    mitarbeiter_stats[mitarbeiter][teilbereich] += minuten
-                    projekt_teilbereiche[teilbereich] += minuten
-                    gesamt_teilbereiche[teilbereich] += minuten
-                elif teilbereich == 'aufmaß':  # Alternative Schreibweise
-                    mitarbeiter_stats[mitarbeiter]['aufmass'] += minuten
-                    projekt_teilbereiche['aufmass'] += minuten
-                    gesamt_teilbereiche['aufmass'] += minuten
-                
-                mitarbeiter_stats[mitarbeiter]['gesamt'] += minuten
-                gesamt_minuten += minuten
-            
-            # Projekt zu Liste hinzufügen
-            projekt_data = {
-                'id': projekt['id'],
-                'name': projekt['name'],
-                'kunde': projekt['kunde'],
-                'beendet_am': projekt['beendet_am'],
-                'mitarbeiter_stats': mitarbeiter_stats,
-                'gesamt_minuten': gesamt_minuten,
-                'teilbereiche': projekt_teilbereiche
-            }
-            
-            projekte_data.append(projekt_data)
-        
-        conn.close()
-        
-        # ✅ ZEIT FORMATIEREN
-        def format_minuten(minuten):
-            if minuten < 60:
-                return f"{minuten}min"
-            stunden = minuten // 60
-            rest_min = minuten % 60
-            if rest_min == 0:
-                return f"{stunden}h"
-            return f"{stunden}h {rest_min}min"
-        
-        # ✅ ALLE ZEITEN BERECHNEN
-        alle_zeit_minuten = sum(p['gesamt_minuten'] for p in projekte_data)
-        
-        # ✅ HTML TEMPLATE MIT KORREKTEN ZEITEN
-        html_content = f'''<!DOCTYPE html>
-<html lang="de">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>RAUSCH - Gesamt-Bericht {von_datum_str} bis {bis_datum_str}</title>
-    <style>
-        /* DEIN KOMPLETTES CSS HIER */
-        :root {{
-            --primary-dark: #4a5568;
-            --primary-blue: #3498db;
-            --background-light: #f8f9fa;
-            --text-dark: #2c3e50;
-            --text-light: #6c757d;
-            --success: #28a745;
-            --warning: #ffc107;
-            --danger: #dc3545;
-            --white: #ffffff;
-            --border-color: #dee2e6;
-            --gray: #6c757d;
-        }}
-        /* REST DEINES CSS */
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background: white; padding: 15px; font-size: 12px; line-height: 1.4; }}
-        .report-container {{ max-width: 100%; margin: 0 auto; background: white; }}
-        .report-header {{ text-align: center; margin-bottom: 20px; padding-bottom: 12px; border-bottom: 3px solid var(--primary-blue); }}
-        .report-title {{ font-size: 1.3em; font-weight: bold; color: var(--primary-dark); margin-bottom: 6px; line-height: 1.2; }}
-        .report-subtitle {{ font-size: 0.9em; color: var(--text-light); }}
-        .report-section {{ margin-bottom: 20px; background: var(--background-light); border-radius: 8px; padding: 12px; border-left: 3px solid var(--primary-blue); }}
-        .section-title {{ font-size: 1em; font-weight: bold; color: var(--primary-dark); margin-bottom: 12px; }}
-        .projekt-item {{ background: white; border: 1px solid var(--border-color); border-radius: 6px; padding: 10px; margin-bottom: 10px; page-break-inside: avoid; }}
-        .projekt-header {{ display: flex; flex-direction: column; gap: 6px; margin-bottom: 8px; padding-bottom: 6px; border-bottom: 2px solid var(--primary-blue); }}
-        .projekt-name {{ font-size: 1em; font-weight: bold; color: var(--primary-dark); line-height: 1.2; }}
-        .projekt-kunde {{ color: var(--text-light); font-style: italic; font-size: 0.85em; }}
-        .projekt-gesamt {{ background: var(--primary-blue); color: white; padding: 4px 8px; border-radius: 10px; font-weight: bold; font-size: 0.8em; align-self: flex-start; margin-top: 4px; }}
-        .teilbereiche-grid {{ display: grid; grid-template-columns: 1fr; gap: 6px; margin-top: 8px; }}
-        .teilbereich-item {{ background: var(--background-light); border: 1px solid var(--border-color); border-radius: 4px; padding: 6px; display: flex; justify-content: space-between; align-items: center; }}
-        .teilbereich-name {{ font-weight: bold; font-size: 0.8em; display: flex; align-items: center; gap: 4px; }}
-        .teilbereich-zeit {{ color: var(--primary-blue); font-weight: bold; font-size: 0.8em; }}
-        .action-buttons {{ text-align: center; margin-top: 25px; padding-top: 15px; border-top: 2px solid var(--border-color); display: flex; gap: 15px; justify-content: center; flex-wrap: wrap; }}
-        .btn {{ border: none; padding: 12px 24px; border-radius: 8px; cursor: pointer; font-weight: bold; font-size: 14px; transition: all 0.3s ease; color: white; text-decoration: none; display: inline-flex; align-items: center; justify-content: center; gap: 8px; }}
-        .btn:hover {{ transform: translateY(-2px); box-shadow: 0 4px 8px rgba(0,0,0,0.2); }}
-        .btn-print {{ background: var(--success); }}
-        .btn-back {{ background: var(--gray); }}
-        @media (min-width: 768px) {{ body {{ padding: 20px; font-size: 14px; }} .report-container {{ max-width: 900px; }} .report-title {{ font-size: 1.8em; }} .report-subtitle {{ font-size: 1em; }} .projekt-header {{ flex-direction: row; justify-content: space-between; align-items: center; }} .projekt-gesamt {{ margin-top: 0; }} .teilbereiche-grid {{ grid-template-columns: repeat(3, 1fr); gap: 10px; }} .btn {{ padding: 15px 30px; font-size: 16px; }} }}
-        @media (max-width: 768px) {{ .action-buttons {{ flex-direction: column; align-items: center; gap: 10px; }} .btn {{ width: 100%; max-width: 250px; }} }}
-        @media print {{ .action-buttons {{ display: none !important; }} body {{ background: white !important; padding: 5px !important; font-size: 9px !important; }} @page {{ margin: 0.5cm; size: A4; }} .report-container {{ transform: scale(0.95); transform-origin: top left; width: 105%; }} .projekt-item {{ page-break-inside: avoid; break-inside: avoid; margin-bottom: 8px !important; }} .report-section {{ page-break-inside: avoid; break-inside: avoid; margin-bottom: 12px !important; }} .report-title {{ font-size: 1.4em !important; color: black !important; }} .report-subtitle {{ font-size: 0.8em !important; }} .section-title {{ font-size: 0.9em !important; color: black !important; }} .projekt-name {{ font-size: 0.9em !important; color: black !important; }} .teilbereiche-grid {{ grid-template-columns: repeat(3, 1fr) !important; gap: 6px !important; }} }}
-    </style>
-</head>
-<body>
-    <div class="report-container">
-        <div class="report-header">
-            <div class="report-title">📊 Gesamt-Bericht RAUSCH</div>
-            <div class="report-subtitle">Zeitraum: {von_datum_str} bis {bis_datum_str}</div>
-        </div>
-
-        <div class="summary-bar" style="background: var(--primary-blue); color: white; padding: 12px; border-radius: 8px; text-align: center; margin-bottom: 20px; font-weight: bold; font-size: 14px;">
-            📊 {len(projekte_data)} Projekt(e) | ⏱️ {format_minuten(alle_zeit_minuten)}
-            <br>
-            <div style="font-size: 12px; margin-top: 5px;">
-                💬 Besprechung: {format_minuten(gesamt_teilbereiche['besprechung'])} | 
-                📐 Zeichnung: {format_minuten(gesamt_teilbereiche['zeichnung'])} | 
-                📏 Aufmaß: {format_minuten(gesamt_teilbereiche['aufmass'])}
-            </div>
-        </div>
-
-        <div class="report-section">
-            <div class="section-title">🏗️ Beendete Projekte ({len(projekte_data)})</div>
-            '''
-        
-        if projekte_data:
-            for projekt in projekte_data:
-                html_content += f'''
-                <div class="projekt-item">
-                    <div class="projekt-header">
-                        <div>
-                            <div class="projekt-name">{projekt['name']}</div>
-                            <div class="projekt-kunde">👤 {projekt['kunde']}</div>
-                        </div>
-                        <div class="projekt-gesamt">{format_minuten(projekt['gesamt_minuten'])}</div>
-                    </div>
-                    
-                    <div class="teilbereiche-grid">
-                        <div class="teilbereich-item">
-                            <div class="teilbereich-name">💬 Besprechung</div>
-                            <div class="teilbereich-zeit">{format_minuten(projekt['teilbereiche']['besprechung'])}</div>
-                        </div>
-                        <div class="teilbereich-item">
-                            <div class="teilbereich-name">📐 Zeichnung</div>
-                            <div class="teilbereich-zeit">{format_minuten(projekt['teilbereiche']['zeichnung'])}</div>
-                        </div>
-                        <div class="teilbereich-item">
-                            <div class="teilbereich-name">📏 Aufmaß</div>
-                            <div class="teilbereich-zeit">{format_minuten(projekt['teilbereiche']['aufmass'])}</div>
-                        </div>
-                    </div>
-                </div>'''
-        else:
-            html_content += '''
-                <div style="text-align: center; padding: 20px; color: var(--text-light); font-style: italic;">
-                    📭 Keine beendeten Projekte im gewählten Zeitraum gefunden.
-                </div>'''
-        
-        html_content += '''
-        </div>
-
-        <div class="action-buttons">
-            <button onclick="window.print()" class="btn btn-print">
-                🖨️ Drucken
-            </button>
-            <button onclick="goBack()" class="btn btn-back">
-                ← Zurück
-            </button>
-        </div>
-    </div>
-
-    <script>
-        function goBack() {
-            if (window.history.length > 1) {
-                window.history.back();
-            } else {
-                window.location.href = '/dashboard';
-            }
-        }
-        document.addEventListener('keydown', function(event) {
-            if (event.key === 'Escape') {
-                goBack();
-            }
-        });
-        if (window.matchMedia && window.matchMedia('(max-width: 768px)').matches) {
-            document.addEventListener('DOMContentLoaded', function() {
-                const meta = document.createElement('meta');
-                meta.name = 'viewport';
-                meta.content = 'width=device-width, initial-scale=0.9';
-                document.getElementsByTagName('head')[0].appendChild(meta);
-            });
-        }
-    </script>
-</body>
-</html>'''
-        
-        return html_content
-        
-    except Exception as e:
-        print(f"❌ Fehler in gesamt_bericht: {e}")
-        import traceback
-        traceback.print_exc()
-        return f"<h1>Fehler: {str(e)}</h1><pre>{traceback.format_exc()}</pre>", 500
+    """Gesamt-Bericht - wird gestreamt, Kopf steht bevor alle Projekte geladen sind"""
+    von_datum_str = request.args.get('von', '2024-01-01')
+    bis_datum_str = request.args.get('bis', '2025-12-31')
+    filter = {'beendet_von': von_datum_str, 'beendet_bis': bis_datum_str}
+
+    log.debug('Gesamt-Bericht', extra=felder(von=von_datum_str, bis=bis_datum_str))
+
+    schluessel = bericht_schluessel('gesamt', None, von_datum_str, bis_datum_str)
+    eintrag, stand = bericht_holen(schluessel)
+    if eintrag is not None:
+        return bericht_antwort(eintrag)
+
+    def erzeugen():
+        with db_verbindung() as conn:
+            cursor = conn.cursor()
+
+            # ✅ KOPFZEILE: Summen ohne die Projekte selbst zu laden
+            summe = lade_bericht_summe(cursor, **filter)
+
+            # ✅ PROJEKTE: serverseitiger Cursor, ein Projekt nach dem anderen
+            projekte = iter_projekt_summen(
+                conn.cursor(name='gesamt_bericht'),
+                leere_projekte=True,
+                sortierung='beendet_am',
+                **filter
+            )
+
+            stream = app.jinja_env.get_template('gesamt_bericht_kurz.html').stream(
+                projekte=projekte,
+                summe=summe,
+                von_datum=von_datum_str,
+                bis_datum=bis_datum_str,
+                format_minuten=format_minuten
+            )
+            stream.enable_buffering(20)
+            yield from stream
+
+    return Response(stream_with_context(bericht_mitschreiben(schluessel, erzeugen(), 'text/html', stand)),
+                    mimetype='text/html')
     
 
  #Projekte  löschen   
@@ -1263,24 +944,21 @@ def projekte_bulk_delete():
         if not projekt_ids:
             return jsonify({'status': 'error', 'message': 'Keine Projekte ausgewählt'})
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        deleted_count = 0
-        for projekt_id in projekt_ids:
-            cursor.execute('DELETE FROM aktive_sitzungen WHERE projekt_id = %s', (projekt_id,))
-            cursor.execute('DELETE FROM sitzungen WHERE projekt_id = %s', (projekt_id,))
-            cursor.execute('DELETE FROM projekte WHERE id = %s', (projekt_id,))
-            
-            if cursor.rowcount > 0:
-                deleted_count += 1
-        
-        conn.commit()
-        conn.close()
-        
+        projekt_ids, ergebnisse = projekt_ids_lesen(projekt_ids)
+
+        # Alle Projekte und Sitzungen in einer festen Anzahl Statements
+        with db_verbindung() as conn:
+            cursor = conn.cursor()
+            geloescht, betroffen = projekte_loeschen(cursor, projekt_ids, ersteller=ersteller_filter())
+            ergebnisse.update(geloescht)
+            if betroffen:
+                berichte_geaendert(cursor, [aenderung(**p) for p in betroffen])
+
+        deleted_count = sum(1 for e in ergebnisse.values() if e == 'gelöscht')
         return jsonify({
             'status': 'success',
-            'deleted_count': deleted_count
+            'deleted_count': deleted_count,
+            'ergebnisse': ergebnisse
         })
         
     except Exception as e:
@@ -1295,28 +973,26 @@ def debug_projekte():
         von_datum_str = request.args.get('von', '2024-01-01')
         bis_datum_str = request.args.get('bis', '2025-12-31')
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_verbindung() as conn:
+            cursor = conn.cursor()
         
-        # 1. ALLE PROJEKTE
-        cursor.execute('SELECT id, name, kunde, status, beendet_am FROM projekte ORDER BY id')
-        alle_projekte = cursor.fetchall()
+            # 1. ALLE PROJEKTE
+            cursor.execute('SELECT id, name, kunde, status, beendet_am FROM projekte ORDER BY id')
+            alle_projekte = cursor.fetchall()
         
-        # 2. NUR BEENDETE
-        cursor.execute("SELECT id, name, kunde, status, beendet_am FROM projekte WHERE status = 'beendet'")
-        beendete_projekte = cursor.fetchall()
+            # 2. NUR BEENDETE
+            cursor.execute("SELECT id, name, kunde, status, beendet_am FROM projekte WHERE status = 'beendet'")
+            beendete_projekte = cursor.fetchall()
         
-        # 3. MIT DATUM-FILTER
-        cursor.execute('''
-            SELECT id, name, kunde, status, beendet_am
-            FROM projekte 
-            WHERE status = 'beendet' 
-            AND beendet_am IS NOT NULL
-            AND DATE(beendet_am) BETWEEN %s AND %s
-        ''', (von_datum_str, bis_datum_str))
-        beendete_mit_datum = cursor.fetchall()
-        
-        conn.close()
+            # 3. MIT DATUM-FILTER
+            cursor.execute('''
+                SELECT id, name, kunde, status, beendet_am
+                FROM projekte 
+                WHERE status = 'beendet' 
+                AND beendet_am IS NOT NULL
+                AND beendet_am >= %s AND beendet_am < %s
+            ''', (zeit.tag_beginn(von_datum_str), zeit.tag_ende(bis_datum_str)))
+            beendete_mit_datum = cursor.fetchall()
         
         html = f'''<h1>🔍 DEBUG PROJEKTE</h1>
         <p><strong>Von:</strong> {von_datum_str} | <strong>Bis:</strong> {bis_datum_str}</p>
@@ -1342,7 +1018,31 @@ def debug_projekte():
         
     except Exception as e:
         return f"<h1>Fehler: {str(e)}</h1>"
-    
+
+
+@app.route('/debug/pool')
+@login_required
+def debug_pool():
+    """Kennzahlen des DB-Verbindungs-Pools (pro Worker)"""
+    return jsonify(pool_metriken())
+
+
+@app.route('/metrics')
+def metrics():
+    """Kennzahlen dieses Workers im Prometheus-Textformat"""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return Response('Nicht autorisiert\n', status=401, mimetype='text/plain')
+
+    pool = pool_metriken()
+    gauges = {
+        'rausch_db_pool_offen': ('Offene DB-Verbindungen', pool['offen']),
+        'rausch_db_pool_ausgeliehen': ('Ausgeliehene DB-Verbindungen', pool['ausgeliehen']),
+        'rausch_db_pool_wartezeit_max_sekunden': ('Längste Wartezeit auf eine Verbindung',
+                                                  pool['wartezeit_max_ms'] / 1000),
+        'rausch_db_pool_timeouts': ('Checkouts mit Timeout', pool['timeouts']),
+    }
+    return Response(prometheus_text(gauges), mimetype='text/plain; version=0.0.4')
+
 
 # Vollständiger Export-Bericht (für beendete Projekte)
 @app.route('/export/vollbericht')
@@ -1352,101 +1052,36 @@ def export_vollbericht():
         von_datum_str = request.args.get('von', '2024-01-01')
         bis_datum_str = request.args.get('bis', '2025-12-31')
         
-        print(f"📊 Vollbericht angefordert: {von_datum_str} bis {bis_datum_str}")
+        schluessel = bericht_schluessel('vollbericht', None, von_datum_str, bis_datum_str)
+        eintrag, stand = bericht_holen(schluessel)
+        if eintrag is not None:
+            return bericht_antwort(eintrag)
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_verbindung() as conn:
+            cursor = conn.cursor()
         
-        # ✅ BEENDETE PROJEKTE IM ZEITRAUM HOLEN
-        cursor.execute('''
-            SELECT id, name, kunde, status, beendet_am, erstellt_am
-            FROM projekte 
-            WHERE status = 'beendet' 
-            AND beendet_am IS NOT NULL
-            AND DATE(beendet_am) BETWEEN %s AND %s
-            ORDER BY beendet_am DESC
-        ''', (von_datum_str, bis_datum_str))
-        
-        beendete_projekte = cursor.fetchall()
-        print(f"🔍 Gefundene beendete Projekte: {len(beendete_projekte)}")
+            # ✅ BEENDETE PROJEKTE IM ZEITRAUM MIT SUMMEN (EINE ABFRAGE)
+            projekte_data = lade_projekt_summen(
+                cursor,
+                beendet_von=von_datum_str,
+                beendet_bis=bis_datum_str,
+                leere_projekte=True,
+                sortierung='beendet_am'
+            )
         
-        projekte_data = []
-        
-        for projekt_row in beendete_projekte:
-            projekt = dict(projekt_row)
-            
-            # Sitzungen für dieses Projekt laden
-            cursor.execute('''
-                SELECT mitarbeiter, teilbereich, start_zeit, end_zeit, dauer_minuten
-                FROM sitzungen 
-                WHERE projekt_id = %s
-                AND end_zeit IS NOT NULL
-                ORDER BY start_zeit ASC
-            ''', (projekt['id'],))
-            
-            sitzungen = cursor.fetchall()
-            
-            # Mitarbeiter-Statistiken
-            mitarbeiter_stats = {}
-            gesamt_minuten = 0
-            
-            for sitzung in sitzungen:
-                mitarbeiter = sitzung['mitarbeiter']
-                teilbereich = sitzung['teilbereich'].lower().strip()
-                minuten = sitzung['dauer_minuten'] or 0
-                
-                if mitarbeiter not in mitarbeiter_stats:
-                    mitarbeiter_stats[mitarbeiter] = {
-                        'besprechung': 0,
-                        'zeichnung': 0,
-                        'aufmass': 0,
-                        'gesamt': 0
-                    }
-                
-                # Teilbereich zuordnen
-                if teilbereich in ['besprechung', 'zeichnung', 'aufmass']:
-                    mitarbeiter_stats[mitarbeiter][teilbereich] += minuten
-                elif teilbereich == 'aufmaß':
-                    mitarbeiter_stats[mitarbeiter]['aufmass'] += minuten
-                
-                mitarbeiter_stats[mitarbeiter]['gesamt'] += minuten
-                gesamt_minuten += minuten
-            
-            # Projekt zu Liste hinzufügen
-            projekt_data = {
-                'id': projekt['id'],
-                'name': projekt['name'],
-                'kunde': projekt['kunde'],
-                'beendet_am': projekt['beendet_am'],
-                'mitarbeiter_stats': mitarbeiter_stats,
-                'gesamt_minuten': gesamt_minuten
-            }
-            
-            projekte_data.append(projekt_data)
-        
-        conn.close()
-        
-        # Zeit formatieren
-        def format_minuten(minuten):
-            if minuten < 60:
-                return f"{minuten}min"
-            stunden = minuten // 60
-            rest_min = minuten % 60
-            if rest_min == 0:
-                return f"{stunden}h"
-            return f"{stunden}h {rest_min}min"
+        log.debug('Vollbericht', extra=felder(von=von_datum_str, bis=bis_datum_str, projekte=len(projekte_data)))
         
         # ✅ TEMPLATE RENDERN MIT KORREKTEM NAMEN
-        return render_template('gesamt_bericht.html', 
+        html = render_template('gesamt_bericht.html', 
                              projekte=projekte_data,
                              von_datum=von_datum_str,
                              bis_datum=bis_datum_str,
                              format_minuten=format_minuten)
+        return bericht_antwort(bericht_speichern(schluessel, html, 'text/html', stand))
         
     except Exception as e:
-        print(f"❌ Fehler beim Vollbericht: {e}")
+        log.exception('Fehler beim Vollbericht')
         import traceback
-        traceback.print_exc()
         return f"<h1>❌ Fehler beim Vollbericht</h1><p>{str(e)}</p><pre>{traceback.format_exc()}</pre>", 500
     
 # ✅ PASSWORT-RESET ANFRAGE
@@ -1456,47 +1091,33 @@ def passwort_vergessen():
     email = request.form['email'].strip().lower()
     
     # Benutzer in Datenbank prüfen
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT email FROM benutzer WHERE email = %s', (email,))
-    result = cursor.fetchone()
-    
-    if not result:
-        conn.close()
-        return jsonify({'status': 'error', 'message': 'E-Mail nicht gefunden'})
-    
-    # Reset-Token generieren
-    reset_token = str(uuid.uuid4())
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT email FROM benutzer WHERE email = %s', (email,))
+        result = cursor.fetchone()
     
-    # Token in Datenbank speichern (5 Minuten gültig)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS password_resets (
-            id SERIAL PRIMARY KEY,
-            email VARCHAR(255) NOT NULL,
-            token VARCHAR(255) NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            used BOOLEAN DEFAULT FALSE
-        )
-    ''')
+        if not result:
+            return jsonify({'status': 'error', 'message': 'E-Mail nicht gefunden'})
     
-    # Alten Token löschen
-    cursor.execute('DELETE FROM password_resets WHERE email = %s', (email,))
+        # Reset-Token generieren
+        reset_token = str(uuid.uuid4())
     
-    # Neuen Token einfügen
-    cursor.execute('''
-        INSERT INTO password_resets (email, token) 
-        VALUES (%s, %s)
-    ''', (email, reset_token))
+        # Token in Datenbank speichern (5 Minuten gültig) - Tabelle aus migrationen.py
+        # Alten Token löschen
+        cursor.execute('DELETE FROM password_resets WHERE email = %s', (email,))
     
-    conn.commit()
-    conn.close()
+        # Neuen Token einfügen
+        cursor.execute('''
+            INSERT INTO password_resets (email, token) 
+            VALUES (%s, %s)
+        ''', (email, reset_token))
     
     # Reset-Link erstellen (DEINE RENDER-URL!)
     reset_link = f"https://timely-w3qi.onrender.com/passwort-reset?token={reset_token}"
     
     try:
         # EMAIL SENDEN (EINFACHE VERSION)
-        print(f"📧 Reset-Link für {email}: {reset_link}")
+        log.info('Passwort-Reset angefordert', extra=felder(email=email))
         
         return jsonify({
             'status': 'success',
@@ -1504,7 +1125,7 @@ def passwort_vergessen():
             'dev_link': reset_link  # FÜR ENTWICKLUNG!
         })
         
-    except Exception as e:
+    except Exception:
         return jsonify({'status': 'error', 'message': 'Fehler beim Erstellen des Reset-Links'})
 
 # ✅ PASSWORT-RESET BESTÄTIGUNG (KORRIGIERT)
@@ -1516,36 +1137,37 @@ def passwort_reset_confirm():
     if len(password) < 8:
         return jsonify({'status': 'error', 'message': 'Passwort muss mindestens 8 Zeichen haben'})
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
     
-    # Token prüfen und E-Mail holen
-    cursor.execute('''
-        SELECT email FROM password_resets 
-        WHERE token = %s 
-        AND used = FALSE 
-        AND created_at > NOW() - INTERVAL '5 minutes'
-    ''', (token,))
+        # Token prüfen und E-Mail holen
+        cursor.execute('''
+            SELECT email FROM password_resets 
+            WHERE token = %s 
+            AND used = FALSE 
+            AND created_at > NOW() - INTERVAL '5 minutes'
+        ''', (token,))
     
-    result = cursor.fetchone()
+        result = cursor.fetchone()
     
-    if not result:
-        conn.close()
-        return jsonify({'status': 'error', 'message': 'Ungültiger oder abgelaufener Token'})
+        if not result:
+            return jsonify({'status': 'error', 'message': 'Ungültiger oder abgelaufener Token'})
     
-    email = result['email']
+        email = result['email']
     
-    # Passwort in Datenbank aktualisieren
-    cursor.execute('''
-        UPDATE benutzer 
-        SET password_hash = %s 
-        WHERE email = %s
-    ''', (hash_password(password), email))
+        # Passwort in Datenbank aktualisieren
+        cursor.execute('''
+            UPDATE benutzer 
+            SET password_hash = %s 
+            WHERE email = %s
+        ''', (hash_password(password), email))
     
-    # Token als verwendet markieren
-    cursor.execute('UPDATE password_resets SET used = TRUE WHERE token = %s', (token,))
-    conn.commit()
-    conn.close()
+        # Token als verwendet markieren
+        cursor.execute('UPDATE password_resets SET used = TRUE WHERE token = %s', (token,))
+
+    # Alten Passwort-Hash nicht weiter aus dem Cache anmelden lassen
+    db_benutzer.vergessen(email)
+    berechtigung_vergessen(email)
     
     return jsonify({
         'status': 'success',
@@ -1561,18 +1183,17 @@ def passwort_reset_seite():
         return redirect('/')
     
     # Token prüfen
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT email FROM password_resets 
-        WHERE token = %s 
-        AND used = FALSE 
-        AND created_at > NOW() - INTERVAL '5 minutes'
-    ''', (token,))
+        cursor.execute('''
+            SELECT email FROM password_resets 
+            WHERE token = %s 
+            AND used = FALSE 
+            AND created_at > NOW() - INTERVAL '5 minutes'
+        ''', (token,))
     
-    result = cursor.fetchone()
-    conn.close()
+        result = cursor.fetchone()
     
     if not result:
         return render_template_string('''
@@ -0,0 +1,16 @@
+"""
+Benchmarks für die PostgreSQL-Version (app_db.py)
+
+    python -m benchmark.daten --projekte 10000 --sitzungen 5000000 --mitarbeiter 200
+    python -m benchmark --baseline benchmark/baseline.json
+    python -m benchmark --speichern benchmark/baseline.json
+    python -m benchmark.last --mitarbeiter 50 --projekte 10 --dauer 60
+
+daten.py      füllt eine lokale Datenbank mit synthetischen Projekten/Sitzungen
+szenarien.py  ein Szenario pro Route (Requests über den Flask-Test-Client)
+runner.py     misst Latenz-Perzentile und SQL pro Request, vergleicht mit Baseline
+last.py       gleichzeitige Starts/Stopps vieler Mitarbeiter, prüft auf Anomalien
+
+Nie gegen die Produktionsdatenbank laufen lassen - daten.py verweigert
+entfernte Hosts ohne --erzwingen.
+"""
@@ -0,0 +1,211 @@
+"""
+Synthetische Testdaten für Benchmarks
+
+    python -m benchmark.daten --projekte 10000 --sitzungen 5000000 --mitarbeiter 200 --leeren
+
+Erzeugt die Daten serverseitig (INSERT ... SELECT generate_series) in Blöcken,
+damit auch Millionen Sitzungen in wenigen Minuten stehen. Verteilung:
+wenige Projekte bekommen viele Sitzungen (quadratische Schiefe), ein Teil der
+Projekte ist beendet, jeder zweite Mitarbeiter hat eine aktive Sitzung.
+Mit --seed ist der Datenbestand reproduzierbar.
+"""
+import os
+import sys
+import time
+import argparse
+from urllib.parse import urlparse
+
+from database import neue_verbindung
+from berechtigung import TEAM_CODE
+
+BENCHMARK_EMAIL = 'benchmark@rausch.local'
+BENCHMARK_PASSWORT = 'benchmark'
+ERSTELLER_ANZAHL = 20
+BLOCK = 250000
+
+LOKALE_HOSTS = {None, '', 'localhost', '127.0.0.1', '::1'}
+
+
+def ist_lokal():
+    """True, wenn die konfigurierte Datenbank auf diesem Rechner läuft"""
+    database_url = os.environ.get('DATABASE_URL')
+    host = urlparse(database_url).hostname if database_url else os.environ.get('PGHOST', 'localhost')
+    return host in LOKALE_HOSTS or host.startswith('/')
+
+
+def ersteller_email(nummer):
+    return BENCHMARK_EMAIL if nummer == 0 else f'ersteller{nummer:02d}@rausch.local'
+
+
+def leeren(cursor):
+    cursor.execute('''
+        TRUNCATE aktive_sitzungen, sitzungen, sitzungen_tage, projekte,
+                 mitarbeiter, kunden RESTART IDENTITY CASCADE
+    ''')
+    cursor.execute("DELETE FROM benutzer WHERE email LIKE '%@rausch.local'")
+
+
+def stammdaten_anlegen(cursor, mitarbeiter, kunden):
+    cursor.execute('''
+        INSERT INTO mitarbeiter (name)
+        SELECT 'Mitarbeiter ' || lpad(i::text, 3, '0') FROM generate_series(1, %s) i
+        ON CONFLICT DO NOTHING
+    ''', (mitarbeiter,))
+    cursor.execute('''
+        INSERT INTO kunden (name)
+        SELECT 'Kunde ' || lpad(i::text, 4, '0') FROM generate_series(1, %s) i
+        ON CONFLICT DO NOTHING
+    ''', (kunden,))
+    cursor.execute('UPDATE stammdaten_version SET version = version + 1')
+
+    from app_db import hash_password
+    for nummer in range(ERSTELLER_ANZAHL):
+        cursor.execute('''
+            INSERT INTO benutzer (email, password_hash, name, team_code_verwendet)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (email) DO NOTHING
+        ''', (ersteller_email(nummer), hash_password(BENCHMARK_PASSWORT),
+              f'Benchmark {nummer}', TEAM_CODE if nummer == 0 else None))
+
+
+def projekte_anlegen(cursor, anzahl, kunden, tage, anteil_beendet):
+    cursor.execute('''
+        INSERT INTO projekte (name, kunde, ersteller, status, erstellt_am, beendet_am)
+        SELECT 'Projekt ' || i,
+               'Kunde ' || lpad((1 + floor(random() * %(kunden)s))::int::text, 4, '0'),
+               CASE WHEN k = 0 THEN %(email)s ELSE 'ersteller' || lpad(k::text, 2, '0') || '@rausch.local' END,
+               CASE WHEN beendet THEN 'beendet' ELSE 'pausiert' END,
+               erstellt,
+               CASE WHEN beendet
+                    THEN erstellt + random() * (now() - erstellt) END
+        FROM (
+            SELECT i,
+                   floor(random() * %(ersteller)s)::int AS k,
+                   random() < %(anteil_beendet)s AS beendet,
+                   now() - random() * make_interval(days => %(tage)s) AS erstellt
+            FROM generate_series(1, %(anzahl)s) i
+        ) x
+        RETURNING id
+    ''', {'anzahl': anzahl, 'kunden': kunden, 'email': BENCHMARK_EMAIL,
+          'ersteller': ERSTELLER_ANZAHL, 'anteil_beendet': anteil_beendet, 'tage': tage})
+    return [row['id'] for row in cursor.fetchall()]
+
+
+def sitzungen_anlegen(conn, projekt_ids, anzahl, mitarbeiter, tage):
+    cursor = conn.cursor()
+    erledigt = 0
+    while erledigt < anzahl:
+        block = min(BLOCK, anzahl - erledigt)
+        # random()^2: wenige Projekte mit sehr vielen Sitzungen, viele mit wenigen
+        cursor.execute('''
+            INSERT INTO sitzungen (projekt_id, mitarbeiter, teilbereich, start_zeit, end_zeit, dauer_minuten)
+            SELECT projekt_id, mitarbeiter, teilbereich, start_zeit,
+                   start_zeit + make_interval(mins => dauer), dauer
+            FROM (
+                SELECT (%(ids)s::int[])[1 + floor(power(random(), 2) * %(n)s)::int] AS projekt_id,
+                       'Mitarbeiter ' || lpad((1 + floor(random() * %(mitarbeiter)s))::int::text, 3, '0') AS mitarbeiter,
+                       (ARRAY['besprechung', 'zeichnung', 'aufmass'])[1 + floor(random() * 3)::int] AS teilbereich,
+                       date_trunc('minute', now() - random() * make_interval(days => %(tage)s)) AS start_zeit,
+                       (5 + floor(random() * 235))::int AS dauer
+                FROM generate_series(1, %(block)s)
+            ) x
+        ''', {'ids': projekt_ids, 'n': len(projekt_ids), 'mitarbeiter': mitarbeiter,
+              'tage': tage, 'block': block})
+        conn.commit()
+        erledigt += block
+        print(f"   {erledigt:>10} / {anzahl} Sitzungen")
+
+
+def aktive_anlegen(cursor, anzahl, mitarbeiter):
+    """Je Mitarbeiter höchstens eine aktive Sitzung, nur auf nicht beendeten Projekten"""
+    cursor.execute('''
+        INSERT INTO aktive_sitzungen (projekt_id, mitarbeiter, teilbereich, start_zeit)
+        SELECT p.id, 'Mitarbeiter ' || lpad(m::text, 3, '0'),
+               (ARRAY['besprechung', 'zeichnung', 'aufmass'])[1 + floor(random() * 3)::int],
+               now() - random() * interval '8 hours'
+        FROM generate_series(1, %s) m
+        CROSS JOIN LATERAL (
+            SELECT id FROM projekte
+            WHERE status <> 'beendet' AND m > 0
+            ORDER BY random() LIMIT 1
+        ) p
+    ''', (min(anzahl, mitarbeiter),))
+    cursor.execute('''
+        UPDATE projekte SET status = 'laufend'
+        WHERE id IN (SELECT projekt_id FROM aktive_sitzungen)
+    ''')
+
+
+def erzeugen(projekte, sitzungen, mitarbeiter, aktive, tage=730, anteil_beendet=0.3, seed=0.42,
+             leeren_vorher=False):
+    from migrationen import migrieren
+    from berichte import rollup_neu_aufbauen
+    from projekt_zaehler import alle_abgleichen
+
+    migrieren()
+    conn = neue_verbindung()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT setseed(%s)', (seed,))
+
+        if leeren_vorher:
+            print("🧹 Leere Benchmark-Tabellen...")
+            leeren(cursor)
+
+        beginn = time.monotonic()
+        print(f"👥 {mitarbeiter} Mitarbeiter, {ERSTELLER_ANZAHL} Ersteller")
+        stammdaten_anlegen(cursor, mitarbeiter, max(50, projekte // 20))
+
+        print(f"🏗️  {projekte} Projekte")
+        projekt_ids = projekte_anlegen(cursor, projekte, max(50, projekte // 20), tage, anteil_beendet)
+        conn.commit()
+
+        print(f"⏱️  {sitzungen} Sitzungen")
+        sitzungen_anlegen(conn, projekt_ids, sitzungen, mitarbeiter, tage)
+
+        print(f"▶️  {aktive} aktive Sitzungen")
+        aktive_anlegen(cursor, aktive, mitarbeiter)
+
+        print("📊 Tages-Rollup, Projekt-Zähler und erste/letzte Starts")
+        rollup_neu_aufbauen(cursor)
+        cursor.execute('''
+            UPDATE projekte p SET erster_start = s.erster, letzter_start = s.letzter
+            FROM (SELECT projekt_id, MIN(start_zeit) AS erster, MAX(start_zeit) AS letzter
+                  FROM sitzungen GROUP BY projekt_id) s
+            WHERE s.projekt_id = p.id
+        ''')
+        conn.commit()
+        alle_abgleichen(conn)
+
+        conn.autocommit = True
+        cursor.execute('ANALYZE')
+        print(f"✅ Fertig in {time.monotonic() - beginn:.0f}s - Login: {BENCHMARK_EMAIL} / {BENCHMARK_PASSWORT}")
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Synthetische Benchmark-Daten erzeugen')
+    parser.add_argument('--projekte', type=int, default=10000)
+    parser.add_argument('--sitzungen', type=int, default=5000000)
+    parser.add_argument('--mitarbeiter', type=int, default=200)
+    parser.add_argument('--aktive', type=int, default=None, help='Standard: Hälfte der Mitarbeiter')
+    parser.add_argument('--tage', type=int, default=730, help='Zeitraum der Sitzungen rückwärts ab heute')
+    parser.add_argument('--anteil-beendet', type=float, default=0.3)
+    parser.add_argument('--seed', type=float, default=0.42, help='-1 bis 1, für reproduzierbare Daten')
+    parser.add_argument('--leeren', action='store_true', help='Tabellen vorher leeren')
+    parser.add_argument('--erzwingen', action='store_true', help='auch gegen nicht-lokale Datenbanken')
+    args = parser.parse_args(argv)
+
+    if not ist_lokal() and not args.erzwingen:
+        print("❌ Datenbank ist nicht lokal - Abbruch (mit --erzwingen trotzdem ausführen)")
+        sys.exit(1)
+
+    erzeugen(args.projekte, args.sitzungen, args.mitarbeiter,
+             args.aktive if args.aktive is not None else args.mitarbeiter // 2,
+             tage=args.tage, anteil_beendet=args.anteil_beendet, seed=args.seed,
+             leeren_vorher=args.leeren)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+"""
+Last-Simulation für Start/Stopp: N Mitarbeiter auf M Projekten gleichzeitig
+
+    python -m benchmark.last --mitarbeiter 50 --projekte 10 --dauer 60
+    python -m benchmark.last --url http://127.0.0.1:8000 --mitarbeiter 100 --doppelklick 0.05
+
+Jeder simulierte Mitarbeiter ist ein Thread: Start auf einem zufälligen
+Projekt, kurze Pause, Stopp, nächstes Projekt. Ohne --url läuft alles über
+den Flask-Test-Client in diesem Prozess (Pool-Größe über DB_POOL_MAX), mit
+--url gegen einen laufenden Server (z.B. gunicorn mit --workers/--threads).
+--doppelklick schickt mit dieser Wahrscheinlichkeit zwei Starts gleichzeitig.
+
+Ausgabe: Durchsatz, Latenz-Perzentile je Aktion, Lock-Wartende aus
+pg_stat_activity und Anomalien (doppelte aktive Sitzungen, falscher
+Projekt-Status, verlorene Sitzungen, Rollup ≠ Roh-Sitzungen). Die
+Simulation legt eigene Projekte an und entfernt sie danach wieder.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.cookiejar import CookieJar
+from urllib.parse import urlencode
+from urllib.request import build_opener, HTTPCookieProcessor
+from urllib.error import HTTPError
+
+from database import db_verbindung, neue_verbindung
+from projekt_zaehler import zaehler_abgleichen
+from metriken import perzentil
+from protokoll import einrichten
+from benchmark.daten import BENCHMARK_EMAIL, BENCHMARK_PASSWORT, ist_lokal
+
+MITARBEITER_PREFIX = 'Last-MA'
+PROJEKT_PREFIX = 'Last-Projekt'
+TEILBEREICHE = ['besprechung', 'zeichnung', 'aufmass']
+
+
+# --- Clients -----------------------------------------------------------------
+
+class TestClient:
+    """Flask-Test-Client im selben Prozess (ein Client pro Thread)"""
+
+    def __init__(self, email):
+        from app_db import app
+        self._client = app.test_client()
+        with self._client.session_transaction() as session:
+            session['benutzer_email'] = email
+            session['benutzer_name'] = 'Last'
+            session['team_mitglied'] = True
+
+    def post(self, pfad, daten):
+        response = self._client.post(pfad, data=daten)
+        return response.status_code, (response.get_json(silent=True) or {})
+
+    def pool(self):
+        from database import pool_metriken
+        return pool_metriken()
+
+
+class HttpClient:
+    """Echter HTTP-Client gegen einen laufenden Server (eigene Cookies pro Thread)"""
+
+    def __init__(self, url, email, passwort):
+        self._url = url.rstrip('/')
+        self._opener = build_opener(HTTPCookieProcessor(CookieJar()))
+        status, antwort = self.post('/login', {'email': email, 'password': passwort})
+        if antwort.get('status') != 'success':
+            raise SystemExit(f"❌ Login als {email} fehlgeschlagen: {antwort.get('message', status)}")
+
+    def _oeffnen(self, pfad, daten=None):
+        try:
+            with self._opener.open(self._url + pfad, data=daten, timeout=60) as response:
+                return response.status, response.read()
+        except HTTPError as e:
+            return e.code, e.read()
+
+    def post(self, pfad, daten):
+        status, body = self._oeffnen(pfad, urlencode(daten).encode('utf-8'))
+        try:
+            return status, json.loads(body)
+        except ValueError:
+            return status, {}
+
+    def pool(self):
+        status, body = self._oeffnen('/debug/pool')
+        return json.loads(body) if status == 200 else {}
+
+
+# --- Simulation --------------------------------------------------------------
+
+class Statistik:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latenzen = {}      # aktion -> [sekunden]
+        self.ergebnisse = {}    # (aktion, ergebnis) -> anzahl
+        self.beendet = 0        # erfolgreiche Stopps (= erwartete Sitzungen)
+
+    def buchen(self, aktion, dauer, ergebnis):
+        with self._lock:
+            self.latenzen.setdefault(aktion, []).append(dauer)
+            schluessel = (aktion, ergebnis)
+            self.ergebnisse[schluessel] = self.ergebnisse.get(schluessel, 0) + 1
+            if aktion == 'beenden' and ergebnis == 'ok':
+                self.beendet += 1
+
+
+def _aufrufen(client, statistik, aktion, pfad, daten):
+    beginn = time.perf_counter()
+    try:
+        status, antwort = client.post(pfad, daten)
+        if status != 200:
+            ergebnis = f'http {status}'
+        elif antwort.get('status') == 'success':
+            ergebnis = 'ok'
+        else:
+            ergebnis = 'abgelehnt'   # z.B. "arbeitet bereits" beim Doppelklick
+    except Exception as e:
+        ergebnis = type(e).__name__
+    statistik.buchen(aktion, time.perf_counter() - beginn, ergebnis)
+
+
+def mitarbeiter_schleife(client_fabrik, name, projekt_ids, ende, pause, doppelklick, statistik, seed):
+    rng = random.Random(seed)
+    client = client_fabrik()
+    while time.monotonic() < ende:
+        projekt_id = rng.choice(projekt_ids)
+        pfad = f'/projekt/{projekt_id}/aktivität'
+        daten = {'mitarbeiter': name, 'teilbereich': rng.choice(TEILBEREICHE)}
+
+        if rng.random() < doppelklick:
+            # Zwei Starts gleichzeitig (zweiter Client, gleiche Person) - provoziert das Rennen
+            zweiter = threading.Thread(target=_aufrufen,
+                                       args=(client_fabrik(), statistik, 'starten', pfad + '/starten', daten))
+            zweiter.start()
+            _aufrufen(client, statistik, 'starten', pfad + '/starten', daten)
+            zweiter.join()
+        else:
+            _aufrufen(client, statistik, 'starten', pfad + '/starten', daten)
+
+        time.sleep(rng.uniform(0, pause))
+        _aufrufen(client, statistik, 'beenden', pfad + '/beenden', {'mitarbeiter': name})
+        time.sleep(rng.uniform(0, pause))
+
+
+class LockBeobachter(threading.Thread):
+    """Zählt alle 100ms Backends, die auf Locks warten, und doppelte aktive Sitzungen"""
+
+    def __init__(self, intervall=0.1):
+        super().__init__(name='lock-beobachter', daemon=True)
+        self.intervall = intervall
+        self.stopp = threading.Event()
+        self.proben = []            # wartende Backends je Probe
+        self.doppelt_max = 0
+
+    def run(self):
+        conn = neue_verbindung()
+        conn.autocommit = True
+        cursor = conn.cursor()
+        try:
+            while not self.stopp.wait(self.intervall):
+                cursor.execute('''
+                    SELECT
+                        (SELECT COUNT(*) FROM pg_stat_activity
+                         WHERE datname = current_database() AND wait_event_type = 'Lock') AS wartend,
+                        (SELECT COUNT(*) FROM (
+                            SELECT 1 FROM aktive_sitzungen WHERE mitarbeiter LIKE %s
+                            GROUP BY projekt_id, mitarbeiter HAVING COUNT(*) > 1) d) AS doppelt
+                ''', (MITARBEITER_PREFIX + '%',))
+                row = cursor.fetchone()
+                self.proben.append(row['wartend'])
+                self.doppelt_max = max(self.doppelt_max, row['doppelt'])
+        finally:
+            conn.close()
+
+
+def projekte_anlegen(anzahl, email):
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO projekte (name, kunde, ersteller, status)
+            SELECT %s || ' ' || i, 'Lasttest', %s, 'gestoppt' FROM generate_series(1, %s) i
+            RETURNING id
+        ''', (PROJEKT_PREFIX, email, anzahl))
+        return [row['id'] for row in cursor.fetchall()]
+
+
+def anomalien(projekt_ids, erwartete_sitzungen):
+    """Prüft den Datenbestand nach dem Lauf (alle Mitarbeiter haben gestoppt)"""
+    muster = MITARBEITER_PREFIX + '%'
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT
+                (SELECT COUNT(*) FROM aktive_sitzungen WHERE mitarbeiter LIKE %(m)s) AS aktiv_uebrig,
+                (SELECT COUNT(*) FROM sitzungen WHERE mitarbeiter LIKE %(m)s) AS sitzungen,
+                (SELECT COALESCE(SUM(dauer_minuten), 0) FROM sitzungen WHERE mitarbeiter LIKE %(m)s) AS minuten,
+                (SELECT COALESCE(SUM(minuten), 0) FROM sitzungen_tage WHERE mitarbeiter LIKE %(m)s) AS rollup_minuten,
+                (SELECT COUNT(*) FROM projekte p WHERE p.id = ANY(%(ids)s) AND p.status = 'laufend'
+                   AND NOT EXISTS (SELECT 1 FROM aktive_sitzungen a WHERE a.projekt_id = p.id)) AS laufend_ohne_aktive,
+                (SELECT COUNT(*) FROM projekte p WHERE p.id = ANY(%(ids)s) AND p.status <> 'laufend'
+                   AND EXISTS (SELECT 1 FROM aktive_sitzungen a WHERE a.projekt_id = p.id)) AS aktive_ohne_laufend,
+                (SELECT COUNT(*) FROM sitzungen s1 JOIN sitzungen s2
+                   ON s1.mitarbeiter = s2.mitarbeiter AND s1.id < s2.id
+                  AND s1.start_zeit < s2.end_zeit AND s2.start_zeit < s1.end_zeit
+                  WHERE s1.mitarbeiter LIKE %(m)s) AS ueberlappend
+        ''', {'m': muster, 'ids': projekt_ids})
+        befund = dict(cursor.fetchone())
+        befund['zaehler_abweichend'] = len(zaehler_abgleichen(cursor, projekt_ids, nur_pruefen=True))
+    befund['sitzungen_erwartet'] = erwartete_sitzungen
+    return befund
+
+
+def aufraeumen(projekt_ids):
+    from projekt_daten import projekte_loeschen
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM sitzungen_tage WHERE mitarbeiter LIKE %s', (MITARBEITER_PREFIX + '%',))
+        projekte_loeschen(cursor, projekt_ids)
+
+
+def simulieren(mitarbeiter, projekte, dauer, pause, doppelklick, url=None, email=BENCHMARK_EMAIL,
+               passwort=BENCHMARK_PASSWORT, seed=1, behalten=False):
+    if url:
+        client_fabrik = lambda: HttpClient(url, email, passwort)
+    else:
+        client_fabrik = lambda: TestClient(email)
+
+    projekt_ids = projekte_anlegen(projekte, email)
+    statistik = Statistik()
+    beobachter = LockBeobachter()
+    beobachter.start()
+
+    ende = time.monotonic() + dauer
+    beginn = time.monotonic()
+    threads = [
+        threading.Thread(target=mitarbeiter_schleife, name=f'ma-{i}',
+                         args=(client_fabrik, f'{MITARBEITER_PREFIX} {i:03d}', projekt_ids, ende,
+                               pause, doppelklick, statistik, seed * 1000 + i))
+        for i in range(mitarbeiter)
+    ]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        laufzeit = time.monotonic() - beginn
+        beobachter.stopp.set()
+        beobachter.join()
+
+        pool = client_fabrik().pool()
+        befund = anomalien(projekt_ids, statistik.beendet)
+    finally:
+        beobachter.stopp.set()
+        if not behalten:
+            aufraeumen(projekt_ids)
+
+    return {
+        'modus': url or 'test-client',
+        'mitarbeiter': mitarbeiter,
+        'projekte': projekte,
+        'laufzeit': laufzeit,
+        'statistik': statistik,
+        'lock_wartend': beobachter.proben,
+        'doppelt_aktiv_max': beobachter.doppelt_max,
+        'pool': pool,
+        'befund': befund,
+    }
+
+
+def ausgeben(ergebnis):
+    statistik = ergebnis['statistik']
+    gesamt = sum(len(l) for l in statistik.latenzen.values())
+    print(f"\n🏗️  {ergebnis['mitarbeiter']} Mitarbeiter auf {ergebnis['projekte']} Projekten, "
+          f"{ergebnis['laufzeit']:.1f}s ({ergebnis['modus']})")
+    print(f"   Durchsatz: {gesamt / ergebnis['laufzeit']:.1f} Requests/s")
+
+    print(f"\n{'Aktion':<10} {'n':>7} {'/s':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for aktion, werte in sorted(statistik.latenzen.items()):
+        ms = sorted(w * 1000 for w in werte)
+        print(f"{aktion:<10} {len(ms):>7} {len(ms) / ergebnis['laufzeit']:>7.1f} "
+              f"{perzentil(ms, 0.5):>8.1f} {perzentil(ms, 0.9):>8.1f} {perzentil(ms, 0.99):>8.1f} {ms[-1]:>8.1f}")
+
+    print('\nErgebnisse:')
+    for (aktion, ergebnis_text), anzahl in sorted(statistik.ergebnisse.items()):
+        print(f"   {aktion:<10} {ergebnis_text:<15} {anzahl:>7}")
+
+    proben = ergebnis['lock_wartend']
+    if proben:
+        print(f"\n🔒 Auf Locks wartende Backends: Ø {sum(proben) / len(proben):.2f}, max {max(proben)}, "
+              f"in {sum(1 for p in proben if p) / len(proben):.0%} der Proben")
+    pool = ergebnis['pool']
+    if pool:
+        print(f"🔌 Pool (dieser Worker): max {pool.get('maximum')}, Wartezeit Ø {pool.get('wartezeit_durchschnitt_ms')}ms "
+              f"/ max {pool.get('wartezeit_max_ms')}ms, Timeouts {pool.get('timeouts')}")
+
+    befund = ergebnis['befund']
+    probleme = {
+        'doppelte aktive Sitzungen (während des Laufs, max)': ergebnis['doppelt_aktiv_max'],
+        'aktive Sitzungen nach dem Lauf': befund['aktiv_uebrig'],
+        'Sitzungen gespeichert - erwartet': befund['sitzungen'] - befund['sitzungen_erwartet'],
+        'Rollup-Minuten - Sitzungs-Minuten': befund['rollup_minuten'] - befund['minuten'],
+        'Projekte "laufend" ohne aktive Sitzung': befund['laufend_ohne_aktive'],
+        'Projekte mit aktiver Sitzung nicht "laufend"': befund['aktive_ohne_laufend'],
+        'überlappende Sitzungen derselben Person': befund['ueberlappend'],
+        'Projekte mit abweichenden Zählern': befund['zaehler_abweichend'],
+    }
+    print('\n🔍 Anomalien:')
+    for text, wert in probleme.items():
+        print(f"   {'❌' if wert else '✅'} {text}: {wert}")
+    return sum(1 for wert in probleme.values() if wert)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gleichzeitige Start/Stopp-Last simulieren')
+    parser.add_argument('--mitarbeiter', type=int, default=50)
+    parser.add_argument('--projekte', type=int, default=10)
+    parser.add_argument('--dauer', type=float, default=30, help='Sekunden')
+    parser.add_argument('--pause', type=float, default=0.2, help='max. Pause zwischen Start und Stopp (s)')
+    parser.add_argument('--doppelklick', type=float, default=0.0, help='Anteil doppelt gesendeter Starts')
+    parser.add_argument('--url', help='laufender Server statt Test-Client, z.B. http://127.0.0.1:8000')
+    parser.add_argument('--email', default=BENCHMARK_EMAIL)
+    parser.add_argument('--passwort', default=BENCHMARK_PASSWORT)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--behalten', action='store_true', help='Projekte/Sitzungen nicht aufräumen')
+    args = parser.parse_args(argv)
+
+    if not ist_lokal():
+        print("❌ Datenbank ist nicht lokal - Abbruch")
+        sys.exit(1)
+
+    # Vor app_db einrichten - sonst schreibt jeder Start/Stopp eine INFO-Zeile
+    einrichten(level=os.environ.get('LOG_LEVEL', 'WARNING'))
+
+    ergebnis = simulieren(args.mitarbeiter, args.projekte, args.dauer, args.pause, args.doppelklick,
+                          url=args.url, email=args.email, passwort=args.passwort, seed=args.seed,
+                          behalten=args.behalten)
+    if ausgeben(ergebnis):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
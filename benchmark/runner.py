@@ -0,0 +1,208 @@
+"""
+Benchmark-Runner: Szenarien ausführen, Perzentile ausgeben, mit Baseline vergleichen
+
+    python -m benchmark                                   # alle Szenarien, 100 Runden
+    python -m benchmark -n 300 --szenarien projekt_details,export_vorschau
+    python -m benchmark --speichern benchmark/baseline.json
+    python -m benchmark --baseline benchmark/baseline.json --toleranz 0.15
+
+Mit --baseline endet der Lauf mit Exit-Code 1, wenn ein Request in p50/p90
+oder bei der SQL-Anzahl um mehr als die Toleranz schlechter geworden ist.
+Der Bericht-Cache ist standardmäßig aus (sonst misst man nur den Cache).
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import subprocess
+from datetime import datetime
+
+VERGLEICH = ('p50_ms', 'p90_ms', 'sql_mittel')
+RAUSCHEN_MS = 1.0   # kleinere Differenzen sind Messrauschen
+
+
+def _auswerten(werte):
+    from metriken import perzentil
+
+    dauer = sorted(w[0] * 1000 for w in werte)
+    sql = [w[1] for w in werte]
+    db = sorted(w[2] * 1000 for w in werte)
+    return {
+        'n': len(werte),
+        'p50_ms': round(perzentil(dauer, 0.5), 2),
+        'p90_ms': round(perzentil(dauer, 0.9), 2),
+        'p99_ms': round(perzentil(dauer, 0.99), 2),
+        'max_ms': round(dauer[-1], 2),
+        'sql_mittel': round(sum(sql) / len(sql), 2),
+        'sql_max': max(sql),
+        'db_p50_ms': round(perzentil(db, 0.5), 2),
+    }
+
+
+def _git_stand():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def _datenbestand(cursor):
+    cursor.execute('''
+        SELECT (SELECT COUNT(*) FROM projekte) AS projekte,
+               (SELECT COUNT(*) FROM sitzungen) AS sitzungen,
+               (SELECT COUNT(*) FROM aktive_sitzungen) AS aktive_sitzungen
+    ''')
+    return dict(cursor.fetchone())
+
+
+def ausfuehren(szenarien, runden, aufwaermen, seed, mit_cache=False):
+    """Führt die Szenarien abwechselnd aus und liefert das Ergebnis-Dict"""
+    if not mit_cache:
+        os.environ['BERICHT_CACHE_MAX'] = '0'
+    # Vor app_db einrichten - sonst schreibt jeder Request eine INFO-Zeile
+    from protokoll import einrichten
+    einrichten(level=os.environ.get('LOG_LEVEL', 'WARNING'))
+
+    from app_db import app
+    from database import db_verbindung
+    from benchmark.daten import BENCHMARK_EMAIL
+    from benchmark.szenarien import SZENARIEN, Kontext, aufraeumen
+
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        bestand = _datenbestand(cursor)
+        cursor.execute("SELECT id FROM projekte WHERE status <> 'beendet' ORDER BY id")
+        projekt_ids = [row['id'] for row in cursor.fetchall()]
+    if not projekt_ids:
+        raise SystemExit('❌ Keine offenen Projekte - erst python -m benchmark.daten ausführen')
+
+    rng = random.Random(seed)
+    kontext = Kontext(app, rng, BENCHMARK_EMAIL, projekt_ids)
+    ablauf = [SZENARIEN[name] for name in szenarien]
+
+    try:
+        # Aufwärmen: Pool, Stammdaten-Cache, Templates - nicht mitzählen
+        for _ in range(aufwaermen):
+            for szenario in ablauf:
+                szenario(kontext)
+        kontext.messungen.clear()
+        kontext.fehler.clear()
+
+        for runde in range(runden):
+            # Reihenfolge pro Runde mischen, damit kein Szenario immer "kalt" startet
+            for szenario in rng.sample(ablauf, len(ablauf)):
+                szenario(kontext)
+            if (runde + 1) % 25 == 0:
+                print(f"   Runde {runde + 1}/{runden}", file=sys.stderr)
+    finally:
+        with db_verbindung() as conn:
+            aufraeumen(conn.cursor())
+
+    return {
+        'zeitpunkt': datetime.now().isoformat(timespec='seconds'),
+        'git': _git_stand(),
+        'runden': runden,
+        'mit_cache': mit_cache,
+        'datenbestand': bestand,
+        'fehler': kontext.fehler,
+        'requests': {name: _auswerten(werte) for name, werte in sorted(kontext.messungen.items())},
+    }
+
+
+def _delta(neu, alt):
+    if not alt:
+        return ''
+    return f'{(neu - alt) / alt * 100:+.0f}%'
+
+
+def vergleichen(ergebnis, baseline, toleranz):
+    """Liefert [(request, kennzahl, alt, neu)] für alle Verschlechterungen über der Toleranz"""
+    schlechter = []
+    for name, neu in ergebnis['requests'].items():
+        alt = baseline['requests'].get(name)
+        if not alt:
+            continue
+        for kennzahl in VERGLEICH:
+            grenze = alt[kennzahl] * (1 + toleranz)
+            if kennzahl.endswith('_ms'):
+                grenze = max(grenze, alt[kennzahl] + RAUSCHEN_MS)
+            if neu[kennzahl] > grenze:
+                schlechter.append((name, kennzahl, alt[kennzahl], neu[kennzahl]))
+    return schlechter
+
+
+def ausgeben(ergebnis, baseline=None):
+    bestand = ergebnis['datenbestand']
+    print(f"\n📊 Benchmark {ergebnis['zeitpunkt']} ({ergebnis['git'] or 'ohne git'}) - "
+          f"{bestand['projekte']} Projekte, {bestand['sitzungen']} Sitzungen, "
+          f"{ergebnis['runden']} Runden{', mit Bericht-Cache' if ergebnis['mit_cache'] else ''}")
+    if baseline and baseline.get('datenbestand') != bestand:
+        print(f"⚠️  Baseline hatte anderen Datenbestand: {baseline.get('datenbestand')}")
+
+    kopf = f"{'Request':<20} {'n':>5} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} " \
+           f"{'SQL Ø':>7} {'SQL max':>8} {'DB p50':>8}"
+    if baseline:
+        kopf += f" {'Δ p50':>7} {'Δ p90':>7} {'Δ SQL':>7}"
+    print(kopf)
+    print('-' * len(kopf))
+
+    for name, w in ergebnis['requests'].items():
+        zeile = f"{name:<20} {w['n']:>5} {w['p50_ms']:>9.1f} {w['p90_ms']:>9.1f} {w['p99_ms']:>9.1f} " \
+                f"{w['max_ms']:>9.1f} {w['sql_mittel']:>7.1f} {w['sql_max']:>8} {w['db_p50_ms']:>8.1f}"
+        alt = (baseline or {}).get('requests', {}).get(name)
+        if alt:
+            zeile += f" {_delta(w['p50_ms'], alt['p50_ms']):>7} {_delta(w['p90_ms'], alt['p90_ms']):>7}" \
+                     f" {_delta(w['sql_mittel'], alt['sql_mittel']):>7}"
+        print(zeile)
+
+    for name, anzahl in ergebnis['fehler'].items():
+        print(f"⚠️  {name}: {anzahl} fehlerhafte Antworten")
+
+
+def main(argv=None):
+    from benchmark.szenarien import SZENARIEN
+
+    parser = argparse.ArgumentParser(description='Benchmark der Routen gegen eine lokale Datenbank')
+    parser.add_argument('-n', '--runden', type=int, default=100)
+    parser.add_argument('--aufwaermen', type=int, default=5)
+    parser.add_argument('--szenarien', default=','.join(SZENARIEN),
+                        help=f"kommagetrennt aus: {', '.join(SZENARIEN)}")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--mit-cache', action='store_true', help='Bericht-Cache eingeschaltet lassen')
+    parser.add_argument('--baseline', help='JSON einer früheren Messung zum Vergleich')
+    parser.add_argument('--toleranz', type=float, default=0.15, help='erlaubte Verschlechterung (0.15 = 15%%)')
+    parser.add_argument('--speichern', help='Ergebnis als JSON ablegen (z.B. als neue Baseline)')
+    args = parser.parse_args(argv)
+
+    szenarien = [s.strip() for s in args.szenarien.split(',') if s.strip()]
+    unbekannt = [s for s in szenarien if s not in SZENARIEN]
+    if unbekannt:
+        parser.error(f"Unbekannte Szenarien: {', '.join(unbekannt)}")
+
+    from benchmark.daten import ist_lokal
+    if not ist_lokal():
+        print("❌ Datenbank ist nicht lokal - Benchmarks schreiben Sitzungen, Abbruch")
+        sys.exit(1)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    ergebnis = ausfuehren(szenarien, args.runden, args.aufwaermen, args.seed, mit_cache=args.mit_cache)
+    ausgeben(ergebnis, baseline)
+
+    if args.speichern:
+        with open(args.speichern, 'w', encoding='utf-8') as f:
+            json.dump(ergebnis, f, ensure_ascii=False, indent=2)
+        print(f"💾 Gespeichert: {args.speichern}")
+
+    if baseline:
+        schlechter = vergleichen(ergebnis, baseline, args.toleranz)
+        for name, kennzahl, alt, neu in schlechter:
+            print(f"❌ {name} {kennzahl}: {alt} → {neu}")
+        if schlechter:
+            sys.exit(1)
+        print(f"✅ Keine Verschlechterung über {args.toleranz:.0%} gegenüber der Baseline")
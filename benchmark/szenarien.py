@@ -0,0 +1,111 @@
+"""
+Benchmark-Szenarien - je Route ein Ablauf über den Flask-Test-Client
+
+Ein Szenario ist eine Funktion szenario(kontext), die über kontext.anfrage()
+einen oder mehrere Requests absetzt; jeder Request wird unter seinem Namen
+gemessen (Latenz, SQL-Anzahl, DB-Zeit aus metriken.py).
+"""
+import time
+from datetime import date, timedelta
+
+from metriken import letzte_messung
+
+LAEUFER_PREFIX = 'Bench-Läufer'
+
+
+class Kontext:
+    """Eingeloggter Test-Client plus Stichproben aus dem Datenbestand"""
+
+    def __init__(self, app, rng, email, projekt_ids, laeufer=20, tage=730):
+        self.client = app.test_client()
+        self.rng = rng
+        self.projekt_ids = projekt_ids
+        self.laeufer = [f'{LAEUFER_PREFIX} {i:02d}' for i in range(laeufer)]
+        self.heute = date.today()
+        self.tage = tage
+        self.messungen = {}     # name -> [(sekunden, sql_anzahl, db_sekunden)]
+        self.fehler = {}        # name -> Anzahl
+
+        with self.client.session_transaction() as session:
+            session['benutzer_email'] = email
+            session['benutzer_name'] = 'Benchmark'
+            session['team_mitglied'] = True
+
+    def anfrage(self, name, methode, pfad, erwartet=(200,), **kwargs):
+        """Ein Request inkl. kompletter Antwort (auch bei Streams), dann messen"""
+        beginn = time.perf_counter()
+        response = self.client.open(pfad, method=methode, **kwargs)
+        response.get_data()
+        response.close()   # löst die Messung in metriken.py aus
+        dauer = time.perf_counter() - beginn
+
+        messung = letzte_messung()
+        sql_anzahl, db_zeit = (messung[1], messung[2]) if messung else (0, 0.0)
+        self.messungen.setdefault(name, []).append((dauer, sql_anzahl, db_zeit))
+        if response.status_code not in erwartet or (response.is_json and response.json.get('status') == 'error'):
+            self.fehler[name] = self.fehler.get(name, 0) + 1
+        return response
+
+    def projekt(self):
+        return self.rng.choice(self.projekt_ids)
+
+    def zeitraum(self, tage):
+        """Zufälliges Fenster von `tage` Tagen innerhalb des Datenbestands"""
+        bis = self.heute - timedelta(days=self.rng.randrange(0, max(1, self.tage - tage)))
+        return (bis - timedelta(days=tage)).isoformat(), bis.isoformat()
+
+
+def dashboard(k):
+    k.anfrage('dashboard', 'GET', '/dashboard')
+
+
+def projekt_details(k):
+    k.anfrage('projekt_details', 'GET', f'/projekt/{k.projekt()}')
+
+
+def aktivitaet_starten_beenden(k):
+    projekt_id, mitarbeiter = k.projekt(), k.rng.choice(k.laeufer)
+    k.anfrage('aktivität_starten', 'POST', f'/projekt/{projekt_id}/aktivität/starten',
+              data={'mitarbeiter': mitarbeiter, 'teilbereich': k.rng.choice(['besprechung', 'zeichnung', 'aufmass'])})
+    k.anfrage('aktivität_beenden', 'POST', f'/projekt/{projekt_id}/aktivität/beenden',
+              data={'mitarbeiter': mitarbeiter})
+
+
+def export_vorschau(k):
+    von, bis = k.zeitraum(30)
+    k.anfrage('export_vorschau', 'POST', '/export/vorschau',
+              data={'von_datum': von, 'bis_datum': bis, 'format': 'pdf'})
+
+
+def gesamt_bericht(k):
+    von, bis = k.zeitraum(90)
+    k.anfrage('gesamt_bericht', 'GET', f'/gesamt-bericht?von={von}&bis={bis}')
+
+
+def export_vollbericht(k):
+    von, bis = k.zeitraum(90)
+    k.anfrage('export_vollbericht', 'GET', f'/export/vollbericht?von={von}&bis={bis}')
+
+
+SZENARIEN = {
+    'dashboard': dashboard,
+    'projekt_details': projekt_details,
+    'aktivität': aktivitaet_starten_beenden,
+    'export_vorschau': export_vorschau,
+    'gesamt_bericht': gesamt_bericht,
+    'export_vollbericht': export_vollbericht,
+}
+
+
+def aufraeumen(cursor):
+    """Entfernt die Sitzungen der Benchmark-Läufer wieder (inkl. Rollup und Zähler)"""
+    from projekt_zaehler import zaehler_abgleichen
+    muster = LAEUFER_PREFIX + '%'
+    cursor.execute('DELETE FROM aktive_sitzungen WHERE mitarbeiter LIKE %s RETURNING projekt_id', (muster,))
+    projekt_ids = {row['projekt_id'] for row in cursor.fetchall()}
+    cursor.execute('DELETE FROM sitzungen WHERE mitarbeiter LIKE %s RETURNING projekt_id', (muster,))
+    zeilen = cursor.fetchall()
+    projekt_ids.update(row['projekt_id'] for row in zeilen)
+    cursor.execute('DELETE FROM sitzungen_tage WHERE mitarbeiter LIKE %s', (muster,))
+    zaehler_abgleichen(cursor, projekt_ids)
+    return len(zeilen)
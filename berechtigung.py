@@ -0,0 +1,145 @@
+"""
+Team-Berechtigung des angemeldeten Benutzers
+
+Reihenfolge der Quellen (die erste Treffer gewinnt):
+  1. flask.g            - einmal pro Request
+  2. Prozess-Cache      - mit TTL und LRU-Grenze, explizit invalidierbar
+  3. Session            - [ist_team, geprüft_um], nur CACHE_TTL Sekunden gültig
+                          und nur, wenn seitdem nicht vergessen wurde
+  4. Datenbank          - nur wenn alles andere leer ist
+
+Nach Registrierung oder Passwort-Änderung berechtigung_vergessen(email)
+aufrufen (wie db_benutzer.vergessen in anmeldung.py). Das gilt für alle
+Sessions des Benutzers: in diesem Worker sofort, in anderen Workern
+spätestens nach CACHE_TTL Sekunden.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from flask import g, session
+from database import db_verbindung
+from anmeldung import db_benutzer
+
+TEAM_CODE = 'RAUSCH2025'
+CACHE_TTL = float(os.environ.get('BERECHTIGUNG_CACHE_TTL', '300'))
+CACHE_MAX = int(os.environ.get('BERECHTIGUNG_CACHE_MAX', '1000'))
+
+_cache = OrderedDict()      # email -> (ist_team_mitglied, ablauf) (LRU)
+_ersteller = OrderedDict()  # projekt_id -> ersteller (ändert sich nie, LRU)
+_vergessen = OrderedDict()  # email -> time.time() des letzten berechtigung_vergessen (LRU)
+_cache_lock = threading.Lock()
+
+
+def _aus_datenbank(email):
+    benutzer = db_benutzer.holen(email)
+    return bool(benutzer) and benutzer['team_code_verwendet'] == TEAM_CODE
+
+
+def _aus_cache(email):
+    with _cache_lock:
+        eintrag = _cache.get(email)
+        if eintrag and eintrag[1] > time.monotonic():
+            _cache.move_to_end(email)
+            return eintrag[0]
+        _cache.pop(email, None)
+    return None
+
+
+def _merken(cache, schluessel, wert):
+    with _cache_lock:
+        cache[schluessel] = wert
+        cache.move_to_end(schluessel)
+        while len(cache) > CACHE_MAX:
+            cache.popitem(last=False)
+
+
+def _aus_session(email):
+    """Session-Wert, solange er jünger als CACHE_TTL ist und nicht vergessen wurde"""
+    wert = session.get('team_mitglied')
+    if not isinstance(wert, list) or len(wert) != 2:
+        return None     # alte Sessions (nur True/False) - neu prüfen
+    ist_team, geprueft_um = wert
+    with _cache_lock:
+        vergessen_um = max(_vergessen.get(email, 0), _vergessen.get(None, 0))
+    if geprueft_um + CACHE_TTL < time.time() or geprueft_um <= vergessen_um:
+        return None
+    return ist_team
+
+
+def _festhalten(email, ist_team):
+    session['team_mitglied'] = [ist_team, time.time()]
+    _merken(_cache, email, (ist_team, time.monotonic() + CACHE_TTL))
+
+
+def berechtigung_merken(email, team_code):
+    """Beim Login/Registrieren aufrufen - legt die Team-Zugehörigkeit in Session und Cache ab"""
+    ist_team = team_code == TEAM_CODE
+    _festhalten(email, ist_team)
+    return ist_team
+
+
+def berechtigung_vergessen(email=None):
+    """
+    Invalidiert Cache und Session-Werte eines Benutzers (oder aller), z.B. nach
+    Änderung des Team-Codes - auch Sessions auf anderen Geräten prüfen neu.
+    """
+    jetzt = time.time()
+    with _cache_lock:
+        if email is None:
+            _cache.clear()
+            _vergessen.clear()
+        else:
+            _cache.pop(email, None)
+    _merken(_vergessen, email, jetzt)
+    g.pop('team_mitglied', None)
+
+
+def ist_team_mitglied():
+    """True, wenn der angemeldete Benutzer alle Projekte sehen darf"""
+    if 'team_mitglied' in g:
+        return g.team_mitglied
+
+    email = session.get('benutzer_email')
+    if not email:
+        ist_team = False
+    else:
+        ist_team = _aus_cache(email)
+        if ist_team is None:
+            ist_team = _aus_session(email)
+        if ist_team is None:
+            ist_team = _aus_datenbank(email)
+            _festhalten(email, ist_team)
+
+    g.team_mitglied = ist_team
+    return ist_team
+
+
+def ersteller_filter():
+    """None für Team-Mitglieder (alle Projekte), sonst die eigene E-Mail"""
+    return None if ist_team_mitglied() else session.get('benutzer_email')
+
+
+def darf_projekt_sehen(projekt):
+    """Team-Mitglieder sehen alles, andere nur ihre eigenen Projekte"""
+    return ist_team_mitglied() or projekt.get('ersteller') == session.get('benutzer_email')
+
+
+def darf_projekt_id_sehen(projekt_id):
+    """Wie darf_projekt_sehen, lädt den Ersteller aber nur einmal pro Worker"""
+    if ist_team_mitglied():
+        return True
+    with _cache_lock:
+        ersteller = _ersteller.get(projekt_id)
+        if ersteller is not None:
+            _ersteller.move_to_end(projekt_id)
+    if ersteller is None:
+        with db_verbindung() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT ersteller FROM projekte WHERE id = %s', (projekt_id,))
+            row = cursor.fetchone()
+        if not row:
+            return False
+        ersteller = row['ersteller']
+        _merken(_ersteller, projekt_id, ersteller)
+    return ersteller == session.get('benutzer_email')
@@ -0,0 +1,178 @@
+"""
+Cache für fertige Berichte (export_vorschau, projekt_bericht, gesamt_bericht,
+export_vollbericht)
+
+Schlüssel: (Berichtstyp, Scope, von, bis) - Scope ist der Ersteller-Filter
+(None = Team) bzw. die Projekt-ID. Schreibende Requests melden, welche
+Projekte und Tage sie verändert haben (berichte_geaendert); per NOTIFY
+erfahren alle Worker davon und verwerfen genau die betroffenen Einträge.
+Ohne verbundenen Listener wird nichts gecacht (sonst drohen veraltete Daten).
+
+Antworten tragen ETag und Last-Modified; eine Wiederholung mit
+If-None-Match/If-Modified-Since wird mit 304 beantwortet, ohne Postgres.
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from flask import Response, request
+from live import abonnieren, bei_verbindung, listener_starten, listener_verbunden, melden
+from zeit import kalendertag
+
+KANAL = 'berichte'
+CACHE_MAX = int(os.environ.get('BERICHT_CACHE_MAX', '200'))
+CACHE_MAX_BYTES = int(os.environ.get('BERICHT_CACHE_MAX_BYTES', str(2 * 1024 * 1024)))
+NOTIFY_MAX_BYTES = 7000   # Postgres erlaubt knapp 8000 Bytes Payload
+
+_cache = OrderedDict()    # schluessel -> eintrag (LRU)
+_lock = threading.Lock()
+_generation = 0           # steigt bei jeder Invalidierung
+
+
+def _als_datum(wert):
+    if isinstance(wert, datetime):
+        return kalendertag(wert)
+    if wert is None or isinstance(wert, date):
+        return wert
+    try:
+        return date.fromisoformat(str(wert)[:10])
+    except ValueError:
+        return None
+
+
+def bericht_schluessel(typ, scope=None, von=None, bis=None):
+    return (typ, scope, _als_datum(von), _als_datum(bis))
+
+
+def aenderung(projekt_id, ersteller=None, tag_von=None, tag_bis=None, beendet_am=None):
+    """Eine Änderung an einem Projekt: betroffene Sitzungstage und ggf. Beendet-Datum"""
+    tag_von = _als_datum(tag_von)
+    tag_bis = _als_datum(tag_bis) or tag_von
+    beendet_am = _als_datum(beendet_am)
+    return {
+        'projekt_id': projekt_id,
+        'ersteller': ersteller,
+        'tag_von': tag_von.isoformat() if tag_von else None,
+        'tag_bis': tag_bis.isoformat() if tag_bis else None,
+        'beendet_am': beendet_am.isoformat() if beendet_am else None,
+    }
+
+
+def _im_zeitraum(von, bis, tag):
+    return tag is not None and (von is None or von <= tag) and (bis is None or tag <= bis)
+
+
+def _betroffen(schluessel, a):
+    typ, scope, von, bis = schluessel
+
+    if typ == 'projekt':
+        return scope == a['projekt_id']
+
+    if typ == 'vorschau':
+        if scope is not None and a['ersteller'] is not None and scope != a['ersteller']:
+            return False
+        if a['tag_von'] is None:
+            return False
+        tag_von, tag_bis = date.fromisoformat(a['tag_von']), date.fromisoformat(a['tag_bis'])
+        return (bis is None or tag_von <= bis) and (von is None or von <= tag_bis)
+
+    # gesamt / vollbericht: nur beendete Projekte im Zeitraum (nach beendet_am)
+    if a['beendet_am'] is None:
+        return False
+    return _im_zeitraum(von, bis, date.fromisoformat(a['beendet_am']))
+
+
+def _invalidieren(daten):
+    global _generation
+    with _lock:
+        _generation += 1
+        if daten.get('alles'):
+            _cache.clear()
+            return
+        for schluessel in [s for s in _cache
+                           if any(_betroffen(s, a) for a in daten['aenderungen'])]:
+            del _cache[schluessel]
+
+
+def _alles_verwerfen():
+    _invalidieren({'alles': True})
+
+
+abonnieren(KANAL, _invalidieren)
+bei_verbindung(_alles_verwerfen)
+
+
+def berichte_geaendert(cursor, aenderungen):
+    """In der schreibenden Transaktion aufrufen - alle Worker verwerfen betroffene Berichte"""
+    daten = {'aenderungen': aenderungen}
+    if len(json.dumps(daten)) > NOTIFY_MAX_BYTES:
+        daten = {'alles': True}
+    melden(cursor, KANAL, daten)
+    _invalidieren(daten)   # eigener Worker sofort
+
+
+def berichte_geaendert_lokal(aenderungen):
+    """Das NOTIFY ging schon im schreibenden Statement raus (aktivitaet.py) - nur eigener Worker"""
+    _invalidieren({'aenderungen': aenderungen})
+
+
+def bericht_holen(schluessel):
+    """Gecachter Eintrag oder None; liefert außerdem den Stand für bericht_speichern()"""
+    listener_starten()
+    with _lock:
+        stand = _generation
+        if not listener_verbunden():
+            return None, None
+        eintrag = _cache.get(schluessel)
+        if eintrag is not None:
+            _cache.move_to_end(schluessel)
+        return eintrag, stand
+
+
+def bericht_speichern(schluessel, body, mimetype, stand):
+    """
+    Legt einen fertigen Bericht ab - aber nur, wenn seit bericht_holen()
+    nichts invalidiert wurde (sonst könnte ein veralteter Stand liegen bleiben).
+    """
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    eintrag = {
+        'body': body,
+        'mimetype': mimetype,
+        'etag': hashlib.sha1(body).hexdigest(),
+        'zuletzt_geaendert': datetime.now(timezone.utc).replace(microsecond=0),
+    }
+    if stand is None or len(body) > CACHE_MAX_BYTES:
+        return eintrag
+    with _lock:
+        if stand == _generation and listener_verbunden():
+            _cache[schluessel] = eintrag
+            _cache.move_to_end(schluessel)
+            while len(_cache) > CACHE_MAX:
+                _cache.popitem(last=False)
+    return eintrag
+
+
+def bericht_antwort(eintrag):
+    """Response mit ETag/Last-Modified - bei passendem If-None-Match 304"""
+    response = Response(eintrag['body'], mimetype=eintrag['mimetype'])
+    response.set_etag(eintrag['etag'])
+    response.last_modified = eintrag['zuletzt_geaendert']
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+def bericht_mitschreiben(schluessel, chunks, mimetype, stand):
+    """Reicht einen gestreamten Bericht durch und legt ihn danach im Cache ab"""
+    teile, groesse = [], 0
+    for chunk in chunks:
+        if teile is not None:
+            teile.append(chunk)
+            groesse += len(chunk)
+            if groesse > CACHE_MAX_BYTES:
+                teile = None   # zu groß - nicht cachen, Speicher bleibt flach
+        yield chunk
+    if teile is not None:
+        bericht_speichern(schluessel, ''.join(teile), mimetype, stand)
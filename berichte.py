@@ -0,0 +1,195 @@
+"""
+Berichts-Engine: Minuten-Summen je Projekt, Mitarbeiter und Teilbereich
+in einer einzigen gruppierten Abfrage (statt einer Abfrage pro Projekt)
+
+Die Summen kommen aus dem Tages-Rollup sitzungen_tage (ein Eintrag je
+Tag/Projekt/Mitarbeiter/Teilbereich), das beim Beenden einer Sitzung
+fortgeschrieben wird. Neuaufbau:  python berichte.py --rollup-neu
+"""
+import sys
+from projekt_daten import TEILBEREICHE, teilbereich_sql
+from zeit import ZEITZONE_NAME, datum, kalendertag, tag_beginn, tag_ende
+
+# Rollup-Tage sind lokale Kalendertage, nicht UTC-Tage
+LOKALER_TAG_SQL = "({spalte} AT TIME ZONE '%s')::date" % ZEITZONE_NAME
+
+ROLLUP_KONFLIKT_SQL = '''
+    ON CONFLICT (tag, projekt_id, mitarbeiter, teilbereich) DO UPDATE
+    SET minuten = sitzungen_tage.minuten + EXCLUDED.minuten,
+        anzahl = sitzungen_tage.anzahl + EXCLUDED.anzahl
+'''
+
+ROLLUP_BEFUELLEN_SQL = f'''
+    INSERT INTO sitzungen_tage (tag, projekt_id, mitarbeiter, teilbereich, minuten, anzahl)
+    SELECT {LOKALER_TAG_SQL.format(spalte='start_zeit')}, projekt_id, mitarbeiter, {teilbereich_sql()},
+           COALESCE(SUM(dauer_minuten), 0), COUNT(*)
+    FROM sitzungen
+    WHERE end_zeit IS NOT NULL AND projekt_id IS NOT NULL
+'''
+
+
+def rollup_neu_aufbauen(cursor, projekt_ids=None):
+    """Baut das Rollup aus den Roh-Sitzungen neu auf (alle oder nur einzelne Projekte)"""
+    # Schreiber warten, Leser (Berichte) laufen weiter
+    cursor.execute('LOCK TABLE sitzungen_tage IN EXCLUSIVE MODE')
+
+    if projekt_ids is None:
+        cursor.execute('DELETE FROM sitzungen_tage')
+        cursor.execute(ROLLUP_BEFUELLEN_SQL + ' GROUP BY 1, 2, 3, 4')
+    else:
+        cursor.execute('DELETE FROM sitzungen_tage WHERE projekt_id = ANY(%s)', (list(projekt_ids),))
+        cursor.execute(ROLLUP_BEFUELLEN_SQL + ' AND projekt_id = ANY(%s) GROUP BY 1, 2, 3, 4',
+                       (list(projekt_ids),))
+    return cursor.rowcount
+
+
+def _leere_stats():
+    return {'besprechung': 0, 'zeichnung': 0, 'aufmass': 0, 'gesamt': 0}
+
+
+def _filter(sitzungen_von=None, sitzungen_bis=None, beendet_von=None, beendet_bis=None,
+            ersteller=None):
+    """WHERE-Teile für Projekte (p) und Rollup-Zeilen (r) plus Parameter"""
+    projekt_filter = []
+    sitzung_filter = ['TRUE']
+    params = {}
+
+    if sitzungen_von is not None:
+        sitzung_filter.append('r.tag >= %(sitzungen_von)s')
+        params['sitzungen_von'] = kalendertag(sitzungen_von)
+    if sitzungen_bis is not None:
+        sitzung_filter.append('r.tag <= %(sitzungen_bis)s')
+        params['sitzungen_bis'] = kalendertag(sitzungen_bis)
+
+    if beendet_von is not None or beendet_bis is not None:
+        projekt_filter.append("p.status = 'beendet' AND p.beendet_am IS NOT NULL")
+    # Tagesgrenzen als Zeitpunkte - so bleibt der Index auf beendet_am nutzbar
+    if beendet_von is not None:
+        projekt_filter.append('p.beendet_am >= %(beendet_ab)s')
+        params['beendet_ab'] = tag_beginn(beendet_von)
+    if beendet_bis is not None:
+        projekt_filter.append('p.beendet_am < %(beendet_vor)s')
+        params['beendet_vor'] = tag_ende(beendet_bis)
+
+    if ersteller is not None:
+        projekt_filter.append('p.ersteller = %(ersteller)s')
+        params['ersteller'] = ersteller
+
+    where = ('WHERE ' + ' AND '.join(projekt_filter)) if projekt_filter else ''
+    return where, ' AND '.join(sitzung_filter), params
+
+
+def iter_projekt_summen(cursor, leere_projekte=False, sortierung='name', **filter):
+    """
+    Wie lade_projekt_summen, liefert die Projekte aber einzeln nacheinander.
+    Mit einem benannten (serverseitigen) Cursor bleibt der Speicher auch bei
+    tausenden Projekten flach.
+    """
+    where, sitzung_where, params = _filter(**filter)
+    join = 'LEFT JOIN' if leere_projekte else 'JOIN'
+    order = 'p.beendet_am DESC, p.id' if sortierung == 'beendet_am' else 'p.name, p.id'
+
+    cursor.execute(f'''
+        SELECT p.id, p.name, p.kunde, p.status, p.erstellt_am, p.beendet_am,
+               r.mitarbeiter, r.teilbereich,
+               COALESCE(SUM(r.minuten), 0)::bigint AS minuten
+        FROM projekte p
+        {join} sitzungen_tage r ON r.projekt_id = p.id AND {sitzung_where}
+        {where}
+        GROUP BY p.id, r.mitarbeiter, r.teilbereich
+        ORDER BY {order}
+    ''', params)
+
+    # Zeilen eines Projekts kommen durch die Sortierung direkt hintereinander
+    projekt = None
+    for row in cursor:
+        if projekt is None or projekt['id'] != row['id']:
+            if projekt is not None:
+                yield projekt
+            projekt = {
+                'id': row['id'],
+                'name': row['name'],
+                'kunde': row['kunde'],
+                'status': row['status'],
+                'erstellt_am': row['erstellt_am'],
+                'beendet_am': row['beendet_am'],
+                'beendet_datum': datum(row['beendet_am']),
+                'mitarbeiter_stats': {},
+                'teilbereiche': {tb: 0 for tb in TEILBEREICHE},
+                'gesamt_minuten': 0
+            }
+
+        if row['mitarbeiter'] is None:  # LEFT JOIN ohne Sitzungen
+            continue
+
+        minuten = row['minuten']
+        stats = projekt['mitarbeiter_stats'].setdefault(row['mitarbeiter'], _leere_stats())
+        if row['teilbereich'] in TEILBEREICHE:
+            stats[row['teilbereich']] += minuten
+            projekt['teilbereiche'][row['teilbereich']] += minuten
+        stats['gesamt'] += minuten
+        projekt['gesamt_minuten'] += minuten
+
+    if projekt is not None:
+        yield projekt
+
+
+def lade_projekt_summen(cursor, sitzungen_von=None, sitzungen_bis=None,
+                        beendet_von=None, beendet_bis=None, ersteller=None,
+                        leere_projekte=False, sortierung='name'):
+    """
+    Summiert abgeschlossene Sitzungen je Projekt/Mitarbeiter/Teilbereich
+    (liest nur das Tages-Rollup, nie die Roh-Sitzungen).
+
+    sitzungen_von/bis  - nur Sitzungen, die an diesen Tagen begonnen haben
+    beendet_von/bis    - nur beendete Projekte, deren beendet_am (lokaler Tag) im Zeitraum liegt
+    ersteller          - nur Projekte dieses Benutzers (None = alle)
+    leere_projekte     - Projekte ohne passende Sitzungen mitliefern
+    sortierung         - 'name' oder 'beendet_am' (absteigend)
+    """
+    return list(iter_projekt_summen(
+        cursor, leere_projekte=leere_projekte, sortierung=sortierung,
+        sitzungen_von=sitzungen_von, sitzungen_bis=sitzungen_bis,
+        beendet_von=beendet_von, beendet_bis=beendet_bis, ersteller=ersteller
+    ))
+
+
+def lade_bericht_summe(cursor, **filter):
+    """
+    Kopfzeile eines Berichts ohne die Projekte selbst zu laden:
+    {'anzahl': Projekte, 'gesamt_minuten': ..., 'teilbereiche': {tb: minuten}}
+    """
+    where, sitzung_where, params = _filter(**filter)
+
+    cursor.execute(f'SELECT COUNT(*) AS anzahl FROM projekte p {where}', params)
+    summe = {
+        'anzahl': cursor.fetchone()['anzahl'],
+        'gesamt_minuten': 0,
+        'teilbereiche': {tb: 0 for tb in TEILBEREICHE}
+    }
+
+    cursor.execute(f'''
+        SELECT r.teilbereich, COALESCE(SUM(r.minuten), 0)::bigint AS minuten
+        FROM projekte p
+        JOIN sitzungen_tage r ON r.projekt_id = p.id AND {sitzung_where}
+        {where}
+        GROUP BY r.teilbereich
+    ''', params)
+    for row in cursor.fetchall():
+        if row['teilbereich'] in TEILBEREICHE:
+            summe['teilbereiche'][row['teilbereich']] += row['minuten']
+        summe['gesamt_minuten'] += row['minuten']
+    return summe
+
+
+if __name__ == '__main__':
+    if '--rollup-neu' not in sys.argv:
+        print("Aufruf: python berichte.py --rollup-neu")
+        sys.exit(1)
+
+    from database import db_verbindung
+
+    print("🔧 Baue Tages-Rollup neu auf...")
+    with db_verbindung() as conn:
+        zeilen = rollup_neu_aufbauen(conn.cursor())
+    print(f"✅ Rollup neu aufgebaut: {zeilen} Zeilen")
@@ -0,0 +1,158 @@
+"""
+Projektliste fürs Dashboard - sortiert und seitenweise (Keyset-Pagination)
+
+Reihenfolge in beiden Versionen gleich:
+  1. Status-Priorität (gestoppt, laufend, pausiert, beendet, sonstige)
+  2. beendet_am bei beendeten, sonst erstellt_am (älteste zuerst)
+  3. id
+Eine Seite endet mit einem Cursor (Sortierschlüssel des letzten Projekts);
+die nächste Seite beginnt direkt dahinter - ohne OFFSET, also gleich schnell
+auf Seite 1 und Seite 100. In PostgreSQL liegt dafür ein Ausdrucks-Index
+auf (DASHBOARD_RANG_SQL, DASHBOARD_ZEIT_SQL, id), siehe migrationen.py.
+"""
+import os
+import json
+import base64
+from datetime import datetime
+from projekt_zaehler import TEILBEREICH_SPALTEN
+from zeit import UTC, als_utc
+
+SEITE_GROESSE = int(os.environ.get('DASHBOARD_SEITE', '30'))
+SEITE_MAX = 100
+
+STATUS_RANG = {'gestoppt': 1, 'laufend': 2, 'pausiert': 3, 'beendet': 4}
+RANG_SONST = 5
+ZEIT_OHNE_DATUM = datetime(1970, 1, 1, tzinfo=UTC)
+
+# Die Index-Definition in migrationen.py nutzt genau diese Ausdrücke
+DASHBOARD_RANG_SQL = (
+    'CASE status '
+    + ' '.join(f"WHEN '{status}' THEN {rang}" for status, rang in STATUS_RANG.items())
+    + f' ELSE {RANG_SONST} END'
+)
+DASHBOARD_ZEIT_SQL = (
+    "COALESCE(CASE WHEN status = 'beendet' THEN beendet_am END, erstellt_am, "
+    "'1970-01-01 00:00:00+00'::timestamptz)"
+)
+
+
+def seiten_groesse(wert):
+    """Seitengröße aus dem Request, begrenzt auf 1..SEITE_MAX"""
+    try:
+        return max(1, min(SEITE_MAX, int(wert)))
+    except (TypeError, ValueError):
+        return SEITE_GROESSE
+
+
+def cursor_kodieren(rang, zeitpunkt, projekt_id):
+    roh = json.dumps([rang, als_utc(zeitpunkt).isoformat(), projekt_id]).encode()
+    return base64.urlsafe_b64encode(roh).decode().rstrip('=')
+
+
+def cursor_lesen(text):
+    """(rang, zeitpunkt, id) aus einem Cursor; None für die erste Seite, ValueError bei Unsinn"""
+    if not text:
+        return None
+    try:
+        roh = base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+        rang, zeitpunkt, projekt_id = json.loads(roh)
+        return int(rang), als_utc(zeitpunkt), int(projekt_id)
+    except Exception:
+        raise ValueError('Ungültiger Cursor')
+
+
+def sortierschluessel(projekt):
+    """Gleicher Schlüssel wie DASHBOARD_RANG_SQL/DASHBOARD_ZEIT_SQL, für die JSON-Version"""
+    status = projekt.get('status')
+    zeitpunkt = projekt.get('beendet_am') if status == 'beendet' else None
+    zeitpunkt = als_utc(zeitpunkt or projekt.get('erstellt_am')) or ZEIT_OHNE_DATUM
+    return STATUS_RANG.get(status, RANG_SONST), zeitpunkt, projekt['id']
+
+
+# ---------------------------------------------------------------------------
+# JSON-Dateien (app.py)
+# ---------------------------------------------------------------------------
+
+def seite_aus_liste(projekte, nach=None, limit=SEITE_GROESSE):
+    """Eine Seite aus einer Projektliste im Speicher -> {'projekte', 'weiter'}"""
+    projekte = sorted(projekte, key=sortierschluessel)
+    if nach is not None:
+        projekte = [p for p in projekte if sortierschluessel(p) > nach]
+    weiter = cursor_kodieren(*sortierschluessel(projekte[limit - 1])) if len(projekte) > limit else None
+    return {'projekte': projekte[:limit], 'weiter': weiter}
+
+
+def zaehler_aus_liste(projekte):
+    zaehler = {'gesamt': 0, 'laufend': 0, 'beendet': 0}
+    for projekt in projekte:
+        zaehler['gesamt'] += 1
+        if projekt.get('status') in zaehler:
+            zaehler[projekt['status']] += 1
+    return zaehler
+
+
+# ---------------------------------------------------------------------------
+# PostgreSQL (app_db.py)
+# ---------------------------------------------------------------------------
+
+# Minuten je Teilbereich kommen aus den Zähler-Spalten (projekt_zaehler.py)
+DASHBOARD_SEITE_SQL = f'''
+    SELECT id, name, kunde, status, erstellt_am, beendet_am,
+           {', '.join(TEILBEREICH_SPALTEN.values())},
+           {DASHBOARD_RANG_SQL} AS rang, {DASHBOARD_ZEIT_SQL} AS sortzeit
+    FROM projekte
+    WHERE (%(ersteller)s::text IS NULL OR ersteller = %(ersteller)s)
+      AND (%(nach_id)s::int IS NULL
+           OR ({DASHBOARD_RANG_SQL}, {DASHBOARD_ZEIT_SQL}, id)
+              > (%(nach_rang)s, %(nach_zeit)s, %(nach_id)s))
+    ORDER BY {DASHBOARD_RANG_SQL}, {DASHBOARD_ZEIT_SQL}, id
+    LIMIT %(limit)s
+'''
+
+
+def lade_dashboard_seite(cursor, ersteller=None, nach=None, limit=SEITE_GROESSE):
+    """
+    Eine Seite der Dashboard-Projekte inkl. Minuten je Teilbereich (aus den
+    Zähler-Spalten) -> {'projekte', 'weiter'}.
+    ersteller - nur Projekte dieses Benutzers (None = alle)
+    nach      - Ergebnis von cursor_lesen() (None = erste Seite)
+    """
+    nach_rang, nach_zeit, nach_id = nach or (None, None, None)
+    cursor.execute(DASHBOARD_SEITE_SQL, {
+        'ersteller': ersteller,
+        'nach_rang': nach_rang,
+        'nach_zeit': nach_zeit,
+        'nach_id': nach_id,
+        'limit': limit + 1,     # eine mehr: gibt es eine nächste Seite?
+    })
+    rows = cursor.fetchall()
+
+    projekte = []
+    for row in rows[:limit]:
+        projekte.append({
+            'id': row['id'],
+            'name': row['name'],
+            'kunde': row['kunde'],
+            'status': row['status'],
+            'erstellt_am': row['erstellt_am'],
+            'beendet_am': row['beendet_am'],
+            'teilbereiche': {tb: {'gesamt_minuten': row[spalte]} for tb, spalte in TEILBEREICH_SPALTEN.items()},
+        })
+
+    weiter = None
+    if len(rows) > limit:
+        letzte = rows[limit - 1]
+        weiter = cursor_kodieren(letzte['rang'], letzte['sortzeit'], letzte['id'])
+    return {'projekte': projekte, 'weiter': weiter}
+
+
+def lade_dashboard_zaehler(cursor, ersteller=None):
+    """Anzahl gesamt/laufend/beendet für den Kopf - unabhängig von der geladenen Seite"""
+    cursor.execute('''
+        SELECT COUNT(*) AS gesamt,
+               COUNT(*) FILTER (WHERE status = 'laufend') AS laufend,
+               COUNT(*) FILTER (WHERE status = 'beendet') AS beendet
+        FROM projekte
+        WHERE (%(ersteller)s::text IS NULL OR ersteller = %(ersteller)s)
+    ''', {'ersteller': ersteller})
+    return dict(cursor.fetchone())
@@ -1,21 +1,57 @@
 import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from urllib.parse import urlparse
+from metriken import sql_gemessen
+from protokoll import felder
 
-def get_db_connection():
-    """Stelle Verbindung zur PostgreSQL Datenbank her"""
+log = logging.getLogger(__name__)
+
+# Pool-Konfiguration (pro Gunicorn-Worker)
+POOL_MIN = int(os.environ.get('DB_POOL_MIN', '1'))
+POOL_MAX = int(os.environ.get('DB_POOL_MAX', '10'))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+POOL_MAX_ALTER = float(os.environ.get('DB_POOL_MAX_ALTER', '1800'))
+POOL_PRUEFEN_NACH = float(os.environ.get('DB_POOL_PRUEFEN_NACH', '30'))
+
+# timestamptz kommt immer als UTC zurück - umgerechnet wird nur in zeit.py
+SITZUNG_OPTIONEN = '-c timezone=UTC'
+
+
+class MessCursor(RealDictCursor):
+    """RealDictCursor, der Anzahl und Dauer der Statements an metriken.py meldet"""
+
+    def execute(self, query, vars=None):
+        beginn = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            sql_gemessen(time.perf_counter() - beginn)
+
+    def executemany(self, query, vars_list):
+        beginn = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            sql_gemessen(time.perf_counter() - beginn)
+
+
+def neue_verbindung():
+    """Öffnet eine neue physische Verbindung zur PostgreSQL Datenbank"""
     try:
         # Railway DATABASE_URL parsen
         database_url = os.environ.get('DATABASE_URL')
-        
+
         if database_url:
-            print(f"🔗 Nutze DATABASE_URL: {database_url[:50]}...")
-            
             # URL parsen für Railway-Format
             if database_url.startswith('postgresql://'):
                 # Standard psycopg2 Verbindung
-                conn = psycopg2.connect(database_url, cursor_factory=RealDictCursor)
+                conn = psycopg2.connect(database_url, cursor_factory=MessCursor, options=SITZUNG_OPTIONEN)
             else:
                 # Railway-Format parsen
                 url = urlparse(database_url)
@@ -25,110 +61,309 @@ def get_db_connection():
                     user=url.username,
                     password=url.password,
                     port=url.port or 5432,
-                    cursor_factory=RealDictCursor
+                    cursor_factory=MessCursor,
+                    options=SITZUNG_OPTIONEN
                 )
         else:
             # Fallback: Einzelne Umgebungsvariablen
-            print("⚠️  Keine DATABASE_URL - nutze Railway Env-Vars")
+            log.warning('Keine DATABASE_URL - nutze Railway Env-Vars')
             conn = psycopg2.connect(
                 host=os.environ.get('PGHOST', 'localhost'),
                 database=os.environ.get('PGDATABASE', 'railway'),
                 user=os.environ.get('PGUSER', 'postgres'),
                 password=os.environ.get('PGPASSWORD', ''),
                 port=os.environ.get('PGPORT', '5432'),
-                cursor_factory=RealDictCursor
+                cursor_factory=MessCursor,
+                options=SITZUNG_OPTIONEN
             )
-        
-        print("✅ Datenbankverbindung erfolgreich!")
+
+        # Pro Pool-Aufbau/Recycling einmal - nur im DEBUG-Level interessant
+        log.debug('Datenbankverbindung aufgebaut')
         return conn
-        
+
     except Exception as e:
-        print(f"❌ Datenbankverbindung fehlgeschlagen: {e}")
-        
         # Debug: Zeige verfügbare Env-Vars
-        print("🔍 Verfügbare DB-Variablen:")
+        variablen = {}
         for key in ['DATABASE_URL', 'PGHOST', 'PGDATABASE', 'PGUSER', 'PGPORT']:
             value = os.environ.get(key, 'nicht gesetzt')
-            if 'password' in key.lower():
-                value = '***' if value != 'nicht gesetzt' else value
-            print(f"   {key}: {value}")
-        
+            if key == 'DATABASE_URL' and value != 'nicht gesetzt':
+                value = value[:20] + '...'
+            variablen[key] = value
+        log.error('Datenbankverbindung fehlgeschlagen', extra=felder(fehler=str(e), **variablen))
+
         raise
 
+
+class PoolErschoepft(Exception):
+    """Keine freie Verbindung innerhalb des Timeouts verfügbar"""
+
+
+class VerbindungsPool:
+    """Thread-sicherer Verbindungs-Pool mit Health-Check und Recycling"""
+
+    def __init__(self, minimum=POOL_MIN, maximum=POOL_MAX, timeout=POOL_TIMEOUT,
+                 max_alter=POOL_MAX_ALTER, pruefen_nach=POOL_PRUEFEN_NACH):
+        self.minimum = max(0, minimum)
+        self.maximum = max(1, maximum, self.minimum)
+        self.timeout = timeout
+        self.max_alter = max_alter
+        self.pruefen_nach = pruefen_nach
+
+        self._lock = threading.Condition()
+        self._frei = deque()          # (conn, erstellt_um, zuletzt_benutzt)
+        self._erstellt = {}           # id(conn) -> erstellt_um
+        self._offen = 0
+
+        # Metriken
+        self._gestartet = time.monotonic()
+        self._checkouts = 0
+        self._wartezeit_gesamt = 0.0
+        self._wartezeit_max = 0.0
+        self._erschoepft = 0
+        self._timeouts = 0
+        self._recycelt = 0
+        self._fehlerhaft = 0
+
+        for _ in range(self.minimum):
+            conn = neue_verbindung()
+            jetzt = time.monotonic()
+            self._erstellt[id(conn)] = jetzt
+            self._frei.append((conn, jetzt, jetzt))
+            self._offen += 1
+
+    def _ist_gesund(self, conn, erstellt_um, zuletzt_benutzt):
+        """Prüft eine freie Verbindung vor der Herausgabe"""
+        if conn.closed:
+            return False
+
+        jetzt = time.monotonic()
+        if self.max_alter and jetzt - erstellt_um > self.max_alter:
+            return False
+
+        if jetzt - zuletzt_benutzt > self.pruefen_nach:
+            try:
+                cursor = conn.cursor()
+                cursor.execute('SELECT 1')
+                cursor.close()
+                conn.rollback()
+            except Exception:
+                return False
+
+        return True
+
+    def _verwerfen(self, conn):
+        """Schließt eine Verbindung und gibt ihren Platz im Pool frei"""
+        self._erstellt.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def holen(self):
+        """Leiht eine Verbindung aus (blockiert bis zu `timeout` Sekunden)"""
+        beginn = time.monotonic()
+        gewartet = False
+
+        while True:
+            kandidat = None
+            with self._lock:
+                while not self._frei and self._offen >= self.maximum:
+                    if not gewartet:
+                        gewartet = True
+                        self._erschoepft += 1
+                    rest = self.timeout - (time.monotonic() - beginn)
+                    if rest <= 0:
+                        self._timeouts += 1
+                        raise PoolErschoepft(
+                            f'Keine freie DB-Verbindung nach {self.timeout}s (max={self.maximum})'
+                        )
+                    self._lock.wait(rest)
+
+                if self._frei:
+                    kandidat = self._frei.pop()
+                else:
+                    self._offen += 1
+
+            if kandidat is None:
+                break
+
+            # Health-Check außerhalb des Locks
+            conn, erstellt_um, zuletzt_benutzt = kandidat
+            if self._ist_gesund(conn, erstellt_um, zuletzt_benutzt):
+                with self._lock:
+                    self._checkout_zaehlen(beginn)
+                return conn
+
+            with self._lock:
+                self._verwerfen(conn)
+                self._offen -= 1
+                self._recycelt += 1
+                self._lock.notify()
+
+        # Neue Verbindung außerhalb des Locks aufbauen
+        try:
+            conn = neue_verbindung()
+        except Exception:
+            with self._lock:
+                self._offen -= 1
+                self._lock.notify()
+            raise
+
+        with self._lock:
+            self._erstellt[id(conn)] = time.monotonic()
+            self._checkout_zaehlen(beginn)
+        return conn
+
+    def _checkout_zaehlen(self, beginn):
+        wartezeit = time.monotonic() - beginn
+        self._checkouts += 1
+        self._wartezeit_gesamt += wartezeit
+        self._wartezeit_max = max(self._wartezeit_max, wartezeit)
+
+    def zurueckgeben(self, conn, kaputt=False):
+        """Gibt eine ausgeliehene Verbindung an den Pool zurück"""
+        if not kaputt and not conn.closed:
+            try:
+                # Offene Transaktionen nie an den nächsten Request weiterreichen
+                if conn.status != psycopg2.extensions.STATUS_READY:
+                    conn.rollback()
+            except Exception:
+                kaputt = True
+
+        with self._lock:
+            if kaputt or conn.closed:
+                self._verwerfen(conn)
+                self._offen -= 1
+                self._fehlerhaft += 1
+            else:
+                erstellt_um = self._erstellt.get(id(conn), time.monotonic())
+                self._frei.append((conn, erstellt_um, time.monotonic()))
+            self._lock.notify()
+
+    def metriken(self):
+        """Liefert Kennzahlen des Pools"""
+        with self._lock:
+            laufzeit = max(time.monotonic() - self._gestartet, 1e-9)
+            return {
+                'pid': os.getpid(),
+                'minimum': self.minimum,
+                'maximum': self.maximum,
+                'offen': self._offen,
+                'frei': len(self._frei),
+                'ausgeliehen': self._offen - len(self._frei),
+                'checkouts': self._checkouts,
+                'checkouts_pro_sekunde': round(self._checkouts / laufzeit, 3),
+                'wartezeit_durchschnitt_ms': round(
+                    self._wartezeit_gesamt / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                'wartezeit_max_ms': round(self._wartezeit_max * 1000, 3),
+                'erschoepft': self._erschoepft,
+                'timeouts': self._timeouts,
+                'recycelt': self._recycelt,
+                'fehlerhaft': self._fehlerhaft,
+            }
+
+    def schliessen(self):
+        """Schließt alle freien Verbindungen"""
+        with self._lock:
+            while self._frei:
+                conn, _, _ = self._frei.pop()
+                self._verwerfen(conn)
+                self._offen -= 1
+            self._lock.notify_all()
+
+
+class PoolVerbindung:
+    """Verbindung aus dem Pool - close() gibt sie an den Pool zurück"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is not None:
+            self._pool.zurueckgeben(self._conn)
+            self._conn = None
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Liefert den Pool dieses Prozesses (nach fork() wird neu aufgebaut)"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = VerbindungsPool()
+                _pool_pid = pid
+    return _pool
+
+
+def pool_metriken():
+    """Kennzahlen des Verbindungs-Pools dieses Workers"""
+    return get_pool().metriken()
+
+
+def get_db_connection():
+    """Leiht eine Verbindung aus dem Pool aus - close() gibt sie zurück"""
+    pool = get_pool()
+    return PoolVerbindung(pool, pool.holen())
+
+
+@contextmanager
+def db_verbindung():
+    """Verbindung aus dem Pool mit automatischem Commit/Rollback"""
+    pool = get_pool()
+    conn = pool.holen()
+    kaputt = False
+    try:
+        yield conn
+        conn.commit()
+    except Exception as e:
+        kaputt = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except Exception:
+                kaputt = True
+        raise
+    finally:
+        pool.zurueckgeben(conn, kaputt=kaputt)
+
+
 def execute_query(query, params=None, fetch=False):
     """Führe SQL-Query aus mit automatischer Verbindungsverwaltung"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        
-        if fetch:
-            result = cursor.fetchall()
-            conn.close()
-            return result
-        else:
-            conn.commit()
-            conn.close()
+        with db_verbindung() as conn:
+            cursor = conn.cursor()
+
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+
+            if fetch:
+                return cursor.fetchall()
             return True
-            
+
     except Exception as e:
-        print(f"❌ Query-Fehler: {e}")
-        if 'conn' in locals():
-            conn.rollback()
-            conn.close()
+        log.error('Query-Fehler', extra=felder(fehler=str(e)))
         raise
 
 def init_database():
-    """Initialisiere alle Datenbank-Tabellen"""
-    print("🔧 Initialisiere Datenbank...")
-    
-    tables = [
-        '''CREATE TABLE IF NOT EXISTS projekte (
-            id SERIAL PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            kunde VARCHAR(255) NOT NULL,
-            ersteller VARCHAR(255) NOT NULL,
-            status VARCHAR(50) DEFAULT 'gestoppt',
-            erstellt_am TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )''',
-        
-        '''CREATE TABLE IF NOT EXISTS sitzungen (
-            id SERIAL PRIMARY KEY,
-            projekt_id INTEGER REFERENCES projekte(id),
-            mitarbeiter VARCHAR(255) NOT NULL,
-            teilbereich VARCHAR(100) NOT NULL,
-            start_zeit TIMESTAMP NOT NULL,
-            end_zeit TIMESTAMP,
-            dauer_minuten INTEGER
-        )''',
-        
-        '''CREATE TABLE IF NOT EXISTS benutzer (
-            id SERIAL PRIMARY KEY,
-            email VARCHAR(255) UNIQUE NOT NULL,
-            password_hash VARCHAR(255) NOT NULL,
-            name VARCHAR(255) NOT NULL,
-            registriert_am TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )'''
-    ]
-    
+    """Initialisiere alle Datenbank-Tabellen (wendet ausstehende Migrationen an)"""
+    from migrationen import migrieren
+
+    log.info('Initialisiere Datenbank')
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        for table_sql in tables:
-            cursor.execute(table_sql)
-        
-        conn.commit()
-        conn.close()
-        print("✅ Datenbank erfolgreich initialisiert!")
-        
-    except Exception as e:
-        print(f"❌ Fehler bei Initialisierung: {e}")
-        if 'conn' in locals():
-            conn.rollback()
-            conn.close()
-        raise
\ No newline at end of file
+        neu = migrieren()
+        log.info('Datenbank initialisiert', extra=felder(neue_migrationen=len(neu)))
+    except Exception:
+        log.exception('Fehler bei Initialisierung')
+        raise
@@ -0,0 +1,77 @@
+"""
+CSV-Export der Roh-Sitzungen für die Lohnabrechnung
+
+Die Zeilen kommen über einen benannten (serverseitigen) Cursor in Blöcken
+von `itersize` Zeilen und werden direkt als CSV weitergereicht - der
+Speicherbedarf hängt nicht von der Anzahl der Sitzungen ab.
+"""
+import os
+import io
+import csv
+import logging
+from protokoll import felder
+from zeit import iso_utc, tag_beginn, tag_ende
+
+EXPORT_ITERSIZE = int(os.environ.get('EXPORT_ITERSIZE', '2000'))
+ITERSIZE_MIN, ITERSIZE_MAX = 100, 50000
+ZEILEN_PRO_BLOCK = 500
+
+log = logging.getLogger(__name__)
+
+SPALTEN = ['sitzung_id', 'projekt_id', 'projekt', 'kunde', 'mitarbeiter', 'teilbereich',
+           'start_utc', 'ende_utc', 'dauer_minuten']
+
+
+def _utc(wert):
+    return iso_utc(wert) or ''
+
+
+def sitzungen_csv(conn, von_datum, bis_datum, ersteller=None, itersize=EXPORT_ITERSIZE):
+    """
+    Generator mit CSV-Blöcken aller beendeten Sitzungen, die zwischen
+    von_datum und bis_datum (jeweils ganzer lokaler Tag) begonnen haben.
+    ersteller - nur Projekte dieses Benutzers (None = alle)
+    """
+    params = {
+        'von': tag_beginn(von_datum),
+        'bis': tag_ende(bis_datum),
+        'ersteller': ersteller,
+    }
+
+    cursor = conn.cursor(name='export_sitzungen')
+    cursor.itersize = max(ITERSIZE_MIN, min(ITERSIZE_MAX, itersize))
+    cursor.execute('''
+        SELECT s.id, s.projekt_id, p.name, p.kunde, s.mitarbeiter, s.teilbereich,
+               s.start_zeit, s.end_zeit, s.dauer_minuten
+        FROM sitzungen s
+        JOIN projekte p ON p.id = s.projekt_id
+        WHERE s.start_zeit >= %(von)s AND s.start_zeit < %(bis)s
+          AND (%(ersteller)s::text IS NULL OR p.ersteller = %(ersteller)s)
+        ORDER BY s.start_zeit, s.id
+    ''', params)
+
+    puffer = io.StringIO()
+    # Semikolon + BOM: öffnet sich in deutschem Excel direkt richtig
+    writer = csv.writer(puffer, delimiter=';')
+    puffer.write('\ufeff')
+    writer.writerow(SPALTEN)
+    yield puffer.getvalue()   # Download startet sofort
+    puffer.seek(0)
+    puffer.truncate()
+
+    zeilen = 0
+    for row in cursor:
+        writer.writerow([
+            row['id'], row['projekt_id'], row['name'], row['kunde'], row['mitarbeiter'],
+            row['teilbereich'], _utc(row['start_zeit']), _utc(row['end_zeit']),
+            row['dauer_minuten'],
+        ])
+        zeilen += 1
+        if zeilen % ZEILEN_PRO_BLOCK == 0:
+            yield puffer.getvalue()
+            puffer.seek(0)
+            puffer.truncate()
+
+    yield puffer.getvalue()
+    cursor.close()
+    log.info('CSV-Export', extra=felder(sitzungen=zeilen))
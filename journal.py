@@ -0,0 +1,311 @@
+"""
+Projekt-Speicher für die JSON-Version (app.py)
+
+Statt projekte.json bei jeder Änderung komplett neu zu schreiben, wird jede
+Änderung als eine Zeile an projekte.journal angehängt. Im Speicher liegt ein
+Index projekt_id -> Projekt, der beim Lesen nur um neue Journal-Zeilen
+ergänzt wird. Ab KOMPAKTIEREN_NACH Einträgen wird der Stand als Snapshot
+nach projekte.json geschrieben und das Journal geleert.
+
+Mehrere Worker: Schreiben unter exklusivem flock auf projekte.lock, vorher
+wird der Index auf den neuesten Stand gebracht (keine verlorenen Updates).
+Jede Zeile trägt eine fortlaufende seq; der Snapshot merkt sich die letzte
+enthaltene seq, damit ein Absturz mitten im Kompaktieren nichts doppelt bucht.
+
+Jedes Kompaktieren zählt eine Generation hoch. Sie steht im Snapshot und in
+der ersten Zeile des neuen Journals ({"art": "kopf", "generation": 7}); ein
+Worker, der eine andere Generation (oder ein kürzeres Journal) findet, lädt
+den Snapshot neu. Die Inode-Nummer taugt dafür nicht - das Dateisystem
+vergibt freigewordene Nummern wieder.
+
+Snapshot-Format: {"seq": 1234, "generation": 7, "projekte": [...]}. Die
+alte projekte.json (nur die Projektliste) und Journale ohne Kopfzeile
+(Generation 0) werden weiterhin gelesen und beim ersten Kompaktieren ins
+neue Format überführt. projekte.journal und projekte.lock sind
+Laufzeitdateien und gehören nicht ins Repository.
+"""
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from protokoll import felder
+
+try:
+    import fcntl
+except ImportError:  # Windows - nur ein Prozess, Thread-Lock genügt
+    fcntl = None
+
+KOMPAKTIEREN_NACH = int(os.environ.get('JOURNAL_KOMPAKTIEREN_NACH', '500'))
+QUITTUNGEN_JE_PROJEKT = int(os.environ.get('JOURNAL_QUITTUNGEN_JE_PROJEKT', '200'))
+
+log = logging.getLogger(__name__)
+
+
+def _sitzung_buchen(projekt, teilbereich, sitzung):
+    tb = projekt['teilbereiche'].setdefault(teilbereich, {'sitzungen': [], 'gesamt_minuten': 0})
+    tb['sitzungen'].append(sitzung)
+    tb['gesamt_minuten'] += sitzung['dauer_minuten']
+
+
+def _quittung_merken(projekt, quittung):
+    """Idempotenz-Schlüssel der Offline-Warteschlange (aktivitaet.py) - nur die neuesten je Projekt"""
+    quittungen = projekt.setdefault('quittungen', {})
+    quittungen[quittung['schluessel']] = quittung['ergebnis']
+    while len(quittungen) > QUITTUNGEN_JE_PROJEKT:
+        del quittungen[next(iter(quittungen))]
+
+
+def _anwenden(index, ereignis):
+    """Spielt ein Journal-Ereignis auf den Index ein"""
+    art = ereignis['art']
+
+    if art == 'projekt':
+        projekt = ereignis['projekt']
+        index[projekt['id']] = projekt
+
+    elif art == 'start':
+        projekt = index[ereignis['projekt_id']]
+        projekt['aktive_sitzungen'][ereignis['mitarbeiter']] = {
+            'teilbereich': ereignis['teilbereich'],
+            'start': ereignis['start']
+        }
+        if projekt.get('erster_start') is None:
+            projekt['erster_start'] = ereignis['start']
+        projekt['letzter_start'] = ereignis['start']
+        projekt['status'] = 'laufend'
+
+    elif art == 'stopp':
+        projekt = index[ereignis['projekt_id']]
+        projekt['aktive_sitzungen'].pop(ereignis['sitzung']['mitarbeiter'], None)
+        _sitzung_buchen(projekt, ereignis['teilbereich'], ereignis['sitzung'])
+        if not projekt['aktive_sitzungen']:
+            projekt['status'] = 'pausiert'
+
+    elif art == 'beenden':
+        projekt = index[ereignis['projekt_id']]
+        for teilbereich, sitzung in ereignis['sitzungen']:
+            _sitzung_buchen(projekt, teilbereich, sitzung)
+        projekt['aktive_sitzungen'] = {}
+        projekt['status'] = 'beendet'
+        projekt['beendet_am'] = ereignis['beendet_am']
+
+    elif art == 'loeschen':
+        for projekt_id in ereignis['projekt_ids']:
+            index.pop(projekt_id, None)
+
+    elif art != 'quittung':
+        raise ValueError(f'Unbekanntes Journal-Ereignis: {art}')
+
+    # start/stopp/quittung aus der Offline-Warteschlange tragen ihren Schlüssel mit
+    if ereignis.get('quittung') and ereignis['projekt_id'] in index:
+        _quittung_merken(index[ereignis['projekt_id']], ereignis['quittung'])
+
+
+class ProjektJournal:
+    """Append-only Journal + Snapshot mit In-Memory-Index nach Projekt-ID"""
+
+    def __init__(self, snapshot_datei, kompaktieren_nach=KOMPAKTIEREN_NACH):
+        basis = os.path.splitext(snapshot_datei)[0]
+        self.snapshot_datei = snapshot_datei
+        self.journal_datei = basis + '.journal'
+        self.lock_datei = basis + '.lock'
+        self.kompaktieren_nach = kompaktieren_nach
+
+        self._lock = threading.RLock()
+        self._index = {}
+        self._seq = 0
+        self._generation = 0       # Generation des gelesenen Journals (Kopfzeile)
+        self._offset = 0           # bis hierhin ist das Journal eingelesen
+        self._eintraege = 0        # Zeilen im aktuellen Journal
+        self._geladen = False
+
+    # --- Sperren -----------------------------------------------------------
+
+    @contextmanager
+    def _dateisperre(self, exklusiv):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_datei, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exklusiv else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # --- Einlesen ----------------------------------------------------------
+
+    def _snapshot_laden(self):
+        self._index = {}
+        self._seq = 0
+        self._generation = 0
+        if os.path.exists(self.snapshot_datei):
+            with open(self.snapshot_datei, 'r', encoding='utf-8') as f:
+                daten = json.load(f)
+            if isinstance(daten, list):   # altes Format: nur die Projektliste
+                daten = {'seq': 0, 'projekte': daten}
+            self._seq = daten['seq']
+            self._generation = daten.get('generation', 0)
+            self._index = {p['id']: p for p in daten['projekte']}
+        self._offset = 0
+        self._eintraege = 0
+
+    def _journal_kopf(self):
+        """(Generation, Größe) des Journals - Generation 0 ohne Kopfzeile, None ohne Journal"""
+        try:
+            with open(self.journal_datei, 'rb') as f:
+                zeile = f.readline()
+                groesse = os.fstat(f.fileno()).st_size
+        except FileNotFoundError:
+            return None, 0
+        if zeile.endswith(b'\n'):
+            kopf = json.loads(zeile)
+            if kopf.get('art') == 'kopf':
+                return kopf['generation'], groesse
+        return 0, groesse
+
+    def _nachladen(self):
+        """Bringt den Index auf den Stand der Dateien (nur neue Zeilen lesen)"""
+        generation, groesse = self._journal_kopf()
+
+        # Ein anderer Worker hat kompaktiert (neues Journal) - Snapshot neu laden
+        if (not self._geladen or groesse < self._offset
+                or (generation is not None and generation != self._generation)):
+            self._snapshot_laden()
+            if generation is not None:
+                self._generation = generation
+            self._geladen = True
+
+        if groesse <= self._offset:
+            return
+
+        with open(self.journal_datei, 'rb') as f:
+            f.seek(self._offset)
+            for zeile in f:
+                if not zeile.endswith(b'\n'):
+                    break   # halb geschriebene Zeile (Absturz) - ignorieren
+                self._offset += len(zeile)
+                ereignis = json.loads(zeile)
+                if ereignis.get('art') == 'kopf':
+                    continue
+                self._eintraege += 1
+                if ereignis['seq'] <= self._seq:
+                    continue   # schon im Snapshot enthalten
+                _anwenden(self._index, ereignis)
+                self._seq = ereignis['seq']
+
+    # --- Lesen -------------------------------------------------------------
+
+    def _aktuell(self):
+        with self._lock:
+            with self._dateisperre(exklusiv=False):
+                self._nachladen()
+
+    def projekt(self, projekt_id):
+        """Ein Projekt per Index (nicht verändern - Änderungen nur über schreiben())"""
+        self._aktuell()
+        return self._index.get(projekt_id)
+
+    def alle(self):
+        """Alle Projekte in Anlage-Reihenfolge (nicht verändern)"""
+        self._aktuell()
+        with self._lock:
+            return sorted(self._index.values(), key=lambda p: p['id'])
+
+    # --- Schreiben ---------------------------------------------------------
+
+    @contextmanager
+    def schreiben(self):
+        """
+        Exklusiver Schreibzugriff über alle Worker:
+
+            with journal.schreiben() as sitzung:
+                projekt = sitzung.projekt(projekt_id)
+                ... prüfen ...
+                sitzung.anhaengen({'art': 'start', ...})
+        """
+        with self._lock:
+            with self._dateisperre(exklusiv=True):
+                self._nachladen()
+                sitzung = _Schreibsitzung(self)
+                try:
+                    yield sitzung
+                except Exception:
+                    # Index enthält evtl. nicht geschriebene Ereignisse - neu laden
+                    self._geladen = False
+                    raise
+                if sitzung.zeilen:
+                    self._schreiben(sitzung.zeilen)
+                    if self._eintraege >= self.kompaktieren_nach:
+                        self._kompaktieren()
+
+    def _schreiben(self, zeilen):
+        anzahl = len(zeilen)
+        zeilen = b''.join(zeilen)
+        with open(self.journal_datei, 'ab') as f:
+            if f.tell() == 0:
+                zeilen = self._kopfzeile() + zeilen
+            f.write(zeilen)
+            f.flush()
+            os.fsync(f.fileno())
+        self._offset += len(zeilen)
+        self._eintraege += anzahl
+
+    def _kopfzeile(self):
+        return json.dumps({'art': 'kopf', 'generation': self._generation}).encode('utf-8') + b'\n'
+
+    def _kompaktieren(self):
+        """Snapshot schreiben, dann Journal leeren (beides per atomarem rename)"""
+        self._generation += 1
+        tmp = self.snapshot_datei + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'seq': self._seq, 'generation': self._generation,
+                       'projekte': sorted(self._index.values(), key=lambda p: p['id'])},
+                      f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_datei)
+
+        tmp = self.journal_datei + '.tmp'
+        kopf = self._kopfzeile()
+        with open(tmp, 'wb') as f:
+            f.write(kopf)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.journal_datei)
+        self._offset = len(kopf)
+        self._eintraege = 0
+        log.info('Journal kompaktiert', extra=felder(projekte=len(self._index), seq=self._seq,
+                                                     generation=self._generation))
+
+    def kompaktieren(self):
+        with self._lock:
+            with self._dateisperre(exklusiv=True):
+                self._nachladen()
+                self._kompaktieren()
+
+
+class _Schreibsitzung:
+    """Sicht auf den Index während schreiben() - Ereignisse werden sofort eingespielt"""
+
+    def __init__(self, journal):
+        self._journal = journal
+        self.zeilen = []
+
+    def projekt(self, projekt_id):
+        return self._journal._index.get(projekt_id)
+
+    def alle(self):
+        return sorted(self._journal._index.values(), key=lambda p: p['id'])
+
+    def naechste_id(self):
+        return max(self._journal._index, default=0) + 1
+
+    def anhaengen(self, ereignis):
+        ereignis = dict(ereignis, seq=self._journal._seq + 1)
+        # Zeile vor dem Einspielen festhalten - spätere Änderungen am Index ändern sie nicht
+        self.zeilen.append(json.dumps(ereignis, ensure_ascii=False).encode('utf-8') + b'\n')
+        _anwenden(self._journal._index, ereignis)
+        self._journal._seq = ereignis['seq']
+        return ereignis
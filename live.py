@@ -0,0 +1,238 @@
+"""
+Live-Ereignisse für aktive Sitzungen (Start/Stopp) je Projekt
+
+Start und Stopp (aktivitaet.py) melden sich per pg_notify in derselben
+Anweisung; PostgreSQL stellt das Ereignis nach dem COMMIT allen Workern zu.
+Pro Worker hört genau ein Thread mit einer eigenen Verbindung (LISTEN) zu
+und verteilt die Ereignisse im Speicher an die wartenden Clients - egal wie
+viele Browser dasselbe Projekt offen haben, die Datenbank sieht davon nichts.
+
+Clients verbinden sich per Server-Sent Events (/projekt/<id>/live) oder,
+falls SSE nicht durchkommt, per Long-Poll (/projekt/<id>/live/poll?seit=...).
+Ereignis-IDs vergibt der Listener beim Empfang (nach dem COMMIT); Seite und
+Stand nehmen ihre ID vor dem Lesen. Ein Ereignis kann so doppelt ankommen -
+der Browser wendet Start/Stopp idempotent an -, aber nie verloren gehen.
+
+Jeder offene Stream und jeder wartende Long-Poll hält einen Thread des
+Workers fest (Procfile: gthread, --threads 8). Pro Worker dürfen das
+höchstens LIVE_PLAETZE (Standard 4) sein, der Rest bleibt für normale
+Requests. Ist alles belegt, bekommt ein Stream 503 (der Browser wechselt
+auf Long-Poll) und ein Long-Poll antwortet sofort mit "pause" Sekunden
+bis zur nächsten Abfrage. LIVE_PLAETZE immer kleiner als --threads halten.
+
+Derselbe Listener-Thread bedient weitere Kanäle (z.B. Bericht-Cache):
+abonnieren(kanal, funktion) beim Import registrieren, melden() zum Senden.
+"""
+import os
+import json
+import time
+import select
+import logging
+import threading
+from collections import deque
+from protokoll import felder
+
+KANAL = 'aktive_sitzungen'
+PUFFER_GROESSE = int(os.environ.get('LIVE_PUFFER', '200'))
+WARTEN_MAX = float(os.environ.get('LIVE_WARTEN_MAX', '25'))
+STREAM_DAUER = float(os.environ.get('LIVE_STREAM_DAUER', '300'))
+PLAETZE = int(os.environ.get('LIVE_PLAETZE', '4'))
+POLL_PAUSE = float(os.environ.get('LIVE_POLL_PAUSE', '10'))
+
+log = logging.getLogger(__name__)
+
+
+def jetzt_id():
+    """Ereignis-ID: Mikrosekunden seit Epoch (über alle Worker vergleichbar)"""
+    return int(time.time() * 1000000)
+
+
+class EreignisVerteiler:
+    """Hält die letzten Ereignisse je Projekt und weckt wartende Clients"""
+
+    def __init__(self, puffer_groesse=PUFFER_GROESSE):
+        self._bedingung = threading.Condition()
+        self._puffer = deque(maxlen=puffer_groesse)   # (id, projekt_id, ereignis)
+        self.gestartet = jetzt_id()
+        self._letzte_id = self.gestartet
+
+    def veroeffentlichen(self, ereignis):
+        with self._bedingung:
+            # ID beim Empfang vergeben, also nach dem COMMIT - nicht schon beim
+            # Schreiben: eine Seite, die ihren Stand nach live_seit gelesen hat,
+            # bekommt so jeden danach committeten Start/Stopp. Streng steigend.
+            ereignis['id'] = self._letzte_id = max(jetzt_id(), self._letzte_id + 1)
+            self._puffer.append((ereignis['id'], ereignis['projekt_id'], ereignis))
+            self._bedingung.notify_all()
+
+    def _neue(self, projekt_id, seit):
+        return [e for i, p, e in self._puffer if p == projekt_id and i > seit]
+
+    def warten(self, projekt_id, seit, timeout=WARTEN_MAX):
+        """Ereignisse mit id > seit; blockiert bis zu `timeout` Sekunden, falls keine da sind"""
+        ende = time.monotonic() + timeout
+        with self._bedingung:
+            while True:
+                neue = self._neue(projekt_id, seit)
+                rest = ende - time.monotonic()
+                if neue or rest <= 0:
+                    return neue
+                self._bedingung.wait(rest)
+
+    def luecke(self, seit):
+        """True, wenn Ereignisse nach `seit` nicht mehr (oder noch nie) im Puffer sind"""
+        with self._bedingung:
+            if seit < self.gestartet:
+                return True
+            return len(self._puffer) == self._puffer.maxlen and self._puffer[0][0] > seit
+
+
+_abonnenten = {}          # kanal -> [funktion(daten)]
+_bei_verbindung = []      # funktion() nach jedem (Neu-)Verbinden
+_listener_pid = None
+_verbunden_pid = None     # PID, deren Listener gerade verbunden ist
+_verteiler = None
+_verteiler_pid = None
+_lock = threading.Lock()
+
+
+def abonnieren(kanal, funktion):
+    """Registriert einen Empfänger für NOTIFYs auf `kanal` (vor dem ersten Request)"""
+    _abonnenten.setdefault(kanal, []).append(funktion)
+
+
+def bei_verbindung(funktion):
+    """
+    funktion() läuft nach jedem (Neu-)Verbinden des Listeners - während einer
+    Unterbrechung verpasste NOTIFYs sind verloren, Caches also dort leeren.
+    """
+    _bei_verbindung.append(funktion)
+
+
+def listener_verbunden():
+    return _verbunden_pid == os.getpid()
+
+
+def _zuhoeren():
+    """LISTEN-Schleife (eigener Thread, eigene Verbindung außerhalb des Pools)"""
+    global _verbunden_pid
+    from database import neue_verbindung
+
+    while True:
+        conn = None
+        try:
+            conn = neue_verbindung()
+            conn.autocommit = True
+            cursor = conn.cursor()
+            for kanal in _abonnenten:
+                cursor.execute(f'LISTEN {kanal}')
+            for funktion in _bei_verbindung:
+                funktion()
+            _verbunden_pid = os.getpid()
+            log.info('Live-Listener verbunden', extra=felder(kanaele=list(_abonnenten), pid=os.getpid()))
+
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        daten = json.loads(notify.payload)
+                        for funktion in _abonnenten.get(notify.channel, []):
+                            funktion(daten)
+                    except (ValueError, KeyError) as e:
+                        log.warning('Ungültiges Ereignis', extra=felder(kanal=notify.channel, fehler=str(e)))
+
+        except Exception as e:
+            _verbunden_pid = None
+            log.error('Live-Listener unterbrochen - neuer Versuch in 5s', extra=felder(fehler=str(e)))
+            try:
+                conn.close()
+            except Exception:
+                pass
+            time.sleep(5)
+
+
+def listener_starten():
+    """Startet den Listener-Thread dieses Worker-Prozesses (einmal pro PID)"""
+    global _listener_pid
+    pid = os.getpid()
+    if _listener_pid != pid:
+        with _lock:
+            if _listener_pid != pid:
+                threading.Thread(target=_zuhoeren, name='live-listener', daemon=True).start()
+                _listener_pid = pid
+
+
+def get_verteiler():
+    """Verteiler dieses Worker-Prozesses (startet den Listener beim ersten Zugriff)"""
+    global _verteiler, _verteiler_pid
+    pid = os.getpid()
+    if _verteiler is None or _verteiler_pid != pid:
+        with _lock:
+            if _verteiler is None or _verteiler_pid != pid:
+                _verteiler, _verteiler_pid = EreignisVerteiler(), pid
+    listener_starten()
+    return _verteiler
+
+
+def _live_ereignis(daten):
+    if _verteiler is not None and _verteiler_pid == os.getpid():
+        _verteiler.veroeffentlichen(daten)
+
+
+abonnieren(KANAL, _live_ereignis)
+
+
+def melden(cursor, kanal, daten):
+    """NOTIFY mit JSON-Daten - wird erst beim COMMIT der Transaktion zugestellt"""
+    cursor.execute('SELECT pg_notify(%s, %s)', (kanal, json.dumps(daten)))
+
+
+_plaetze = threading.BoundedSemaphore(PLAETZE)
+
+
+def platz_belegen():
+    """True, wenn ein Live-Client einen Thread festhalten darf - danach platz_freigeben()"""
+    return _plaetze.acquire(blocking=False)
+
+
+def platz_freigeben():
+    _plaetze.release()
+
+
+def sse_format(ereignis=None, kommentar=None, ereignis_typ=None):
+    """Ein Server-Sent-Events-Block"""
+    if kommentar is not None:
+        return f': {kommentar}\n\n'
+    zeilen = []
+    if ereignis_typ:
+        zeilen.append(f'event: {ereignis_typ}')
+    if 'id' in ereignis:
+        zeilen.append(f"id: {ereignis['id']}")
+    zeilen.append(f'data: {json.dumps(ereignis)}')
+    return '\n'.join(zeilen) + '\n\n'
+
+
+def sse_stream(projekt_id, seit, snapshot):
+    """
+    Generator für /projekt/<id>/live: erst der aktuelle Stand, dann jedes
+    Ereignis. Nach STREAM_DAUER endet der Stream, der Browser verbindet
+    sich mit Last-Event-ID automatisch neu (hält keine Threads ewig fest).
+    """
+    verteiler = get_verteiler()
+    ende = time.monotonic() + STREAM_DAUER
+
+    yield 'retry: 3000\n\n'
+    if snapshot is not None:
+        yield sse_format(snapshot, ereignis_typ='stand')
+
+    while time.monotonic() < ende:
+        neue = verteiler.warten(projekt_id, seit, timeout=min(WARTEN_MAX, ende - time.monotonic()))
+        if not neue:
+            yield sse_format(kommentar='keepalive')
+            continue
+        for ereignis in neue:
+            seit = ereignis['id']
+            yield sse_format(ereignis)
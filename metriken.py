@@ -0,0 +1,184 @@
+"""
+Laufzeit-Kennzahlen je Endpoint (Latenz, SQL-Anzahl, DB-Zeit)
+
+app_db.py startet pro Request eine Messung (anfrage_beginnen) und schließt sie
+ab, wenn die Antwort komplett gesendet ist (anfrage_beenden) - gestreamte
+Berichte zählen also mit ihrer vollen Dauer. Die Cursor aus database.py
+melden jede Ausführung per sql_gemessen() an die Messung des eigenen Threads.
+
+prometheus_text() liefert alles im Prometheus-Textformat für /metrics:
+Histogramme (Buckets, Summe, Anzahl) plus Perzentile der letzten
+FENSTER Requests je Endpoint. Die Werte gelten pro Worker-Prozess.
+"""
+import os
+import math
+import time
+import threading
+from collections import deque
+
+FENSTER = int(os.environ.get('METRIKEN_FENSTER', '1000'))
+PERZENTILE = (0.5, 0.9, 0.95, 0.99)
+
+LATENZ_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+SQL_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+_messung = threading.local()
+_lock = threading.Lock()
+_endpoints = {}     # endpoint -> _EndpointStatistik
+_anfragen = {}      # (endpoint, methode, status) -> Anzahl
+
+
+class _Histogramm:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.zaehler = [0] * len(buckets)
+        self.summe = 0.0
+        self.anzahl = 0
+
+    def beobachten(self, wert):
+        for i, grenze in enumerate(self.buckets):
+            if wert <= grenze:
+                self.zaehler[i] += 1
+        self.summe += wert
+        self.anzahl += 1
+
+
+class _EndpointStatistik:
+    def __init__(self):
+        self.latenz = _Histogramm(LATENZ_BUCKETS)
+        self.db_zeit = _Histogramm(DB_BUCKETS)
+        self.sql = _Histogramm(SQL_BUCKETS)
+        self.fenster = deque(maxlen=FENSTER)   # (latenz, db_zeit, sql_anzahl)
+
+
+# --- Messung pro Request (Thread-lokal) ----------------------------------------
+
+def anfrage_beginnen():
+    _messung.beginn = time.perf_counter()
+    _messung.sql_anzahl = 0
+    _messung.db_zeit = 0.0
+
+
+def sql_gemessen(dauer):
+    """Vom Cursor nach jeder Ausführung aufgerufen (außerhalb von Requests ignoriert)"""
+    if getattr(_messung, 'beginn', None) is not None:
+        _messung.sql_anzahl += 1
+        _messung.db_zeit += dauer
+
+
+def anfrage_stand():
+    """(Sekunden seit Beginn, SQL-Anzahl, DB-Sekunden) der laufenden Messung oder None"""
+    beginn = getattr(_messung, 'beginn', None)
+    if beginn is None:
+        return None
+    return time.perf_counter() - beginn, _messung.sql_anzahl, _messung.db_zeit
+
+
+def letzte_messung():
+    """(Sekunden, SQL-Anzahl, DB-Sekunden) des zuletzt in diesem Thread beendeten Requests"""
+    return getattr(_messung, 'letzte', None)
+
+
+def anfrage_beenden(endpoint, methode, status):
+    """Schließt die Messung des aktuellen Threads ab und verbucht sie"""
+    stand = anfrage_stand()
+    if stand is None:
+        return None
+    _messung.beginn = None
+    _messung.letzte = stand
+    latenz, sql_anzahl, db_zeit = stand
+    endpoint = endpoint or 'unbekannt'
+
+    with _lock:
+        statistik = _endpoints.get(endpoint)
+        if statistik is None:
+            statistik = _endpoints[endpoint] = _EndpointStatistik()
+        statistik.latenz.beobachten(latenz)
+        statistik.db_zeit.beobachten(db_zeit)
+        statistik.sql.beobachten(sql_anzahl)
+        statistik.fenster.append((latenz, db_zeit, sql_anzahl))
+        schluessel = (endpoint, methode, str(status))
+        _anfragen[schluessel] = _anfragen.get(schluessel, 0) + 1
+    return stand
+
+
+# --- Prometheus-Textformat ---------------------------------------------------
+
+def _label(wert):
+    return str(wert).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _zahl(wert):
+    if isinstance(wert, int):
+        return str(wert)
+    return repr(float(wert))
+
+
+def perzentil(sortiert, p):
+    if not sortiert:
+        return 0.0
+    # Nearest-Rank-Verfahren
+    index = max(0, math.ceil(p * len(sortiert)) - 1)
+    return sortiert[index]
+
+
+def _histogramm_zeilen(name, endpoint, histogramm):
+    label = f'endpoint="{_label(endpoint)}"'
+    for grenze, anzahl in zip(histogramm.buckets, histogramm.zaehler):
+        yield f'{name}_bucket{{{label},le="{_zahl(grenze)}"}} {anzahl}'
+    yield f'{name}_bucket{{{label},le="+Inf"}} {histogramm.anzahl}'
+    yield f'{name}_sum{{{label}}} {_zahl(histogramm.summe)}'
+    yield f'{name}_count{{{label}}} {histogramm.anzahl}'
+
+
+def prometheus_text(gauges=None):
+    """
+    Alle Kennzahlen als Prometheus-Text.
+    gauges - optionale {name: (hilfetext, wert)} zusätzlich ausgeben (z.B. Pool)
+    """
+    with _lock:
+        endpoints = sorted(_endpoints.items())
+        histogramme = [(e, s.latenz, s.db_zeit, s.sql) for e, s in endpoints]
+        fenster = [(e, list(s.fenster)) for e, s in endpoints]
+        anfragen = sorted(_anfragen.items())
+
+    zeilen = [
+        '# HELP rausch_requests_total Abgeschlossene Requests je Endpoint, Methode und Status',
+        '# TYPE rausch_requests_total counter',
+    ]
+    for (endpoint, methode, status), anzahl in anfragen:
+        zeilen.append(f'rausch_requests_total{{endpoint="{_label(endpoint)}",'
+                      f'method="{_label(methode)}",status="{status}"}} {anzahl}')
+
+    for name, index, hilfe in (
+        ('rausch_request_dauer_sekunden', 1, 'Dauer bis die Antwort komplett gesendet ist'),
+        ('rausch_request_db_sekunden', 2, 'Summe der SQL-Ausführungszeit je Request'),
+        ('rausch_request_sql_anzahl', 3, 'Anzahl SQL-Statements je Request'),
+    ):
+        zeilen.append(f'# HELP {name} {hilfe}')
+        zeilen.append(f'# TYPE {name} histogram')
+        for eintrag in histogramme:
+            zeilen.extend(_histogramm_zeilen(name, eintrag[0], eintrag[index]))
+
+    for name, index, hilfe in (
+        ('rausch_request_latenz_sekunden', 0, 'Perzentile der Request-Dauer'),
+        ('rausch_request_db_zeit_sekunden', 1, 'Perzentile der DB-Zeit je Request'),
+        ('rausch_request_sql_statements', 2, 'Perzentile der SQL-Anzahl je Request'),
+    ):
+        zeilen.append(f'# HELP {name} {hilfe} (letzte {FENSTER} Requests)')
+        zeilen.append(f'# TYPE {name} summary')
+        for endpoint, werte in fenster:
+            sortiert = sorted(w[index] for w in werte)
+            label = f'endpoint="{_label(endpoint)}"'
+            for p in PERZENTILE:
+                zeilen.append(f'{name}{{{label},quantile="{p}"}} {_zahl(perzentil(sortiert, p))}')
+            zeilen.append(f'{name}_sum{{{label}}} {_zahl(sum(sortiert))}')
+            zeilen.append(f'{name}_count{{{label}}} {len(sortiert)}')
+
+    for name, (hilfe, wert) in sorted((gauges or {}).items()):
+        zeilen.append(f'# HELP {name} {hilfe}')
+        zeilen.append(f'# TYPE {name} gauge')
+        zeilen.append(f'{name} {_zahl(wert)}')
+
+    return '\n'.join(zeilen) + '\n'
@@ -0,0 +1,347 @@
+"""
+Versionierte Schema-Migrationen für die PostgreSQL-Datenbank
+
+Jede Migration hat eine fortlaufende Version und wird genau einmal
+angewendet; angewendete Versionen stehen in der Tabelle schema_migrationen.
+Migrationen mit 'transaktion': False laufen im Autocommit-Modus
+(nötig für CREATE INDEX CONCURRENTLY).
+"""
+from database import neue_verbindung
+from zeit import ZEITZONE_NAME
+from dashboard import DASHBOARD_RANG_SQL, DASHBOARD_ZEIT_SQL
+
+# Beliebige feste Zahl - verhindert parallele Migrationen (mehrere Worker/Dynos)
+MIGRATIONS_LOCK = 20250612
+
+MIGRATIONEN = [
+    {
+        'version': 1,
+        'name': 'Basis-Tabellen',
+        'sql': [
+            '''CREATE TABLE IF NOT EXISTS projekte (
+                id SERIAL PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                kunde VARCHAR(255) NOT NULL,
+                ersteller VARCHAR(255) NOT NULL,
+                status VARCHAR(50) DEFAULT 'gestoppt',
+                erstellt_am TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )''',
+            '''CREATE TABLE IF NOT EXISTS sitzungen (
+                id SERIAL PRIMARY KEY,
+                projekt_id INTEGER REFERENCES projekte(id),
+                mitarbeiter VARCHAR(255) NOT NULL,
+                teilbereich VARCHAR(100) NOT NULL,
+                start_zeit TIMESTAMP NOT NULL,
+                end_zeit TIMESTAMP,
+                dauer_minuten INTEGER
+            )''',
+            '''CREATE TABLE IF NOT EXISTS benutzer (
+                id SERIAL PRIMARY KEY,
+                email VARCHAR(255) UNIQUE NOT NULL,
+                password_hash VARCHAR(255) NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                registriert_am TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )''',
+        ],
+    },
+    {
+        'version': 2,
+        'name': 'Fehlende Spalten und Tabellen aus app_db.py',
+        'sql': [
+            'ALTER TABLE projekte ADD COLUMN IF NOT EXISTS beendet_am TIMESTAMP',
+            'ALTER TABLE projekte ADD COLUMN IF NOT EXISTS erster_start TIMESTAMP',
+            'ALTER TABLE projekte ADD COLUMN IF NOT EXISTS letzter_start TIMESTAMP',
+            'ALTER TABLE benutzer ADD COLUMN IF NOT EXISTS team_code_verwendet VARCHAR(50)',
+            '''CREATE TABLE IF NOT EXISTS aktive_sitzungen (
+                id SERIAL PRIMARY KEY,
+                projekt_id INTEGER NOT NULL REFERENCES projekte(id),
+                mitarbeiter VARCHAR(255) NOT NULL,
+                teilbereich VARCHAR(100) NOT NULL,
+                start_zeit TIMESTAMP NOT NULL
+            )''',
+            '''CREATE TABLE IF NOT EXISTS mitarbeiter (
+                id SERIAL PRIMARY KEY,
+                name VARCHAR(255) UNIQUE NOT NULL
+            )''',
+            '''CREATE TABLE IF NOT EXISTS kunden (
+                id SERIAL PRIMARY KEY,
+                name VARCHAR(255) UNIQUE NOT NULL
+            )''',
+            '''CREATE TABLE IF NOT EXISTS password_resets (
+                id SERIAL PRIMARY KEY,
+                email VARCHAR(255) NOT NULL,
+                token VARCHAR(255) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                used BOOLEAN DEFAULT FALSE
+            )''',
+        ],
+    },
+    {
+        'version': 3,
+        'name': 'Indizes für Berichte und Zeiterfassung',
+        'transaktion': False,
+        'indizes': [
+            ('idx_sitzungen_projekt_start', 'sitzungen (projekt_id, start_zeit)'),
+            ('idx_sitzungen_start', 'sitzungen (start_zeit)'),
+            ('idx_aktive_sitzungen_projekt_mitarbeiter', 'aktive_sitzungen (projekt_id, mitarbeiter)'),
+            ('idx_projekte_status_beendet', 'projekte (status, beendet_am)'),
+            ('idx_password_resets_token', 'password_resets (token)'),
+        ],
+    },
+    {
+        'version': 4,
+        'name': 'Tages-Rollup sitzungen_tage',
+        'sql': [
+            '''CREATE TABLE IF NOT EXISTS sitzungen_tage (
+                tag DATE NOT NULL,
+                projekt_id INTEGER NOT NULL,
+                mitarbeiter VARCHAR(255) NOT NULL,
+                teilbereich VARCHAR(100) NOT NULL,
+                minuten BIGINT NOT NULL DEFAULT 0,
+                anzahl INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (tag, projekt_id, mitarbeiter, teilbereich)
+            )''',
+            'CREATE INDEX IF NOT EXISTS idx_sitzungen_tage_projekt ON sitzungen_tage (projekt_id, tag)',
+            '''INSERT INTO sitzungen_tage (tag, projekt_id, mitarbeiter, teilbereich, minuten, anzahl)
+               SELECT start_zeit::date, projekt_id, mitarbeiter,
+                      CASE WHEN lower(trim(teilbereich)) = 'aufmaß' THEN 'aufmass'
+                           ELSE lower(trim(teilbereich)) END,
+                      COALESCE(SUM(dauer_minuten), 0), COUNT(*)
+               FROM sitzungen
+               WHERE end_zeit IS NOT NULL AND projekt_id IS NOT NULL
+               GROUP BY 1, 2, 3, 4
+               ON CONFLICT DO NOTHING''',
+        ],
+    },
+    {
+        'version': 5,
+        'name': 'Versionsstempel für Stammdaten',
+        'sql': [
+            '''CREATE TABLE IF NOT EXISTS stammdaten_version (
+                tabelle VARCHAR(50) PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 1
+            )''',
+            '''INSERT INTO stammdaten_version (tabelle, version)
+               VALUES ('mitarbeiter', 1), ('kunden', 1)
+               ON CONFLICT DO NOTHING''',
+        ],
+    },
+    {
+        'version': 6,
+        'name': 'Zeitspalten als timestamptz',
+        # Schreibt die Tabellen neu (ACCESS EXCLUSIVE) - bei großen Datenbeständen
+        # außerhalb der Arbeitszeit deployen. Sitzungen wurden bisher in UTC
+        # geschrieben, Projekt-/Benutzer-Zeitstempel in Berliner Ortszeit.
+        'sql': [
+            """ALTER TABLE sitzungen
+                   ALTER COLUMN start_zeit TYPE TIMESTAMPTZ USING start_zeit AT TIME ZONE 'UTC',
+                   ALTER COLUMN end_zeit TYPE TIMESTAMPTZ USING end_zeit AT TIME ZONE 'UTC'""",
+            """ALTER TABLE aktive_sitzungen
+                   ALTER COLUMN start_zeit TYPE TIMESTAMPTZ USING start_zeit AT TIME ZONE 'UTC'""",
+            """ALTER TABLE projekte
+                   ALTER COLUMN erstellt_am TYPE TIMESTAMPTZ USING erstellt_am AT TIME ZONE 'Europe/Berlin',
+                   ALTER COLUMN beendet_am TYPE TIMESTAMPTZ USING beendet_am AT TIME ZONE 'Europe/Berlin',
+                   ALTER COLUMN erster_start TYPE TIMESTAMPTZ USING erster_start AT TIME ZONE 'UTC',
+                   ALTER COLUMN letzter_start TYPE TIMESTAMPTZ USING letzter_start AT TIME ZONE 'UTC'""",
+            """ALTER TABLE benutzer
+                   ALTER COLUMN registriert_am TYPE TIMESTAMPTZ USING registriert_am AT TIME ZONE 'Europe/Berlin'""",
+            """ALTER TABLE password_resets
+                   ALTER COLUMN created_at TYPE TIMESTAMPTZ USING created_at AT TIME ZONE 'UTC'""",
+            # Tages-Rollup nach lokalem Kalendertag statt UTC-Tag neu aufbauen
+            'TRUNCATE sitzungen_tage',
+            f'''INSERT INTO sitzungen_tage (tag, projekt_id, mitarbeiter, teilbereich, minuten, anzahl)
+               SELECT (start_zeit AT TIME ZONE '{ZEITZONE_NAME}')::date, projekt_id, mitarbeiter,
+                      CASE WHEN lower(trim(teilbereich)) = 'aufmaß' THEN 'aufmass'
+                           ELSE lower(trim(teilbereich)) END,
+                      COALESCE(SUM(dauer_minuten), 0), COUNT(*)
+               FROM sitzungen
+               WHERE end_zeit IS NOT NULL AND projekt_id IS NOT NULL
+               GROUP BY 1, 2, 3, 4''',
+        ],
+    },
+    {
+        'version': 7,
+        'name': 'Ausdrucks-Indizes für die Dashboard-Sortierung',
+        'transaktion': False,
+        'indizes': [
+            ('idx_projekte_dashboard',
+             f'projekte (({DASHBOARD_RANG_SQL}), ({DASHBOARD_ZEIT_SQL}), id)'),
+            ('idx_projekte_ersteller_dashboard',
+             f'projekte (ersteller, ({DASHBOARD_RANG_SQL}), ({DASHBOARD_ZEIT_SQL}), id)'),
+        ],
+    },
+    {
+        'version': 8,
+        'name': 'Zähler je Projekt (projekt_zaehler.py)',
+        'sql': [
+            # Konstante Defaults: nur Katalog-Änderung, kein Tabellen-Rewrite
+            '''ALTER TABLE projekte
+                   ADD COLUMN IF NOT EXISTS gesamt_minuten BIGINT NOT NULL DEFAULT 0,
+                   ADD COLUMN IF NOT EXISTS anzahl_sitzungen INTEGER NOT NULL DEFAULT 0,
+                   ADD COLUMN IF NOT EXISTS minuten_besprechung BIGINT NOT NULL DEFAULT 0,
+                   ADD COLUMN IF NOT EXISTS minuten_zeichnung BIGINT NOT NULL DEFAULT 0,
+                   ADD COLUMN IF NOT EXISTS minuten_aufmass BIGINT NOT NULL DEFAULT 0,
+                   ADD COLUMN IF NOT EXISTS erste_sitzung TIMESTAMPTZ,
+                   ADD COLUMN IF NOT EXISTS letzte_sitzung TIMESTAMPTZ,
+                   ADD COLUMN IF NOT EXISTS aktive_mitarbeiter INTEGER NOT NULL DEFAULT 0''',
+            '''UPDATE projekte p SET
+                   gesamt_minuten = s.gesamt_minuten,
+                   anzahl_sitzungen = s.anzahl_sitzungen,
+                   minuten_besprechung = s.minuten_besprechung,
+                   minuten_zeichnung = s.minuten_zeichnung,
+                   minuten_aufmass = s.minuten_aufmass,
+                   erste_sitzung = s.erste_sitzung,
+                   letzte_sitzung = s.letzte_sitzung
+               FROM (
+                   SELECT projekt_id,
+                          COALESCE(SUM(dauer_minuten), 0) AS gesamt_minuten,
+                          COUNT(*) AS anzahl_sitzungen,
+                          COALESCE(SUM(dauer_minuten) FILTER (WHERE tb = 'besprechung'), 0) AS minuten_besprechung,
+                          COALESCE(SUM(dauer_minuten) FILTER (WHERE tb = 'zeichnung'), 0) AS minuten_zeichnung,
+                          COALESCE(SUM(dauer_minuten) FILTER (WHERE tb = 'aufmass'), 0) AS minuten_aufmass,
+                          MIN(start_zeit) AS erste_sitzung,
+                          MAX(start_zeit) AS letzte_sitzung
+                   FROM (
+                       SELECT projekt_id, dauer_minuten, start_zeit,
+                              CASE WHEN lower(trim(teilbereich)) = 'aufmaß' THEN 'aufmass'
+                                   ELSE lower(trim(teilbereich)) END AS tb
+                       FROM sitzungen
+                   ) x
+                   GROUP BY projekt_id
+               ) s
+               WHERE s.projekt_id = p.id''',
+            '''UPDATE projekte p SET aktive_mitarbeiter = a.anzahl
+               FROM (SELECT projekt_id, COUNT(*) AS anzahl FROM aktive_sitzungen GROUP BY projekt_id) a
+               WHERE a.projekt_id = p.id''',
+        ],
+    },
+    {
+        'version': 9,
+        'name': 'Eine aktive Sitzung je Projekt und Mitarbeiter (aktivitaet.py)',
+        'sql': [
+            # Kleine Tabelle (eine Zeile je arbeitendem Mitarbeiter) - die Sperre ist kurz
+            'LOCK TABLE aktive_sitzungen IN SHARE ROW EXCLUSIVE MODE',
+            # Doppelte Einträge aus Start-Rennen: der früheste Start bleibt
+            '''DELETE FROM aktive_sitzungen a
+               USING aktive_sitzungen b
+               WHERE a.projekt_id = b.projekt_id AND a.mitarbeiter = b.mitarbeiter
+                 AND (a.start_zeit, a.id) > (b.start_zeit, b.id)''',
+            '''UPDATE projekte p SET aktive_mitarbeiter = (
+                   SELECT COUNT(*) FROM aktive_sitzungen a WHERE a.projekt_id = p.id
+               )
+               WHERE p.aktive_mitarbeiter > 0''',
+            '''ALTER TABLE aktive_sitzungen
+                   ADD CONSTRAINT aktive_sitzungen_projekt_mitarbeiter_key UNIQUE (projekt_id, mitarbeiter)''',
+            # Der Constraint bringt seinen eigenen Index mit
+            'DROP INDEX IF EXISTS idx_aktive_sitzungen_projekt_mitarbeiter',
+        ],
+    },
+    {
+        'version': 10,
+        'name': 'Quittungen der Offline-Warteschlange (aktivitaet.py)',
+        'sql': [
+            '''CREATE TABLE IF NOT EXISTS ereignis_quittungen (
+                schluessel VARCHAR(64) PRIMARY KEY,
+                benutzer VARCHAR(255),
+                ergebnis JSONB,
+                verarbeitet_am TIMESTAMPTZ NOT NULL DEFAULT now()
+            )''',
+            'CREATE INDEX IF NOT EXISTS idx_ereignis_quittungen_verarbeitet ON ereignis_quittungen (verarbeitet_am)',
+        ],
+    },
+]
+
+
+def _index_anlegen(cursor, name, definition):
+    """Legt einen Index ohne Tabellensperre an (CONCURRENTLY)"""
+    # Ein abgebrochener CONCURRENTLY-Build hinterlässt einen ungültigen Index
+    cursor.execute('''
+        SELECT 1 FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND NOT i.indisvalid
+    ''', (name,))
+    if cursor.fetchone():
+        print(f"⚠️  Ungültiger Index {name} wird neu aufgebaut")
+        cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+    cursor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}')
+
+
+def angewendete_versionen(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrationen (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            angewendet_am TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('SELECT version FROM schema_migrationen')
+    return {row['version'] for row in cursor.fetchall()}
+
+
+def migrieren(bis_version=None):
+    """Wendet alle ausstehenden Migrationen in Versions-Reihenfolge an"""
+    conn = neue_verbindung()
+    conn.autocommit = True
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('SELECT pg_advisory_lock(%s)', (MIGRATIONS_LOCK,))
+        angewendet = angewendete_versionen(cursor)
+        neu = []
+
+        for migration in sorted(MIGRATIONEN, key=lambda m: m['version']):
+            version = migration['version']
+            if version in angewendet:
+                continue
+            if bis_version is not None and version > bis_version:
+                break
+
+            print(f"🔧 Migration {version}: {migration['name']}")
+
+            if migration.get('transaktion', True):
+                conn.autocommit = False
+                try:
+                    for sql in migration.get('sql', []):
+                        cursor.execute(sql)
+                    cursor.execute(
+                        'INSERT INTO schema_migrationen (version, name) VALUES (%s, %s)',
+                        (version, migration['name'])
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    conn.autocommit = True
+            else:
+                for sql in migration.get('sql', []):
+                    cursor.execute(sql)
+                for name, definition in migration.get('indizes', []):
+                    _index_anlegen(cursor, name, definition)
+                cursor.execute(
+                    'INSERT INTO schema_migrationen (version, name) VALUES (%s, %s)',
+                    (version, migration['name'])
+                )
+
+            neu.append(version)
+
+        return neu
+
+    finally:
+        try:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', (MIGRATIONS_LOCK,))
+        except Exception:
+            pass  # Lock endet ohnehin mit der Session
+        conn.close()
+
+
+def status():
+    """Liefert (version, name, angewendet) für alle bekannten Migrationen"""
+    conn = neue_verbindung()
+    conn.autocommit = True
+    try:
+        angewendet = angewendete_versionen(conn.cursor())
+    finally:
+        conn.close()
+    return [(m['version'], m['name'], m['version'] in angewendet) for m in MIGRATIONEN]
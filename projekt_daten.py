@@ -0,0 +1,224 @@
+"""
+Projekt-Loader für die PostgreSQL-Version (app_db.py)
+"""
+import json
+from zeit import iso_utc, projekt_anzeige_vorbereiten
+
+TEILBEREICHE = ['besprechung', 'zeichnung', 'aufmass']
+
+
+def teilbereich_sql(spalte='teilbereich'):
+    """SQL-Ausdruck, der den Teilbereich vereinheitlicht ('Aufmaß ' -> 'aufmass')"""
+    return f'''
+        CASE WHEN lower(trim({spalte})) = 'aufmaß' THEN 'aufmass'
+             ELSE lower(trim({spalte})) END
+    '''
+
+
+def teilbereich_normalisieren(name):
+    """Gleiche Vereinheitlichung wie teilbereich_sql(), in Python"""
+    name = (name or '').strip().lower()
+    return 'aufmass' if name == 'aufmaß' else name
+
+
+TEILBEREICH_SQL = teilbereich_sql()
+
+PROJEKT_AGGREGAT_SQL = f'''
+    WITH s AS (
+        SELECT {TEILBEREICH_SQL} AS teilbereich,
+               mitarbeiter, start_zeit, end_zeit, dauer_minuten,
+               ROW_NUMBER() OVER (ORDER BY start_zeit DESC) AS nr
+        FROM sitzungen
+        WHERE projekt_id = %(projekt_id)s
+    ),
+    tb AS (
+        SELECT teilbereich,
+               COALESCE(SUM(dauer_minuten), 0) AS gesamt_minuten,
+               COUNT(*) AS anzahl_sitzungen,
+               COALESCE(json_agg(json_build_object(
+                   'mitarbeiter', mitarbeiter,
+                   'start', start_zeit,
+                   'end', end_zeit,
+                   'dauer_minuten', dauer_minuten
+               ) ORDER BY start_zeit DESC) FILTER (
+                   WHERE nr > %(offset)s
+                   AND (%(limit)s IS NULL OR nr <= %(offset)s + %(limit)s)
+               ), '[]') AS sitzungen
+        FROM s
+        GROUP BY teilbereich
+    ),
+    ma AS (
+        SELECT mitarbeiter, teilbereich,
+               COALESCE(SUM(dauer_minuten), 0) AS minuten,
+               COUNT(*) AS anzahl_sitzungen
+        FROM s
+        GROUP BY mitarbeiter, teilbereich
+    )
+    SELECT p.*,
+        (SELECT COALESCE(json_agg(json_build_object(
+                    'mitarbeiter', a.mitarbeiter,
+                    'teilbereich', a.teilbereich,
+                    'start_zeit', a.start_zeit
+                ) ORDER BY a.start_zeit), '[]')
+         FROM aktive_sitzungen a WHERE a.projekt_id = p.id) AS agg_aktive,
+        (SELECT COALESCE(json_agg(row_to_json(tb)), '[]') FROM tb) AS agg_teilbereiche,
+        (SELECT COALESCE(json_agg(row_to_json(ma)), '[]') FROM ma) AS agg_mitarbeiter
+    FROM projekte p
+    WHERE p.id = %(projekt_id)s
+'''
+
+
+def _json(wert):
+    """json/jsonb-Spalten kommen je nach Treiber-Version als str oder Objekt"""
+    if isinstance(wert, str):
+        return json.loads(wert)
+    return wert
+
+
+def lade_projekt_aggregat(cursor, projekt_id, limit=None, offset=0):
+    """
+    Lädt Projekt, aktive Sitzungen und alle beendeten Sitzungen in einem
+    einzigen Round-Trip. Summen werden in SQL gebildet, die Sitzungsliste
+    kann über limit/offset seitenweise geladen werden (limit=0 = keine Liste).
+    Liefert None, wenn das Projekt nicht existiert.
+    """
+    cursor.execute(PROJEKT_AGGREGAT_SQL, {
+        'projekt_id': projekt_id,
+        'limit': limit,
+        'offset': max(0, offset or 0),
+    })
+    row = cursor.fetchone()
+    if not row:
+        return None
+
+    projekt = dict(row)
+    aktive = _json(projekt.pop('agg_aktive')) or []
+    teilbereiche_rows = _json(projekt.pop('agg_teilbereiche')) or []
+    mitarbeiter_rows = _json(projekt.pop('agg_mitarbeiter')) or []
+
+    # Aktive Sitzungen nach Mitarbeiter
+    projekt['aktive_sitzungen'] = {
+        a['mitarbeiter']: {
+            'teilbereich': a['teilbereich'],
+            'start': a['start_zeit'],
+        }
+        for a in aktive
+    }
+
+    # Teilbereiche - immer alle bekannten, auch ohne Sitzungen
+    teilbereiche = {
+        tb: {'sitzungen': [], 'gesamt_minuten': 0, 'anzahl_sitzungen': 0}
+        for tb in TEILBEREICHE
+    }
+    for tb in teilbereiche_rows:
+        teilbereiche[tb['teilbereich']] = {
+            'sitzungen': tb['sitzungen'],
+            'gesamt_minuten': tb['gesamt_minuten'],
+            'anzahl_sitzungen': tb['anzahl_sitzungen'],
+        }
+    projekt['teilbereiche'] = teilbereiche
+
+    # Mitarbeiter-Statistiken je Teilbereich
+    mitarbeiter_stats = {}
+    for ma in mitarbeiter_rows:
+        stats = mitarbeiter_stats.setdefault(ma['mitarbeiter'], {
+            'besprechung': 0,
+            'zeichnung': 0,
+            'aufmass': 0,
+            'gesamt': 0,
+            'sitzungen': 0
+        })
+        if ma['teilbereich'] in TEILBEREICHE:
+            stats[ma['teilbereich']] += ma['minuten']
+            stats['gesamt'] += ma['minuten']
+            stats['sitzungen'] += ma['anzahl_sitzungen']
+    projekt['mitarbeiter_stats'] = mitarbeiter_stats
+
+    # Uhrzeiten/Datum in Ortszeit einmal hier - die Templates rechnen nicht mehr um
+    return projekt_anzeige_vorbereiten(projekt)
+
+
+def lade_live_stand(cursor, projekt_id):
+    """Aktuelle aktive Sitzungen eines Projekts (Ausgangsstand für Live-Clients)"""
+    cursor.execute('''
+        SELECT mitarbeiter, teilbereich, start_zeit
+        FROM aktive_sitzungen
+        WHERE projekt_id = %s
+        ORDER BY start_zeit
+    ''', (projekt_id,))
+    return [
+        {
+            'mitarbeiter': row['mitarbeiter'],
+            'teilbereich': row['teilbereich'],
+            'start': iso_utc(row['start_zeit']),
+        }
+        for row in cursor.fetchall()
+    ]
+
+
+def projekt_ids_lesen(roh_ids):
+    """
+    IDs aus dem Request als int (beide Versionen) -> (projekt_ids, ergebnisse).
+    Ungültige Einträge landen direkt in ergebnisse. ValueError, wenn es keine Liste ist.
+    """
+    if not isinstance(roh_ids, list):
+        raise ValueError('projekt_ids muss eine Liste sein')
+    projekt_ids, ergebnisse = [], {}
+    for roh in roh_ids:
+        try:
+            projekt_ids.append(int(roh))
+        except (TypeError, ValueError):
+            ergebnisse[str(roh)] = 'ungültig'
+    return projekt_ids, ergebnisse
+
+
+def projekte_loeschen(cursor, projekt_ids, ersteller=None):
+    """
+    Löscht Projekte samt Sitzungen, aktiven Sitzungen und Rollup-Zeilen mit
+    einer festen Anzahl Statements - egal wie viele IDs übergeben werden.
+
+    ersteller - nur Projekte dieses Benutzers löschen (None = alle)
+    Liefert ({str(projekt_id): 'gelöscht' | 'nicht gefunden' | 'keine Berechtigung'},
+             [betroffene Projekte mit Ersteller, Sitzungstagen und beendet_am])
+    Schlüssel sind Strings wie die ungültigen IDs aus dem Request - jsonify
+    sortiert die Schlüssel und scheitert an gemischten int/str.
+    """
+    ids = sorted(set(projekt_ids))
+    if not ids:
+        return {}, []
+
+    # Zeilen in fester Reihenfolge sperren (keine Deadlocks bei parallelen Löschungen)
+    cursor.execute('''
+        SELECT p.id, p.ersteller, p.beendet_am,
+               p.erste_sitzung AS tag_von, p.letzte_sitzung AS tag_bis
+        FROM projekte p
+        WHERE p.id = ANY(%s)
+        ORDER BY p.id
+        FOR UPDATE OF p
+    ''', (ids,))
+    zeilen = {row['id']: row for row in cursor.fetchall()}
+    gefunden = {i: row['ersteller'] for i, row in zeilen.items()}
+    erlaubt = [i for i in ids if i in gefunden and (ersteller is None or gefunden[i] == ersteller)]
+
+    if erlaubt:
+        for tabelle in ('aktive_sitzungen', 'sitzungen', 'sitzungen_tage'):
+            cursor.execute(f'DELETE FROM {tabelle} WHERE projekt_id = ANY(%s)', (erlaubt,))
+        cursor.execute('DELETE FROM projekte WHERE id = ANY(%s)', (erlaubt,))
+
+    ergebnisse = {}
+    for i in ids:
+        if i not in gefunden:
+            ergebnisse[str(i)] = 'nicht gefunden'
+        elif i in erlaubt:
+            ergebnisse[str(i)] = 'gelöscht'
+        else:
+            ergebnisse[str(i)] = 'keine Berechtigung'
+
+    betroffen = [{
+        'projekt_id': i,
+        'ersteller': zeilen[i]['ersteller'],
+        'tag_von': zeilen[i]['tag_von'],
+        'tag_bis': zeilen[i]['tag_bis'],
+        'beendet_am': zeilen[i]['beendet_am'],
+    } for i in erlaubt]
+    return ergebnisse, betroffen
@@ -0,0 +1,155 @@
+"""
+Zähler je Projekt - Spalten in projekte, beim Schreiben fortgeschrieben
+
+    gesamt_minuten, anzahl_sitzungen   beendete Sitzungen
+    minuten_<teilbereich>              Minuten je Teilbereich
+    erste_sitzung, letzte_sitzung      frühester/spätester Sitzungsstart
+    aktive_mitarbeiter                 laufende Sitzungen
+
+Start und Stopp schreiben die Zähler in derselben Anweisung wie die Sitzung
+fort (aktivitaet.py, beendet_zuweisungen), Dashboard und Projekt-Bericht
+lesen nur noch die Spalten. Abweichungen (z.B. nach Änderungen direkt in
+der Datenbank) repariert:
+
+    python projekt_zaehler.py --abgleichen      # reparieren
+    python projekt_zaehler.py --pruefen         # nur anzeigen
+"""
+import sys
+from projekt_daten import TEILBEREICHE, teilbereich_sql
+
+ABGLEICH_BLOCK = 1000
+
+TEILBEREICH_SPALTEN = {tb: f'minuten_{tb}' for tb in TEILBEREICHE}
+ZAEHLER_SPALTEN = (['gesamt_minuten', 'anzahl_sitzungen'] + list(TEILBEREICH_SPALTEN.values())
+                   + ['erste_sitzung', 'letzte_sitzung', 'aktive_mitarbeiter'])
+
+
+def beendet_zuweisungen(minuten, teilbereich, start_zeit, aktive):
+    """SET-Teil für eine beendete Sitzung - die Argumente sind SQL-Ausdrücke (aktive: neuer Wert)"""
+    return f'''
+        gesamt_minuten = gesamt_minuten + {minuten},
+        anzahl_sitzungen = anzahl_sitzungen + 1,
+        {', '.join(f"{spalte} = {spalte} + CASE WHEN {teilbereich} = '{tb}' THEN {minuten} ELSE 0 END"
+                   for tb, spalte in TEILBEREICH_SPALTEN.items())},
+        erste_sitzung = LEAST(erste_sitzung, {start_zeit}),
+        letzte_sitzung = GREATEST(letzte_sitzung, {start_zeit}),
+        aktive_mitarbeiter = {aktive}
+    '''
+
+
+# Soll-Werte aus sitzungen/aktive_sitzungen (für Migration und Abgleich)
+ZAEHLER_SOLL_SQL = f'''
+    SELECT p.id,
+           COALESCE(s.gesamt_minuten, 0) AS gesamt_minuten,
+           COALESCE(s.anzahl_sitzungen, 0) AS anzahl_sitzungen,
+           {', '.join(f'COALESCE(s.{spalte}, 0) AS {spalte}' for spalte in TEILBEREICH_SPALTEN.values())},
+           s.erste_sitzung, s.letzte_sitzung,
+           COALESCE(a.anzahl, 0) AS aktive_mitarbeiter
+    FROM projekte p
+    LEFT JOIN (
+        SELECT projekt_id,
+               SUM(dauer_minuten) AS gesamt_minuten,
+               COUNT(*) AS anzahl_sitzungen,
+               {', '.join(f"SUM(dauer_minuten) FILTER (WHERE tb = '{tb}') AS {spalte}"
+                          for tb, spalte in TEILBEREICH_SPALTEN.items())},
+               MIN(start_zeit) AS erste_sitzung,
+               MAX(start_zeit) AS letzte_sitzung
+        FROM (
+            SELECT projekt_id, dauer_minuten, start_zeit, {teilbereich_sql()} AS tb
+            FROM sitzungen
+            WHERE projekt_id = ANY(%(ids)s)
+        ) x
+        GROUP BY projekt_id
+    ) s ON s.projekt_id = p.id
+    LEFT JOIN (
+        SELECT projekt_id, COUNT(*) AS anzahl
+        FROM aktive_sitzungen
+        WHERE projekt_id = ANY(%(ids)s)
+        GROUP BY projekt_id
+    ) a ON a.projekt_id = p.id
+    WHERE p.id = ANY(%(ids)s)
+'''
+
+_ABGLEICH_SQL = f'''
+    UPDATE projekte p SET
+        {', '.join(f'{spalte} = soll.{spalte}' for spalte in ZAEHLER_SPALTEN)}
+    FROM ({ZAEHLER_SOLL_SQL}) soll
+    WHERE p.id = soll.id
+      AND ({', '.join(f'p.{spalte}' for spalte in ZAEHLER_SPALTEN)})
+          IS DISTINCT FROM ({', '.join(f'soll.{spalte}' for spalte in ZAEHLER_SPALTEN)})
+    RETURNING p.id
+'''
+
+_PRUEFEN_SQL = f'''
+    SELECT soll.id
+    FROM ({ZAEHLER_SOLL_SQL}) soll
+    JOIN projekte p ON p.id = soll.id
+    WHERE ({', '.join(f'p.{spalte}' for spalte in ZAEHLER_SPALTEN)})
+          IS DISTINCT FROM ({', '.join(f'soll.{spalte}' for spalte in ZAEHLER_SPALTEN)})
+    ORDER BY soll.id
+'''
+
+
+def aktive_verworfen(cursor, projekt_id):
+    """Alle aktiven Sitzungen des Projekts wurden ohne Buchung gelöscht"""
+    cursor.execute('UPDATE projekte SET aktive_mitarbeiter = 0 WHERE id = %s', (projekt_id,))
+
+
+def zaehler_abgleichen(cursor, projekt_ids, nur_pruefen=False):
+    """
+    Rechnet die Zähler der Projekte aus den Sitzungen nach und korrigiert
+    Abweichungen. Liefert die IDs der abweichenden Projekte.
+    """
+    ids = sorted(set(projekt_ids))
+    if not ids:
+        return []
+    if nur_pruefen:
+        cursor.execute(_PRUEFEN_SQL, {'ids': ids})
+        return [row['id'] for row in cursor.fetchall()]
+
+    # Erst sperren, dann zählen: laufende Starts/Stopps dieser Projekte warten,
+    # bereits committete sind im Snapshot des nächsten Statements enthalten
+    cursor.execute('SELECT id FROM projekte WHERE id = ANY(%s) ORDER BY id FOR UPDATE', (ids,))
+    cursor.execute(_ABGLEICH_SQL, {'ids': ids})
+    return sorted(row['id'] for row in cursor.fetchall())
+
+
+def alle_abgleichen(conn, nur_pruefen=False, block=ABGLEICH_BLOCK):
+    """Alle Projekte in Blöcken (je eine Transaktion) - sperrt nie die ganze Tabelle"""
+    cursor = conn.cursor()
+    abweichend = []
+    letzte_id = 0
+    while True:
+        cursor.execute('SELECT id FROM projekte WHERE id > %s ORDER BY id LIMIT %s', (letzte_id, block))
+        ids = [row['id'] for row in cursor.fetchall()]
+        if not ids:
+            break
+        abweichend += zaehler_abgleichen(cursor, ids, nur_pruefen=nur_pruefen)
+        conn.commit()
+        letzte_id = ids[-1]
+    return abweichend
+
+
+if __name__ == '__main__':
+    if '--abgleichen' not in sys.argv and '--pruefen' not in sys.argv:
+        print("Aufruf: python projekt_zaehler.py --abgleichen | --pruefen")
+        sys.exit(1)
+
+    from database import neue_verbindung
+
+    nur_pruefen = '--pruefen' in sys.argv
+    print("🔎 Prüfe Projekt-Zähler..." if nur_pruefen else "🔧 Gleiche Projekt-Zähler ab...")
+    conn = neue_verbindung()
+    try:
+        abweichend = alle_abgleichen(conn, nur_pruefen=nur_pruefen)
+    finally:
+        conn.close()
+
+    if not abweichend:
+        print("✅ Alle Zähler stimmen")
+    else:
+        beispiele = ', '.join(str(i) for i in abweichend[:20])
+        print(f"{'⚠️  Abweichend' if nur_pruefen else '✅ Korrigiert'}: {len(abweichend)} Projekte ({beispiele}"
+              f"{', ...' if len(abweichend) > 20 else ''})")
+        if nur_pruefen:
+            sys.exit(1)
@@ -0,0 +1,128 @@
+"""
+Strukturiertes Logging (eine JSON-Zeile pro Eintrag) mit Request-ID
+
+einrichten() hängt einen QueueHandler an den Root-Logger: der Request-Thread
+legt den Eintrag nur in eine Queue, ein eigener Thread (QueueListener)
+formatiert und schreibt nach stdout. Ist die Queue voll, wird verworfen
+statt zu blockieren.
+
+Zusätzliche Felder:  log.info('Projekt beendet', extra=felder(projekt_id=7))
+
+LOG_LEVEL (Standard INFO) steuert die Menge, LOG_FORMAT=text liefert lesbare
+Zeilen für die lokale Entwicklung.
+"""
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import logging
+import contextvars
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+LOG_QUEUE_MAX = int(os.environ.get('LOG_QUEUE_MAX', '10000'))
+
+_TRACEBACK = logging.Formatter()
+_request_id = contextvars.ContextVar('request_id', default=None)
+_eingerichtet_pid = None
+_listener = None
+
+
+def felder(**werte):
+    """extra=felder(...) - landet als eigene Schlüssel im JSON"""
+    return {'felder': werte}
+
+
+def request_id_setzen(wert):
+    _request_id.set(wert)
+    return wert
+
+
+def request_id():
+    return _request_id.get()
+
+
+class _KontextFilter(logging.Filter):
+    """Hängt die Request-ID an - läuft noch im Thread des Requests"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class _NichtBlockierenderQueueHandler(QueueHandler):
+    verworfen = 0
+
+    def prepare(self, record):
+        # Nachricht und Traceback hier auflösen, der Listener-Thread sieht nur Text
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _TRACEBACK.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _NichtBlockierenderQueueHandler.verworfen += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        eintrag = {
+            'zeit': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'nachricht': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            eintrag['request_id'] = record.request_id
+        eintrag.update(getattr(record, 'felder', None) or {})
+        if record.exc_text:
+            eintrag['fehler'] = record.exc_text
+        return json.dumps(eintrag, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        zeile = f'{record.levelname:<7} {record.name}: {record.getMessage()}'
+        zusatz = getattr(record, 'felder', None)
+        if zusatz:
+            zeile += ' ' + ' '.join(f'{k}={v}' for k, v in zusatz.items())
+        if getattr(record, 'request_id', None):
+            zeile += f' [{record.request_id}]'
+        if record.exc_text:
+            zeile += '\n' + record.exc_text
+        return zeile
+
+
+def einrichten(level=LOG_LEVEL, format=LOG_FORMAT):
+    """Root-Logger auf Queue + JSON umstellen (einmal pro Worker-Prozess)"""
+    global _eingerichtet_pid, _listener
+    if _eingerichtet_pid == os.getpid():
+        return
+    _eingerichtet_pid = os.getpid()
+
+    ausgabe = logging.StreamHandler(sys.stdout)
+    ausgabe.setFormatter(JsonFormatter() if format == 'json' else TextFormatter())
+
+    warteschlange = queue.Queue(maxsize=LOG_QUEUE_MAX)
+    handler = _NichtBlockierenderQueueHandler(warteschlange)
+    handler.addFilter(_KontextFilter())
+
+    root = logging.getLogger()
+    for alt in list(root.handlers):
+        root.removeHandler(alt)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(warteschlange, ausgabe, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)   # Queue beim Beenden noch leeren
@@ -0,0 +1,128 @@
+"""
+Stammdaten-Cache für Mitarbeiter- und Kundenlisten
+
+Die Listen liegen pro Worker im Speicher und tragen einen Versionsstempel.
+Ein Worker lädt nur neu, wenn sich die Version geändert hat:
+  - PostgreSQL (app_db.py): Zähler in der Tabelle stammdaten_version, der
+    beim Schreiben in derselben Transaktion hochgezählt wird
+  - JSON-Dateien (app.py):  Änderungszeit und Größe der Datei
+Die Version selbst wird höchstens alle STAMMDATEN_PRUEFEN_NACH Sekunden
+abgefragt, Änderungen im eigenen Worker wirken sofort - invalidiert wird
+erst nach dem COMMIT, sonst könnte ein paralleler Leser den alten Stand
+wieder in den Cache legen.
+"""
+import os
+import time
+import threading
+
+PRUEFEN_NACH = float(os.environ.get('STAMMDATEN_PRUEFEN_NACH', '2'))
+
+
+class StammdatenCache:
+    """Hält eine Liste im Speicher und lädt sie nur bei neuer Version nach"""
+
+    def __init__(self, laden, version, pruefen_nach=PRUEFEN_NACH):
+        self._laden = laden
+        self._version = version
+        self.pruefen_nach = pruefen_nach
+
+        self._lock = threading.Lock()
+        self._daten = None
+        self._geladene_version = None
+        self._geprueft_um = 0.0
+        self._generation = 0        # steigt bei jeder Invalidierung
+
+    def get(self):
+        """Liefert eine Kopie der Liste (Aufrufer dürfen sie verändern)"""
+        jetzt = time.monotonic()
+        with self._lock:
+            if self._daten is not None and jetzt - self._geprueft_um < self.pruefen_nach:
+                return list(self._daten)
+            generation, daten, geladene_version = self._generation, self._daten, self._geladene_version
+
+        # Außerhalb des Locks lesen - eine langsame Abfrage blockiert keine anderen Leser
+        version = self._version()
+        if daten is None or version != geladene_version:
+            daten = list(self._laden())
+
+        with self._lock:
+            # Zwischendurch invalidiert: der gelesene Stand kann schon veraltet sein
+            if generation == self._generation:
+                self._daten, self._geladene_version, self._geprueft_um = daten, version, jetzt
+        return list(daten)
+
+    def invalidieren(self):
+        """Nächster Zugriff prüft die Version sofort (nach dem COMMIT aufrufen)"""
+        with self._lock:
+            self._generation += 1
+            self._geprueft_um = 0.0
+
+
+# ---------------------------------------------------------------------------
+# JSON-Dateien (app.py)
+# ---------------------------------------------------------------------------
+
+def datei_version(pfad):
+    """Versionsstempel einer Datei - ändert sich mit jedem save_data()"""
+    def version():
+        try:
+            st = os.stat(pfad)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+    return version
+
+
+# ---------------------------------------------------------------------------
+# PostgreSQL (app_db.py)
+# ---------------------------------------------------------------------------
+
+_TABELLEN = {'mitarbeiter', 'kunden'}
+
+
+def _db_version(tabelle):
+    def version():
+        from database import db_verbindung
+        with db_verbindung() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT version FROM stammdaten_version WHERE tabelle = %s', (tabelle,))
+            row = cursor.fetchone()
+        return row['version'] if row else None
+    return version
+
+
+def _db_laden(tabelle):
+    def laden():
+        from database import db_verbindung
+        with db_verbindung() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT name FROM {tabelle} ORDER BY name')
+            return [row['name'] for row in cursor.fetchall()]
+    return laden
+
+
+_db_caches = {
+    tabelle: StammdatenCache(_db_laden(tabelle), _db_version(tabelle))
+    for tabelle in _TABELLEN
+}
+
+
+def stammdaten_geaendert(cursor, tabelle):
+    """Nach INSERT/DELETE in mitarbeiter/kunden aufrufen (gleiche Transaktion)"""
+    cursor.execute('''
+        INSERT INTO stammdaten_version (tabelle, version) VALUES (%s, 1)
+        ON CONFLICT (tabelle) DO UPDATE SET version = stammdaten_version.version + 1
+    ''', (tabelle,))
+
+
+def stammdaten_invalidieren(tabelle):
+    """Nach dem COMMIT aufrufen - der eigene Worker sieht die Änderung sofort"""
+    _db_caches[tabelle].invalidieren()
+
+
+def db_mitarbeiter():
+    return _db_caches['mitarbeiter'].get()
+
+
+def db_kunden():
+    return _db_caches['kunden'].get()
@@ -0,0 +1,69 @@
+// Service Worker: App-Shell für schlechte Netzabdeckung auf der Baustelle
+//
+// - Dashboard und Projektseiten: erst Netz, bei Erfolg Kopie in den Cache,
+//   ohne Netz die zuletzt gesehene Version
+// - /static/: aus dem Cache, im Hintergrund aktualisiert
+// - alles andere (POSTs, Live-Updates, Berichte) geht unverändert ans Netz
+// Starts/Stopps landen ohnehin zuerst in der Warteschlange (warteschlange.js).
+
+const CACHE = 'zeiterfassung-v1';
+const VORAB = ['/static/warteschlange.js'];
+const SEITEN = [/^\/dashboard$/, /^\/projekt\/\d+$/];
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(CACHE).then(cache => cache.addAll(VORAB)).then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(namen => Promise.all(namen.filter(n => n !== CACHE).map(n => caches.delete(n))))
+            .then(() => self.clients.claim())
+    );
+});
+
+function seiteLaden(request) {
+    return fetch(request)
+        .then(response => {
+            // Umleitungen (z.B. zum Login) nicht als Seite merken
+            if (response.ok && !response.redirected) {
+                const kopie = response.clone();
+                caches.open(CACHE).then(cache => cache.put(request, kopie));
+            }
+            return response;
+        })
+        .catch(() => caches.match(request)
+            .then(treffer => treffer || caches.match('/dashboard'))
+            .then(treffer => treffer || new Response(
+                '<h1>📴 Offline</h1><p>Diese Seite wurde noch nicht geladen.</p>',
+                { status: 503, headers: { 'Content-Type': 'text/html; charset=utf-8' } }
+            )));
+}
+
+function statischLaden(request) {
+    return caches.open(CACHE).then(cache => cache.match(request).then(treffer => {
+        const netz = fetch(request)
+            .then(response => {
+                if (response.ok) cache.put(request, response.clone());
+                return response;
+            })
+            .catch(() => treffer);
+        return treffer || netz;
+    }));
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+
+    if (request.mode === 'navigate' && SEITEN.some(muster => muster.test(url.pathname))) {
+        event.respondWith(seiteLaden(request));
+    } else if (url.pathname.startsWith('/static/')) {
+        event.respondWith(statischLaden(request));
+    }
+});
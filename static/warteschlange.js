@@ -0,0 +1,94 @@
+// Offline-Warteschlange für Starts/Stopps
+//
+// Jede Aktion bekommt sofort einen Idempotenz-Schlüssel und die Uhrzeit des
+// Tippens und landet in localStorage. Hochgeladen wird in Paketen an
+// /aktivitäten/ereignisse, sobald Netz da ist; erst nach der Antwort des
+// Servers verschwinden die Einträge. Bricht die Verbindung mitten im Upload
+// ab, schickt der nächste Versuch dieselben Schlüssel - der Server führt
+// jeden höchstens einmal aus (aktivitaet.py).
+//
+//     Warteschlange.einreihen([{aktion: 'starten', projekt_id: 7, mitarbeiter: 'Max', teilbereich: 'aufmass'}])
+//     Warteschlange.beiErgebnis(ergebnisse => ...)
+
+(function () {
+    const SPEICHER = 'zeiterfassung.warteschlange';
+    const PAKET_MAX = 50;           // = AKTIVITAET_SAMMEL_MAX auf dem Server
+    const WIEDERHOLEN_MS = 30000;
+
+    let laeuft = false;
+    const beobachter = [];
+
+    function lesen() {
+        try {
+            return JSON.parse(localStorage.getItem(SPEICHER)) || [];
+        } catch (e) {
+            return [];
+        }
+    }
+
+    function speichern(liste) {
+        localStorage.setItem(SPEICHER, JSON.stringify(liste));
+    }
+
+    function neuerSchluessel() {
+        if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+        return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+    }
+
+    function einreihen(aktionen) {
+        const zeit = new Date().toISOString();
+        const neu = aktionen.map(a => Object.assign({ schluessel: neuerSchluessel(), zeit: zeit }, a));
+        speichern(lesen().concat(neu));
+        hochladen();
+        return neu;
+    }
+
+    function hochladen() {
+        if (laeuft || !navigator.onLine) return;
+        const paket = lesen().slice(0, PAKET_MAX);
+        if (!paket.length) return;
+
+        laeuft = true;
+        fetch('/aktivitäten/ereignisse', {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ereignisse: paket })
+        })
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+        })
+        .then(data => {
+            if (data.status !== 'success') throw new Error(data.message || 'Upload fehlgeschlagen');
+            const erledigt = new Set(paket.map(e => e.schluessel));
+            speichern(lesen().filter(e => !erledigt.has(e.schluessel)));
+            laeuft = false;
+            beobachter.forEach(f => f(data.ergebnisse));
+            hochladen();    // Rest der Warteschlange
+        })
+        .catch(() => {
+            // Kein Netz, Login abgelaufen o.ä. - Einträge bleiben, nächster Versuch später
+            laeuft = false;
+        });
+    }
+
+    window.addEventListener('online', hochladen);
+    document.addEventListener('visibilitychange', () => {
+        if (!document.hidden) hochladen();
+    });
+    setInterval(hochladen, WIEDERHOLEN_MS);
+
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register('/sw.js').catch(() => {});
+    }
+
+    window.Warteschlange = {
+        einreihen: einreihen,
+        hochladen: hochladen,
+        ausstehend: lesen,
+        beiErgebnis: f => beobachter.push(f)
+    };
+
+    hochladen();
+})();
@@ -0,0 +1,128 @@
+"""
+Gemeinsame Fixtures
+
+DB-Tests laufen gegen eine eigene PostgreSQL-Datenbank:
+  - TEST_DATABASE_URL gesetzt  -> diese Datenbank (Tabellen werden geleert!)
+  - sonst pgserver installiert -> eingebettete Instanz in einem Temp-Verzeichnis
+  - sonst werden die DB-Tests übersprungen
+"""
+import os
+import time
+import pytest
+
+# Nur Warnungen und Fehler - protokoll.py schreibt sonst jede Anfrage nach stdout
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+TABELLEN = ['ereignis_quittungen', 'sitzungen_tage', 'aktive_sitzungen', 'sitzungen', 'projekte',
+            'password_resets', 'benutzer', 'mitarbeiter', 'kunden']
+
+TEAM_EMAIL = 'team@rausch.de'
+GAST_EMAIL = 'gast@rausch.de'
+
+
+def _eingebettete_datenbank(verzeichnis):
+    try:
+        import pgserver
+    except ImportError:
+        pytest.skip('Weder TEST_DATABASE_URL noch pgserver verfügbar')
+    server = pgserver.get_server(str(verzeichnis), cleanup_mode='stop')
+    server.psql('CREATE DATABASE zeiterfassung_test;')
+    return server.get_uri('zeiterfassung_test'), server
+
+
+@pytest.fixture(scope='session')
+def datenbank(tmp_path_factory):
+    """URL der Test-Datenbank mit allen Migrationen"""
+    url, server = os.environ.get('TEST_DATABASE_URL'), None
+    if not url:
+        url, server = _eingebettete_datenbank(tmp_path_factory.mktemp('pg'))
+    os.environ['DATABASE_URL'] = url
+
+    from migrationen import migrieren
+    migrieren()
+    yield url
+
+    from database import get_pool
+    get_pool().schliessen()
+    if server is not None:
+        server.cleanup()
+
+
+@pytest.fixture
+def db(datenbank):
+    """Leere Tabellen und leere Prozess-Caches; liefert eine Funktion für SQL"""
+    from database import db_verbindung
+    from anmeldung import db_benutzer
+    import berechtigung
+    import berichtcache
+    import stammdaten
+
+    with db_verbindung() as conn:
+        conn.cursor().execute(f"TRUNCATE {', '.join(TABELLEN)} RESTART IDENTITY CASCADE")
+
+    db_benutzer.vergessen()
+    berechtigung._cache.clear()
+    berechtigung._ersteller.clear()
+    berechtigung._vergessen.clear()
+    berichtcache._alles_verwerfen()
+    for cache in stammdaten._db_caches.values():
+        cache.invalidieren()
+
+    def sql(query, params=None):
+        with db_verbindung() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return cursor.fetchall() if cursor.description else None
+
+    return sql
+
+
+@pytest.fixture
+def app_db(db):
+    import app_db
+    app_db.app.config['TESTING'] = True
+    return app_db.app
+
+
+def anmelden(client, email=TEAM_EMAIL, team=True):
+    with client.session_transaction() as session:
+        session['benutzer_email'] = email
+        session['benutzer_name'] = email.split('@')[0].title()
+        session['team_mitglied'] = [team, time.time()]   # wie berechtigung_merken
+
+
+@pytest.fixture
+def client(app_db):
+    """Test-Client der PostgreSQL-Version, angemeldet als Team-Mitglied"""
+    client = app_db.test_client()
+    anmelden(client)
+    return client
+
+
+def projekt_anlegen(sql, name='Projekt', ersteller=TEAM_EMAIL, kunde='Kunde'):
+    return sql('INSERT INTO projekte (name, kunde, ersteller, status, erstellt_am) '
+               "VALUES (%s, %s, %s, 'gestoppt', now()) RETURNING id", (name, kunde, ersteller))[0]['id']
+
+
+@pytest.fixture
+def app_json(tmp_path, monkeypatch):
+    """JSON-Version (app.py) mit eigenen Dateien im Temp-Verzeichnis; Team- und Gast-Benutzer"""
+    import json
+    monkeypatch.chdir(tmp_path)
+    import app
+    from anmeldung import datei_benutzer
+    from journal import ProjektJournal
+
+    with open(app.BENUTZER_FILE, 'w', encoding='utf-8') as f:
+        json.dump({TEAM_EMAIL: {'name': 'Team', 'team_code_verwendet': app.TEAM_CODE},
+                   GAST_EMAIL: {'name': 'Gast', 'team_code_verwendet': None}}, f)
+    monkeypatch.setattr(app, 'projekte_journal', ProjektJournal(app.PROJEKTE_FILE))
+    monkeypatch.setattr(app, 'benutzer_verzeichnis', datei_benutzer(app.BENUTZER_FILE))
+    app.app.config['TESTING'] = True
+    return app
+
+
+def journal_projekt_anlegen(app, name='Projekt', ersteller=TEAM_EMAIL):
+    client = app.app.test_client()
+    anmelden(client, ersteller)
+    return client.post('/projekt/neu', data={'name': name, 'kunde': 'Kunde'}).get_json()['projekt_id']
@@ -0,0 +1,146 @@
+from database import db_verbindung
+from aktivitaet import SAMMEL_MAX
+from berichte import rollup_neu_aufbauen
+from projekt_zaehler import zaehler_abgleichen
+from conftest import GAST_EMAIL, anmelden, journal_projekt_anlegen, projekt_anlegen
+
+
+def _starten(client, projekt_id, mitarbeiter='Max', teilbereich='aufmass'):
+    return client.post(f'/projekt/{projekt_id}/aktivität/starten',
+                       data={'mitarbeiter': mitarbeiter, 'teilbereich': teilbereich}).get_json()
+
+
+def _beenden(client, projekt_id, mitarbeiter='Max'):
+    return client.post(f'/projekt/{projekt_id}/aktivität/beenden', data={'mitarbeiter': mitarbeiter}).get_json()
+
+
+def test_starten_und_beenden(client, db):
+    projekt_id = projekt_anlegen(db)
+
+    antwort = _starten(client, projekt_id)
+    assert antwort['status'] == 'success'
+    assert antwort['sitzung']['typ'] == 'gestartet'
+    assert antwort['sitzung']['start'].endswith('Z')
+    assert _starten(client, projekt_id) == {'status': 'error', 'message': 'Max arbeitet bereits'}
+
+    db("UPDATE aktive_sitzungen SET start_zeit = now() - interval '90 minutes'")
+    antwort = _beenden(client, projekt_id)
+    assert antwort['status'] == 'success'
+    assert (antwort['dauer_minuten'], antwort['dauer_text']) == (90, '1h 30m')
+    assert antwort['sitzung']['typ'] == 'beendet'
+    assert _beenden(client, projekt_id)['message'] == 'Keine aktive Sitzung gefunden'
+
+    [sitzung] = db('SELECT mitarbeiter, teilbereich, dauer_minuten FROM sitzungen')
+    assert dict(sitzung) == {'mitarbeiter': 'Max', 'teilbereich': 'aufmass', 'dauer_minuten': 90}
+    assert db('SELECT minuten FROM sitzungen_tage')[0]['minuten'] == 90
+    [projekt] = db('SELECT status, gesamt_minuten, minuten_aufmass, aktive_mitarbeiter FROM projekte')
+    assert dict(projekt) == {'status': 'pausiert', 'gesamt_minuten': 90, 'minuten_aufmass': 90,
+                             'aktive_mitarbeiter': 0}
+
+
+def test_projekt_bleibt_laufend_solange_jemand_arbeitet(client, db):
+    projekt_id = projekt_anlegen(db)
+    _starten(client, projekt_id, 'Max')
+    _starten(client, projekt_id, 'Eva', 'zeichnung')
+
+    _beenden(client, projekt_id, 'Max')
+    assert db('SELECT status FROM projekte')[0]['status'] == 'laufend'
+    _beenden(client, projekt_id, 'Eva')
+    assert db('SELECT status FROM projekte')[0]['status'] == 'pausiert'
+
+
+def test_zaehler_und_rollup_passen_zu_den_sitzungen(client, db):
+    projekt_id = projekt_anlegen(db)
+    _starten(client, projekt_id, 'Max', 'Aufmaß')
+    _starten(client, projekt_id, 'Eva', 'zeichnung')
+    db("UPDATE aktive_sitzungen SET start_zeit = now() - interval '25 minutes'")
+    _beenden(client, projekt_id, 'Max')
+
+    rollup = 'SELECT tag, mitarbeiter, teilbereich, minuten, anzahl FROM sitzungen_tage ORDER BY 2'
+    fortgeschrieben = db(rollup)
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        assert zaehler_abgleichen(cursor, [projekt_id], nur_pruefen=True) == []
+        rollup_neu_aufbauen(cursor, [projekt_id])
+    assert db(rollup) == fortgeschrieben
+
+
+def test_status_folgt_den_sitzungen_auch_bei_falschem_zaehler(client, db):
+    projekt_id = projekt_anlegen(db)
+    _starten(client, projekt_id, 'Max')
+
+    # Zu hoch: der letzte Stopp pausiert trotzdem und setzt den Zähler zurück
+    db('UPDATE projekte SET aktive_mitarbeiter = 5')
+    assert _beenden(client, projekt_id, 'Max')['status'] == 'success'
+    [projekt] = db('SELECT status, aktive_mitarbeiter FROM projekte')
+    assert dict(projekt) == {'status': 'pausiert', 'aktive_mitarbeiter': 0}
+
+    # Zu niedrig: der nächste Start zählt die übrigen Sitzungen mit
+    _starten(client, projekt_id, 'Max')
+    _starten(client, projekt_id, 'Eva')
+    db('UPDATE projekte SET aktive_mitarbeiter = 0')
+    _starten(client, projekt_id, 'Udo')
+    assert db('SELECT aktive_mitarbeiter FROM projekte')[0]['aktive_mitarbeiter'] == 3
+
+    _beenden(client, projekt_id, 'Max')
+    _beenden(client, projekt_id, 'Eva')
+    assert db('SELECT status FROM projekte')[0]['status'] == 'laufend'
+    _beenden(client, projekt_id, 'Udo')
+    assert db('SELECT status FROM projekte')[0]['status'] == 'pausiert'
+
+
+def test_sammel_aktion_ueber_mehrere_projekte(app_db, db):
+    eigenes = projekt_anlegen(db, name='Eigenes', ersteller=GAST_EMAIL)
+    fremdes = projekt_anlegen(db, name='Fremdes')
+    client = app_db.test_client()
+    anmelden(client, GAST_EMAIL, team=False)
+
+    antwort = client.post('/aktivitäten', json={'aktionen': [
+        {'aktion': 'starten', 'projekt_id': fremdes, 'mitarbeiter': 'Max', 'teilbereich': 'aufmass'},
+        {'aktion': 'starten', 'projekt_id': eigenes, 'mitarbeiter': 'Max', 'teilbereich': 'aufmass'},
+        {'aktion': 'starten', 'projekt_id': eigenes, 'mitarbeiter': 'Eva', 'teilbereich': 'zeichnung'},
+        {'aktion': 'beenden', 'projekt_id': eigenes, 'mitarbeiter': 'Udo'},
+        {'aktion': 'starten', 'projekt_id': eigenes, 'mitarbeiter': 'Udo'},
+        {'aktion': 'starten', 'projekt_id': 999, 'mitarbeiter': 'Max', 'teilbereich': 'aufmass'},
+    ]}).get_json()
+
+    # Ergebnisse in der Reihenfolge der Anfrage, auch wenn nach Projekt sortiert ausgeführt wird
+    assert [e['status'] for e in antwort['ergebnisse']] == [
+        'keine Berechtigung', 'gestartet', 'gestartet', 'keine aktive Sitzung', 'ungültig', 'nicht gefunden']
+    assert db('SELECT aktive_mitarbeiter, status FROM projekte WHERE id = %s', (eigenes,))[0] == \
+        {'aktive_mitarbeiter': 2, 'status': 'laufend'}
+    assert db('SELECT COUNT(*) AS n FROM aktive_sitzungen WHERE projekt_id = %s', (fremdes,))[0]['n'] == 0
+
+
+def test_sammel_aktion_ist_begrenzt(client, db):
+    zu_viele = [{'aktion': 'beenden', 'projekt_id': 1, 'mitarbeiter': f'M{n}'} for n in range(SAMMEL_MAX + 1)]
+    assert client.post('/aktivitäten', json={'aktionen': zu_viele}).status_code == 400
+    assert client.post('/aktivitäten', json={'aktionen': []}).status_code == 400
+
+
+def test_beendetes_projekt_laesst_sich_nicht_starten(client, db):
+    projekt_id = projekt_anlegen(db)
+    db("UPDATE projekte SET status = 'beendet', beendet_am = now()")
+
+    assert _starten(client, projekt_id) == {'status': 'error', 'message': 'Projekt ist bereits beendet'}
+    assert _starten(client, 999) == {'status': 'error', 'message': 'Projekt nicht gefunden'}
+    antwort = client.post('/aktivitäten', json={'aktionen': [
+        {'aktion': 'starten', 'projekt_id': projekt_id, 'mitarbeiter': 'Max', 'teilbereich': 'aufmass'}]})
+    assert antwort.get_json()['ergebnisse'][0]['status'] == 'Projekt beendet'
+
+    [projekt] = db('SELECT status, aktive_mitarbeiter FROM projekte')
+    assert dict(projekt) == {'status': 'beendet', 'aktive_mitarbeiter': 0}
+    assert db('SELECT COUNT(*) AS n FROM aktive_sitzungen')[0]['n'] == 0
+
+
+def test_json_version_startet_kein_beendetes_projekt(app_json):
+    projekt_id = journal_projekt_anlegen(app_json)
+    client = app_json.app.test_client()
+    anmelden(client)
+    client.post(f'/projekt/{projekt_id}/beenden')
+    assert app_json.projekte_journal.projekt(projekt_id)['status'] == 'beendet'
+
+    antwort = client.post(f'/projekt/{projekt_id}/aktivität/starten',
+                          data={'mitarbeiter': 'Max', 'teilbereich': 'aufmass'}).get_json()
+    assert antwort == {'status': 'error', 'message': 'Projekt ist bereits beendet'}
+    assert app_json.projekte_journal.projekt(projekt_id)['status'] == 'beendet'
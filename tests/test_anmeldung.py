@@ -0,0 +1,81 @@
+import json
+import anmeldung
+from anmeldung import BenutzerVerzeichnis, datei_benutzer, db_benutzer, passwort_hash
+from conftest import GAST_EMAIL
+
+
+class _Quelle:
+    """Zählt die Lookups, die am Cache vorbeigehen"""
+
+    def __init__(self, benutzer):
+        self.benutzer = benutzer
+        self.aufrufe = []
+
+    def __call__(self, email):
+        self.aufrufe.append(email)
+        daten = self.benutzer.get(email)
+        return dict(daten, email=email) if daten else None
+
+
+def test_treffer_und_fehlschlaege_werden_gemerkt(monkeypatch):
+    uhr = [100.0]
+    monkeypatch.setattr(anmeldung.time, 'monotonic', lambda: uhr[0])
+    quelle = _Quelle({'max@rausch.de': {'password_hash': passwort_hash('geheim')}})
+    verzeichnis = BenutzerVerzeichnis(quelle, ttl=30, negativ_ttl=5)
+
+    assert verzeichnis.anmelden(' Max@Rausch.de ', 'geheim')['email'] == 'max@rausch.de'
+    assert verzeichnis.anmelden('max@rausch.de', 'falsch') is None
+    assert verzeichnis.holen('unbekannt@rausch.de') is None
+    assert verzeichnis.holen('unbekannt@rausch.de') is None
+    assert quelle.aufrufe == ['max@rausch.de', 'unbekannt@rausch.de']
+
+    # Unbekannte E-Mails laufen früher ab als Treffer
+    uhr[0] += 10
+    verzeichnis.holen('max@rausch.de')
+    verzeichnis.holen('unbekannt@rausch.de')
+    assert quelle.aufrufe[2:] == ['unbekannt@rausch.de']
+    uhr[0] += 30
+    verzeichnis.holen('max@rausch.de')
+    assert quelle.aufrufe[3:] == ['max@rausch.de']
+
+
+def test_kopien_lru_und_vergessen():
+    quelle = _Quelle({f'{n}@rausch.de': {'name': n} for n in 'abc'})
+    verzeichnis = BenutzerVerzeichnis(quelle, max_eintraege=2)
+
+    verzeichnis.holen('a@rausch.de')['name'] = 'verändert'
+    assert verzeichnis.holen('a@rausch.de')['name'] == 'a'
+
+    verzeichnis.holen('b@rausch.de')
+    verzeichnis.holen('a@rausch.de')
+    verzeichnis.holen('c@rausch.de')     # verdrängt b, nicht das zuletzt benutzte a
+    assert list(verzeichnis._cache) == ['a@rausch.de', 'c@rausch.de']
+
+    verzeichnis.vergessen('A@rausch.de')
+    verzeichnis.holen('a@rausch.de')
+    assert quelle.aufrufe.count('a@rausch.de') == 2
+
+
+def test_datei_wird_nach_aenderung_neu_gelesen(tmp_path):
+    pfad = tmp_path / 'benutzer.json'
+    verzeichnis = datei_benutzer(str(pfad))
+    assert verzeichnis.holen('max@rausch.de') is None
+
+    pfad.write_text(json.dumps({'Max@Rausch.de': {'password_hash': passwort_hash('geheim'), 'name': 'Max'}}))
+    verzeichnis.vergessen('max@rausch.de')
+    assert verzeichnis.anmelden('max@rausch.de', 'geheim')['name'] == 'Max'
+
+
+def test_login_ueber_die_datenbank(app_db, db):
+    db('INSERT INTO benutzer (email, password_hash, name, team_code_verwendet) VALUES (%s, %s, %s, %s)',
+       (GAST_EMAIL, passwort_hash('geheim123'), 'Gast', None))
+    client = app_db.test_client()
+
+    def login(passwort):
+        return client.post('/login', data={'email': GAST_EMAIL, 'password': passwort}).get_json()['status']
+
+    assert login('falsch') == 'error'
+    assert login('geheim123') == 'success'
+    assert GAST_EMAIL in db_benutzer._cache
+    with client.session_transaction() as session:
+        assert session['benutzer_email'] == GAST_EMAIL and session['team_mitglied'][0] is False
@@ -0,0 +1,72 @@
+import time
+import berechtigung
+from anmeldung import db_benutzer, passwort_hash
+from conftest import GAST_EMAIL, anmelden, projekt_anlegen
+
+
+def test_ersteller_cache_ist_begrenzt(app_db, db, monkeypatch):
+    monkeypatch.setattr(berechtigung, 'CACHE_MAX', 3)
+    ids = [projekt_anlegen(db, name=f'P{i}', ersteller=GAST_EMAIL) for i in range(5)]
+
+    client = app_db.test_client()
+    anmelden(client, GAST_EMAIL, team=False)
+    for projekt_id in ids:
+        assert client.get(f'/projekt/{projekt_id}/live/poll?seit=0').status_code == 200
+
+    assert list(berechtigung._ersteller) == ids[-3:]
+
+
+def test_registrierung_verwirft_alte_berechtigung(app_db, db):
+    email = 'neu@rausch.de'
+    berechtigung._cache[email] = (False, float('inf'))
+
+    antwort = app_db.test_client().post('/registrieren', data={
+        'email': email, 'password': 'geheim123', 'team_code': berechtigung.TEAM_CODE})
+
+    assert antwort.get_json()['status'] == 'success'
+    assert berechtigung._cache[email][0] is True
+
+
+def test_passwort_reset_verwirft_berechtigung(app_db, db):
+    db('INSERT INTO benutzer (email, password_hash, name, team_code_verwendet) VALUES (%s, %s, %s, %s)',
+       (GAST_EMAIL, passwort_hash('altes-passwort'), 'Gast', None))
+    db("INSERT INTO password_resets (email, token) VALUES (%s, 'token-1')", (GAST_EMAIL,))
+    berechtigung._cache[GAST_EMAIL] = (True, float('inf'))
+
+    antwort = app_db.test_client().post('/passwort-reset-confirm',
+                                        data={'token': 'token-1', 'password': 'neues-passwort'})
+
+    assert antwort.get_json()['status'] == 'success'
+    assert GAST_EMAIL not in berechtigung._cache
+
+
+def test_vergessen_gilt_fuer_alle_sessions_des_benutzers(app_db, db):
+    db('INSERT INTO benutzer (email, password_hash, name, team_code_verwendet) VALUES (%s, %s, %s, %s)',
+       (GAST_EMAIL, passwort_hash('geheim123'), 'Gast', berechtigung.TEAM_CODE))
+    fremdes = projekt_anlegen(db)
+    handy, laptop = app_db.test_client(), app_db.test_client()
+    for client in (handy, laptop):
+        client.post('/login', data={'email': GAST_EMAIL, 'password': 'geheim123'})
+        assert client.get(f'/projekt/{fremdes}/live/poll?seit=0').status_code == 200
+
+    # Team-Code entzogen - vergessen wird im Request eines anderen Benutzers aufgerufen
+    db('UPDATE benutzer SET team_code_verwendet = NULL')
+    with app_db.test_request_context():
+        db_benutzer.vergessen(GAST_EMAIL)
+        berechtigung.berechtigung_vergessen(GAST_EMAIL)
+
+    for client in (handy, laptop):
+        assert client.get(f'/projekt/{fremdes}/live/poll?seit=0').status_code == 403
+
+
+def test_session_wert_laeuft_ab(app_db, db):
+    fremdes = projekt_anlegen(db)
+    client = app_db.test_client()
+    anmelden(client, GAST_EMAIL, team=True)
+    assert client.get(f'/projekt/{fremdes}/live/poll?seit=0').status_code == 200
+
+    # Älter als CACHE_TTL: wieder die Datenbank (dort gibt es den Benutzer nicht)
+    berechtigung._cache.clear()
+    with client.session_transaction() as session:
+        session['team_mitglied'] = [True, time.time() - berechtigung.CACHE_TTL - 1]
+    assert client.get(f'/projekt/{fremdes}/live/poll?seit=0').status_code == 403
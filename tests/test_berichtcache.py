@@ -0,0 +1,56 @@
+import time
+import pytest
+import app_db
+from live import listener_starten, listener_verbunden
+from conftest import projekt_anlegen
+
+VORSCHAU = {'von_datum': '2025-03-01', 'bis_datum': '2025-03-31'}
+
+
+@pytest.fixture
+def listener(db):
+    """Ohne verbundenen Listener cacht berichtcache.py nichts"""
+    listener_starten()
+    ende = time.monotonic() + 10
+    while not listener_verbunden():
+        assert time.monotonic() < ende, 'Live-Listener nicht verbunden'
+        time.sleep(0.05)
+
+
+def _sitzung(db, projekt_id, minuten):
+    db('''INSERT INTO sitzungen_tage (tag, projekt_id, mitarbeiter, teilbereich, minuten, anzahl)
+          VALUES ('2025-03-03', %s, 'Max', 'aufmass', %s, 1)''', (projekt_id, minuten))
+
+
+def test_vorschau_aus_dem_cache_mit_gleichem_etag(client, db, listener, monkeypatch):
+    _sitzung(db, projekt_anlegen(db), 45)
+
+    erste = client.post('/export/vorschau', data=VORSCHAU)
+    daten = erste.get_json()
+    assert daten['status'] == 'success', daten
+    assert daten['gesamt_minuten'] == 45 and daten['projekte'][0]['gesamt_minuten'] == 45
+
+    # Zweiter Aufruf darf die Datenbank nicht mehr anfassen
+    monkeypatch.setattr(app_db, 'lade_projekt_summen', lambda *a, **k: pytest.fail('kein Cache-Treffer'))
+    zweite = client.post('/export/vorschau', data=VORSCHAU)
+
+    assert zweite.get_json() == daten
+    assert zweite.headers['ETag'] == erste.headers['ETag']
+
+
+def test_projekt_bericht_304_und_invalidierung(client, db, listener):
+    projekt_id = projekt_anlegen(db)
+    url = f'/projekt/{projekt_id}/bericht'
+
+    erste = client.get(url)
+    assert erste.status_code == 200
+    etag = erste.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    # Ein Stopp auf dem Projekt verwirft den Bericht
+    client.post(f'/projekt/{projekt_id}/aktivität/starten', data={'mitarbeiter': 'Max', 'teilbereich': 'aufmass'})
+    db("UPDATE aktive_sitzungen SET start_zeit = now() - interval '30 minutes'")
+    client.post(f'/projekt/{projekt_id}/aktivität/beenden', data={'mitarbeiter': 'Max'})
+
+    neu = client.get(url, headers={'If-None-Match': etag})
+    assert neu.status_code == 200 and neu.headers['ETag'] != etag
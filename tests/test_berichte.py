@@ -0,0 +1,47 @@
+from datetime import date
+from database import db_verbindung
+from berichte import lade_projekt_summen, lade_bericht_summe, rollup_neu_aufbauen
+from conftest import projekt_anlegen
+
+
+def _sitzung(sql, projekt_id, mitarbeiter, teilbereich, start, minuten):
+    sql('''INSERT INTO sitzungen (projekt_id, mitarbeiter, teilbereich, start_zeit, end_zeit, dauer_minuten)
+           VALUES (%s, %s, %s, %s::timestamptz, %s::timestamptz + make_interval(mins => %s), %s)''',
+        (projekt_id, mitarbeiter, teilbereich, start, start, minuten, minuten))
+
+
+def test_summen_aus_dem_rollup_sind_ganze_zahlen(db):
+    projekt_id = projekt_anlegen(db)
+    _sitzung(db, projekt_id, 'Max', 'aufmass', '2025-03-03T08:00:00Z', 45)
+    _sitzung(db, projekt_id, 'Max', 'Aufmaß', '2025-03-04T08:00:00Z', 15)
+    _sitzung(db, projekt_id, 'Eva', 'zeichnung', '2025-03-04T09:00:00Z', 30)
+
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        rollup_neu_aufbauen(cursor)
+        projekte = lade_projekt_summen(cursor, sitzungen_von=date(2025, 3, 1), sitzungen_bis=date(2025, 3, 31))
+        summe = lade_bericht_summe(cursor, sitzungen_von=date(2025, 3, 1), sitzungen_bis=date(2025, 3, 31))
+
+    [projekt] = projekte
+    assert projekt['gesamt_minuten'] == 90 and type(projekt['gesamt_minuten']) is int
+    assert projekt['mitarbeiter_stats']['Max'] == {'besprechung': 0, 'zeichnung': 0, 'aufmass': 60, 'gesamt': 60}
+    assert type(projekt['mitarbeiter_stats']['Eva']['zeichnung']) is int
+
+    assert summe['gesamt_minuten'] == 90 and type(summe['gesamt_minuten']) is int
+    assert summe['teilbereiche'] == {'besprechung': 0, 'zeichnung': 30, 'aufmass': 60}
+    assert all(type(m) is int for m in summe['teilbereiche'].values())
+
+
+def test_zeitraum_nach_lokalem_tag(db):
+    projekt_id = projekt_anlegen(db)
+    # 23:30 UTC am 31.3. ist in Berlin schon der 1.4.
+    _sitzung(db, projekt_id, 'Max', 'aufmass', '2025-03-31T23:30:00Z', 20)
+
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        rollup_neu_aufbauen(cursor)
+        maerz = lade_projekt_summen(cursor, sitzungen_von=date(2025, 3, 1), sitzungen_bis=date(2025, 3, 31))
+        april = lade_projekt_summen(cursor, sitzungen_von=date(2025, 4, 1), sitzungen_bis=date(2025, 4, 30))
+
+    assert maerz == []
+    assert april[0]['gesamt_minuten'] == 20
@@ -0,0 +1,93 @@
+import base64
+import json
+import pytest
+from database import db_verbindung
+from dashboard import cursor_kodieren, cursor_lesen, lade_dashboard_seite, seite_aus_liste
+from conftest import GAST_EMAIL, TEAM_EMAIL, anmelden
+
+
+GLEICH = '2025-03-03T08:00:00+00:00'
+
+
+def _projekte_anlegen(db):
+    """Viele Projekte mit identischem Sortierschlüssel bis auf die id"""
+    daten = ([('gestoppt', GLEICH, None)] * 4 + [('laufend', GLEICH, None)] * 3
+             + [('beendet', '2025-01-01T00:00:00+00:00', GLEICH)] * 3 + [('archiv', None, None)] * 2
+             + [('pausiert', '2025-02-01T00:00:00+00:00', None)])
+    for nr, (status, erstellt_am, beendet_am) in enumerate(daten):
+        db('INSERT INTO projekte (name, kunde, ersteller, status, erstellt_am, beendet_am) '
+           'VALUES (%s, %s, %s, %s, %s, %s)',
+           (f'P{nr}', 'Kunde', GAST_EMAIL if nr % 2 else TEAM_EMAIL, status, erstellt_am, beendet_am))
+
+
+def _sql_seiten(limit, ersteller=None):
+    ids, nach = [], None
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        while True:
+            seite = lade_dashboard_seite(cursor, ersteller, nach=nach, limit=limit)
+            ids += [p['id'] for p in seite['projekte']]
+            if not seite['weiter']:
+                return ids
+            nach = cursor_lesen(seite['weiter'])
+
+
+def _listen_seiten(projekte, limit):
+    ids, nach = [], None
+    while True:
+        seite = seite_aus_liste(projekte, nach=nach, limit=limit)
+        ids += [p['id'] for p in seite['projekte']]
+        if not seite['weiter']:
+            return ids
+        nach = cursor_lesen(seite['weiter'])
+
+
+def _als_json_projekte(db):
+    """Dieselben Projekte, wie die JSON-Version sie speichert (ISO-Strings)"""
+    return [{'id': row['id'], 'status': row['status'], 'ersteller': row['ersteller'],
+             'erstellt_am': row['erstellt_am'] and row['erstellt_am'].isoformat(),
+             'beendet_am': row['beendet_am'] and row['beendet_am'].isoformat()}
+            for row in db('SELECT id, status, ersteller, erstellt_am, beendet_am FROM projekte')]
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 5, 100])
+def test_seiten_ohne_luecken_und_doppelte(db, limit):
+    _projekte_anlegen(db)
+    alle = _sql_seiten(100)
+
+    # Reihenfolge: Status-Rang, dann Zeit, bei Gleichstand die id
+    assert alle == [1, 2, 3, 4, 5, 6, 7, 13, 8, 9, 10, 11, 12]
+    assert _sql_seiten(limit) == alle
+    assert _listen_seiten(_als_json_projekte(db), limit) == alle
+
+
+def test_seiten_nur_eigene_projekte(db):
+    _projekte_anlegen(db)
+    eigene = [p for p in _als_json_projekte(db) if p['ersteller'] == GAST_EMAIL]
+    assert _sql_seiten(2, ersteller=GAST_EMAIL) == _listen_seiten(eigene, 2) == [2, 4, 6, 8, 10, 12]
+
+
+def test_cursor_hin_und_zurueck():
+    text = cursor_kodieren(4, GLEICH, 17)
+    rang, zeitpunkt, projekt_id = cursor_lesen(text)
+    assert (rang, zeitpunkt.isoformat(), projekt_id) == (4, GLEICH, 17)
+    assert cursor_lesen('') is None
+
+
+@pytest.mark.parametrize('text', [
+    'kaputt!',
+    base64.urlsafe_b64encode(b'[1, 2]').decode(),
+    base64.urlsafe_b64encode(json.dumps([1, 'kein datum', 3]).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps(['a', GLEICH, 3]).encode()).decode(),
+])
+def test_manipulierter_cursor(text):
+    with pytest.raises(ValueError):
+        cursor_lesen(text)
+
+
+def test_manipulierter_cursor_gibt_400(client, db, app_json):
+    assert client.get('/dashboard/projekte?nach=kaputt!').status_code == 400
+
+    json_client = app_json.app.test_client()
+    anmelden(json_client)
+    assert json_client.get('/dashboard/projekte?nach=kaputt!').status_code == 400
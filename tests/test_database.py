@@ -0,0 +1,57 @@
+import pytest
+import psycopg2
+from database import VerbindungsPool, PoolErschoepft, db_verbindung, get_pool
+
+
+def test_pool_gibt_verbindung_wieder_heraus(datenbank):
+    pool = VerbindungsPool(minimum=0, maximum=1, timeout=0.2)
+    try:
+        conn = pool.holen()
+        with pytest.raises(PoolErschoepft):
+            pool.holen()
+        pool.zurueckgeben(conn)
+
+        assert pool.holen() is conn
+        assert pool.metriken()['timeouts'] == 1
+    finally:
+        pool.zurueckgeben(conn)
+        pool.schliessen()
+
+
+def test_offene_transaktion_wird_beim_zurueckgeben_verworfen(datenbank):
+    pool = VerbindungsPool(minimum=0, maximum=1)
+    try:
+        conn = pool.holen()
+        conn.cursor().execute('SELECT 1')
+        pool.zurueckgeben(conn)
+        assert conn.status == psycopg2.extensions.STATUS_READY
+    finally:
+        pool.schliessen()
+
+
+def test_kaputte_verbindung_wird_ersetzt(datenbank):
+    pool = VerbindungsPool(minimum=0, maximum=1)
+    try:
+        conn = pool.holen()
+        conn.close()
+        pool.zurueckgeben(conn)
+
+        neu = pool.holen()
+        assert neu is not conn and not neu.closed
+        assert pool.metriken()['fehlerhaft'] == 1
+        pool.zurueckgeben(neu)
+    finally:
+        pool.schliessen()
+
+
+def test_db_verbindung_committet_oder_rollt_zurueck(db):
+    with db_verbindung() as conn:
+        conn.cursor().execute("INSERT INTO kunden (name) VALUES ('Bleibt')")
+
+    with pytest.raises(RuntimeError):
+        with db_verbindung() as conn:
+            conn.cursor().execute("INSERT INTO kunden (name) VALUES ('Weg')")
+            raise RuntimeError('Abbruch')
+
+    assert [row['name'] for row in db('SELECT name FROM kunden ORDER BY name')] == ['Bleibt']
+    assert get_pool().metriken()['ausgeliehen'] == 0
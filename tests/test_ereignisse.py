@@ -0,0 +1,78 @@
+from datetime import timedelta
+import zeit
+from aktivitaet import OFFLINE_MAX
+from conftest import projekt_anlegen
+
+
+def _iso(wert):
+    return wert.isoformat().replace('+00:00', 'Z')
+
+
+def _hochladen(client, *ereignisse):
+    return client.post('/aktivitäten/ereignisse', json={'ereignisse': list(ereignisse)}).get_json()
+
+
+def _start(projekt_id, schluessel, zeitpunkt, mitarbeiter='Max'):
+    return {'aktion': 'starten', 'projekt_id': projekt_id, 'mitarbeiter': mitarbeiter,
+            'teilbereich': 'aufmass', 'schluessel': schluessel, 'zeit': _iso(zeitpunkt)}
+
+
+def _start_zeiten(db):
+    return {row['mitarbeiter']: row['start_zeit']
+            for row in db('SELECT mitarbeiter, start_zeit FROM aktive_sitzungen')}
+
+
+def test_sammel_aktion_bucht_immer_jetzt(client, db):
+    projekt_id = projekt_anlegen(db)
+    vor_zwei_stunden = zeit.jetzt() - timedelta(hours=2)
+    antwort = client.post('/aktivitäten', json={'aktionen': [
+        dict(_start(projekt_id, '', vor_zwei_stunden), schluessel=None)
+    ]}).get_json()
+
+    assert antwort['ergebnisse'][0]['status'] == 'gestartet'
+    assert _start_zeiten(db)['Max'] > zeit.jetzt() - timedelta(minutes=1)
+
+
+def test_offline_zeit_wird_begrenzt(client, db):
+    projekt_id = projekt_anlegen(db)
+    jetzt = zeit.jetzt()
+    antwort = _hochladen(
+        client,
+        _start(projekt_id, 'a', jetzt - timedelta(hours=2), 'Max'),
+        _start(projekt_id, 'b', jetzt + timedelta(hours=3), 'Eva'),
+        _start(projekt_id, 'c', jetzt - OFFLINE_MAX - timedelta(minutes=5), 'Udo'),
+    )
+
+    assert [e['status'] for e in antwort['ergebnisse']] == ['gestartet', 'gestartet', 'zu alt']
+    starts = _start_zeiten(db)
+    assert abs(starts['Max'] - (jetzt - timedelta(hours=2))) < timedelta(seconds=1)
+    assert starts['Eva'] < jetzt + timedelta(minutes=1)
+    assert 'Udo' not in starts
+    assert db('SELECT COUNT(*) AS n FROM ereignis_quittungen')[0]['n'] == 2
+
+
+def test_wiederholter_upload_wird_nur_einmal_ausgefuehrt(client, db):
+    projekt_id = projekt_anlegen(db)
+    start = _start(projekt_id, 'schluessel-1', zeit.jetzt() - timedelta(minutes=30))
+    stopp = {'aktion': 'beenden', 'projekt_id': projekt_id, 'mitarbeiter': 'Max',
+             'schluessel': 'schluessel-2', 'zeit': _iso(zeit.jetzt())}
+
+    erster = _hochladen(client, start, stopp)['ergebnisse']
+    assert [e['status'] for e in erster] == ['gestartet', 'beendet']
+
+    # Antwort ging verloren, die Warteschlange schickt alles noch einmal (plus Dublette im Paket)
+    zweiter = _hochladen(client, start, stopp, stopp)['ergebnisse']
+    assert all(e['wiederholt'] for e in zweiter)
+    assert [e['status'] for e in zweiter] == ['gestartet', 'beendet', 'beendet']
+    assert zweiter[1]['sitzung'] == erster[1]['sitzung']
+
+    assert db('SELECT dauer_minuten FROM sitzungen')[0]['dauer_minuten'] == 30
+    assert db('SELECT COUNT(*) AS n FROM sitzungen')[0]['n'] == 1
+    assert db('SELECT COUNT(*) AS n FROM aktive_sitzungen')[0]['n'] == 0
+
+
+def test_ohne_schluessel_ungueltig(client, db):
+    projekt_id = projekt_anlegen(db)
+    antwort = _hochladen(client, _start(projekt_id, '', zeit.jetzt()))
+    assert antwort['ergebnisse'][0]['status'] == 'ungültig'
+    assert db('SELECT COUNT(*) AS n FROM aktive_sitzungen')[0]['n'] == 0
@@ -0,0 +1,72 @@
+import json
+import logging
+from journal import ProjektJournal
+
+
+def _projekt(projekt_id):
+    return {'id': projekt_id, 'name': f'P{projekt_id}', 'status': 'gestoppt',
+            'aktive_sitzungen': {}, 'teilbereiche': {}}
+
+
+def test_alter_snapshot_wird_gelesen_und_ins_neue_format_kompaktiert(tmp_path, caplog):
+    snapshot = tmp_path / 'projekte.json'
+    snapshot.write_text(json.dumps([_projekt(1)]), encoding='utf-8')
+    journal = ProjektJournal(str(snapshot), kompaktieren_nach=2)
+
+    assert journal.projekt(1)['name'] == 'P1'
+
+    with caplog.at_level(logging.INFO, logger='journal'):
+        with journal.schreiben() as sitzung:
+            sitzung.anhaengen({'art': 'projekt', 'projekt': _projekt(sitzung.naechste_id())})
+            sitzung.anhaengen({'art': 'start', 'projekt_id': 2, 'mitarbeiter': 'Max',
+                               'teilbereich': 'aufmass', 'start': '2025-03-03T08:00:00+00:00'})
+
+    assert [r.getMessage() for r in caplog.records] == ['Journal kompaktiert']
+    daten = json.loads(snapshot.read_text(encoding='utf-8'))
+    assert daten['seq'] == 2 and daten['generation'] == 1 and [p['id'] for p in daten['projekte']] == [1, 2]
+    assert json.loads((tmp_path / 'projekte.journal').read_bytes()) == {'art': 'kopf', 'generation': 1}
+
+
+def test_anderer_prozess_sieht_neue_eintraege(tmp_path):
+    snapshot = str(tmp_path / 'projekte.json')
+    schreiber, leser = ProjektJournal(snapshot), ProjektJournal(snapshot)
+    assert leser.alle() == []
+
+    with schreiber.schreiben() as sitzung:
+        sitzung.anhaengen({'art': 'projekt', 'projekt': _projekt(1)})
+    assert leser.projekt(1)['status'] == 'gestoppt'
+
+    schreiber.kompaktieren()
+    with schreiber.schreiben() as sitzung:
+        sitzung.anhaengen({'art': 'loeschen', 'projekt_ids': [1]})
+    assert leser.projekt(1) is None
+
+
+def test_leser_folgt_mehreren_kompaktierungen(tmp_path):
+    snapshot = str(tmp_path / 'projekte.json')
+    schreiber = ProjektJournal(snapshot, kompaktieren_nach=3)
+    leser = ProjektJournal(snapshot, kompaktieren_nach=3)
+
+    for runde in range(6):
+        # Mal vor, mal nach dem Kompaktieren lesen - das neue Journal wächst über den alten Offset
+        for _ in range(runde % 3 + 1):
+            with schreiber.schreiben() as sitzung:
+                sitzung.anhaengen({'art': 'projekt', 'projekt': _projekt(sitzung.naechste_id())})
+            assert [p['id'] for p in leser.alle()] == [p['id'] for p in schreiber.alle()]
+
+    assert len(leser.alle()) == 12
+    assert json.loads(open(snapshot, encoding='utf-8').read())['generation'] == 4
+
+
+def test_gleiche_generation_aber_kuerzeres_journal_laedt_neu(tmp_path):
+    snapshot = str(tmp_path / 'projekte.json')
+    schreiber, leser = ProjektJournal(snapshot), ProjektJournal(snapshot)
+    with schreiber.schreiben() as sitzung:
+        sitzung.anhaengen({'art': 'projekt', 'projekt': _projekt(1)})
+        sitzung.anhaengen({'art': 'projekt', 'projekt': _projekt(2)})
+    assert len(leser.alle()) == 2
+
+    # Jemand hat das Journal von Hand ersetzt (ohne Kopfzeile, Generation 0 wie vorher)
+    with open(schreiber.journal_datei, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'art': 'projekt', 'projekt': _projekt(3), 'seq': 1}) + '\n')
+    assert [p['id'] for p in leser.alle()] == [3]
@@ -0,0 +1,31 @@
+import threading
+import live
+from conftest import projekt_anlegen
+
+
+def test_live_plaetze_sind_begrenzt(client, db, monkeypatch):
+    monkeypatch.setattr(live, '_plaetze', threading.BoundedSemaphore(1))
+    projekt_id = projekt_anlegen(db)
+
+    stream = client.get(f'/projekt/{projekt_id}/live', buffered=False)
+    assert stream.status_code == 200
+    assert client.get(f'/projekt/{projekt_id}/live').status_code == 503
+
+    # Long-Poll ohne freien Platz wartet nicht, sondern schickt den Client in die Pause
+    poll = client.get(f'/projekt/{projekt_id}/live/poll?seit={live.jetzt_id()}').get_json()
+    assert poll['ereignisse'] == [] and poll['pause'] == live.POLL_PAUSE
+
+    stream.close()
+    assert live.platz_belegen()
+    live.platz_freigeben()
+
+
+def test_id_wird_beim_empfang_vergeben():
+    verteiler = live.EreignisVerteiler()
+    # Stopp wurde vor dem Laden der Seite gestempelt, aber erst danach committet
+    geschrieben = live.jetzt_id()
+    seite_seit = live.jetzt_id() + 1
+    verteiler.veroeffentlichen({'id': geschrieben, 'projekt_id': 7, 'typ': 'beendet', 'mitarbeiter': 'Max'})
+
+    [ereignis] = verteiler.warten(7, seite_seit, timeout=0)
+    assert ereignis['id'] > seite_seit
@@ -0,0 +1,19 @@
+from migrationen import MIGRATIONEN, migrieren, status
+
+
+def test_alle_migrationen_angewendet_und_wiederholbar(db):
+    assert migrieren() == []
+    assert all(angewendet for _, _, angewendet in status())
+    assert len(status()) == len(MIGRATIONEN)
+
+
+def test_bericht_indizes_sind_gueltig(db):
+    namen = [name for m in MIGRATIONEN for name, _ in m.get('indizes', [])]
+    zeilen = db('''
+        SELECT c.relname, i.indisvalid FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = ANY(%s)
+    ''', (namen,))
+    gueltig = {row['relname'] for row in zeilen if row['indisvalid']}
+    # idx_aktive_sitzungen_projekt_mitarbeiter ersetzt Migration 9 durch den UNIQUE-Constraint
+    assert gueltig == set(namen) - {'idx_aktive_sitzungen_projekt_mitarbeiter'}
@@ -0,0 +1,60 @@
+from database import db_verbindung
+from projekt_zaehler import ZAEHLER_SPALTEN, alle_abgleichen, zaehler_abgleichen
+from conftest import projekt_anlegen
+
+ZAEHLER_SQL = f"SELECT id, {', '.join(ZAEHLER_SPALTEN)} FROM projekte ORDER BY id"
+
+
+def _sitzung(client, db, projekt_id, mitarbeiter, teilbereich, minuten):
+    client.post(f'/projekt/{projekt_id}/aktivität/starten',
+                data={'mitarbeiter': mitarbeiter, 'teilbereich': teilbereich})
+    db('UPDATE aktive_sitzungen SET start_zeit = now() - make_interval(mins => %s) '
+       'WHERE projekt_id = %s AND mitarbeiter = %s', (minuten, projekt_id, mitarbeiter))
+    client.post(f'/projekt/{projekt_id}/aktivität/beenden', data={'mitarbeiter': mitarbeiter})
+
+
+def test_pruefen_und_abgleichen_reparieren_verrutschte_zaehler(client, db):
+    ids = [projekt_anlegen(db, name=f'P{nr}') for nr in range(4)]
+    _sitzung(client, db, ids[0], 'Max', 'aufmass', 30)
+    _sitzung(client, db, ids[0], 'Eva', 'zeichnung', 15)
+    _sitzung(client, db, ids[1], 'Max', 'besprechung', 45)
+    client.post(f'/projekt/{ids[1]}/aktivität/starten', data={'mitarbeiter': 'Udo', 'teilbereich': 'aufmass'})
+    _sitzung(client, db, ids[3], 'Eva', 'aufmass', 10)
+    soll = db(ZAEHLER_SQL)
+
+    # Verrutscht: Minuten, Teilbereich, Zeitraum und aktive Mitarbeiter (Projekt 3 bleibt leer und richtig)
+    db('UPDATE projekte SET gesamt_minuten = 999, minuten_zeichnung = 0 WHERE id = %s', (ids[0],))
+    db('UPDATE projekte SET aktive_mitarbeiter = 7, erste_sitzung = NULL WHERE id = %s', (ids[1],))
+    db('UPDATE projekte SET anzahl_sitzungen = 0 WHERE id = %s', (ids[3],))
+    kaputt = db(ZAEHLER_SQL)
+
+    with db_verbindung() as conn:
+        # Kleine Blöcke: auch über Blockgrenzen hinweg jedes Projekt genau einmal
+        assert alle_abgleichen(conn, nur_pruefen=True, block=3) == [ids[0], ids[1], ids[3]]
+    assert db(ZAEHLER_SQL) == kaputt
+
+    with db_verbindung() as conn:
+        assert alle_abgleichen(conn, block=3) == [ids[0], ids[1], ids[3]]
+    assert db(ZAEHLER_SQL) == soll
+    [projekt] = db('SELECT gesamt_minuten, minuten_zeichnung, aktive_mitarbeiter FROM projekte WHERE id = %s',
+                   (ids[0],))
+    assert dict(projekt) == {'gesamt_minuten': 45, 'minuten_zeichnung': 15, 'aktive_mitarbeiter': 0}
+    assert db('SELECT aktive_mitarbeiter FROM projekte WHERE id = %s', (ids[1],))[0]['aktive_mitarbeiter'] == 1
+
+    with db_verbindung() as conn:
+        assert alle_abgleichen(conn, nur_pruefen=True) == []
+
+
+def test_beenden_verwirft_aktive_sitzungen_im_zaehler(client, db):
+    projekt_id = projekt_anlegen(db)
+    for mitarbeiter in ('Max', 'Eva'):
+        client.post(f'/projekt/{projekt_id}/aktivität/starten',
+                    data={'mitarbeiter': mitarbeiter, 'teilbereich': 'aufmass'})
+    assert db('SELECT aktive_mitarbeiter FROM projekte')[0]['aktive_mitarbeiter'] == 2
+
+    assert client.post(f'/projekte/{projekt_id}/beenden').get_json()['status'] == 'success'
+
+    [projekt] = db('SELECT status, aktive_mitarbeiter FROM projekte')
+    assert dict(projekt) == {'status': 'beendet', 'aktive_mitarbeiter': 0}
+    with db_verbindung() as conn:
+        assert zaehler_abgleichen(conn.cursor(), [projekt_id], nur_pruefen=True) == []
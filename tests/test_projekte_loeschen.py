@@ -0,0 +1,58 @@
+from conftest import GAST_EMAIL, anmelden, journal_projekt_anlegen, projekt_anlegen
+
+
+def test_bulk_delete_mit_ungueltigen_ids(client, db):
+    eigenes = projekt_anlegen(db)
+    db("INSERT INTO aktive_sitzungen (projekt_id, mitarbeiter, teilbereich, start_zeit) "
+       "VALUES (%s, 'Max', 'aufmass', now())", (eigenes,))
+
+    antwort = client.post('/projekte/bulk-delete', json={'projekt_ids': [eigenes, 'abc', 999]})
+
+    assert antwort.status_code == 200
+    assert antwort.get_json() == {
+        'status': 'success',
+        'deleted_count': 1,
+        'ergebnisse': {str(eigenes): 'gelöscht', 'abc': 'ungültig', '999': 'nicht gefunden'},
+    }
+    assert db('SELECT COUNT(*) AS n FROM projekte')[0]['n'] == 0
+    assert db('SELECT COUNT(*) AS n FROM aktive_sitzungen')[0]['n'] == 0
+
+
+def test_projekte_loeschen_nur_eigene(app_db, db):
+    fremdes = projekt_anlegen(db)
+    eigenes = projekt_anlegen(db, ersteller=GAST_EMAIL)
+    client = app_db.test_client()
+    anmelden(client, GAST_EMAIL, team=False)
+
+    antwort = client.post('/projekte/löschen', json={'projekt_ids': [str(eigenes), fremdes, None]})
+
+    assert antwort.status_code == 200
+    assert antwort.get_json()['ergebnisse'] == {
+        str(eigenes): 'gelöscht', str(fremdes): 'keine Berechtigung', 'None': 'ungültig'}
+    assert [row['id'] for row in db('SELECT id FROM projekte')] == [fremdes]
+
+
+def test_projekte_loeschen_ohne_liste(client, db):
+    assert client.post('/projekte/löschen', json={'projekt_ids': 'abc'}).status_code == 400
+    assert client.post('/projekte/löschen', data='kein json').status_code == 400
+
+
+def test_json_version_loescht_nur_eigene(app_json):
+    fremdes = journal_projekt_anlegen(app_json)
+    eigenes = journal_projekt_anlegen(app_json, ersteller=GAST_EMAIL)
+    client = app_json.app.test_client()
+    anmelden(client, GAST_EMAIL, team=False)
+
+    antwort = client.post('/projekte/löschen', json={'projekt_ids': [str(eigenes), fremdes, 'abc', 999]})
+
+    assert antwort.status_code == 200
+    assert antwort.get_json()['ergebnisse'] == {
+        str(eigenes): 'gelöscht', str(fremdes): 'keine Berechtigung', 'abc': 'ungültig', '999': 'nicht gefunden'}
+    assert [p['id'] for p in app_json.projekte_journal.alle()] == [fremdes]
+
+
+def test_json_version_ungueltige_anfrage(app_json):
+    client = app_json.app.test_client()
+    anmelden(client)
+    assert client.post('/projekte/löschen', data='kein json').status_code == 400
+    assert client.post('/projekte/löschen', json={'projekt_ids': 7}).status_code == 400
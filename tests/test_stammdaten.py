@@ -0,0 +1,43 @@
+from database import db_verbindung
+from stammdaten import StammdatenCache, db_mitarbeiter, stammdaten_geaendert, stammdaten_invalidieren
+
+
+def test_leser_vor_dem_commit_haelt_alten_stand_nicht_fest(db):
+    assert db_mitarbeiter() == []
+
+    with db_verbindung() as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO mitarbeiter (name) VALUES ('Max')")
+        stammdaten_geaendert(cursor, 'mitarbeiter')
+        stammdaten_invalidieren('mitarbeiter')   # zu früh - darf nichts kaputt machen
+        assert db_mitarbeiter() == []            # paralleler Leser sieht noch den alten Stand
+    stammdaten_invalidieren('mitarbeiter')
+
+    assert db_mitarbeiter() == ['Max']
+
+
+def test_route_zeigt_neuen_mitarbeiter_sofort(client):
+    assert client.post('/mitarbeiter/hinzufügen', data={'name': 'Eva'}).get_json()['status'] == 'success'
+    assert db_mitarbeiter() == ['Eva']
+
+    client.post('/mitarbeiter/löschen', data={'name': 'Eva'})
+    assert db_mitarbeiter() == []
+
+
+def test_laden_ohne_lock_und_invalidierung_waehrend_des_ladens():
+    stand = {'daten': ['alt'], 'version': 1}
+    gesperrt = []
+
+    def laden():
+        gesperrt.append(cache._lock.locked())
+        daten = stand['daten']
+        if daten == ['alt']:
+            # Schreiber committet und invalidiert, während dieser Leser noch lädt
+            stand.update(daten=['neu'], version=2)
+            cache.invalidieren()
+        return daten
+
+    cache = StammdatenCache(laden, lambda: stand['version'], pruefen_nach=60)
+    assert cache.get() == ['alt']
+    assert cache.get() == ['neu']
+    assert gesperrt == [False, False]
@@ -0,0 +1,21 @@
+from datetime import date, datetime
+import zeit
+
+
+def test_iso_utc_einheitlich():
+    assert zeit.iso_utc('2025-03-03T09:00:00+01:00') == '2025-03-03T08:00:00Z'
+    assert zeit.iso_utc(datetime(2025, 3, 3, 8, 0)) == '2025-03-03T08:00:00Z'   # alte Daten ohne Zone
+    assert zeit.iso_utc(None) is None
+
+
+def test_kalendertag_und_tagesgrenzen_in_lokaler_zeit():
+    assert zeit.kalendertag('2025-03-31') == date(2025, 3, 31)
+    assert zeit.kalendertag(zeit.als_utc('2025-03-31T23:30:00Z')) == date(2025, 4, 1)
+    # Sommerzeit-Umstellung: der 30.3.2025 hat in Berlin nur 23 Stunden
+    assert zeit.tag_beginn('2025-03-30') == zeit.als_utc('2025-03-29T23:00:00Z')
+    assert zeit.tag_ende('2025-03-30') == zeit.als_utc('2025-03-30T22:00:00Z')
+
+
+def test_minuten_zwischen_nie_negativ():
+    assert zeit.minuten_zwischen('2025-03-03T08:00:00Z', '2025-03-03T09:29:59Z') == 89
+    assert zeit.minuten_zwischen('2025-03-03T08:00:00Z', '2025-03-03T07:00:00Z') == 0
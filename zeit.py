@@ -0,0 +1,133 @@
+"""
+Zeitmodell für beide Versionen (app.py und app_db.py)
+
+Gespeichert wird immer ein Zeitpunkt mit Zeitzone: in PostgreSQL als
+timestamptz (Verbindungen laufen mit timezone=UTC), im JSON als ISO-String
+mit +00:00. Angezeigt und nach Tagen gruppiert wird in ZEITZONE - ein
+einziges, beim Import geladenes ZoneInfo-Objekt, kein os.environ['TZ'].
+
+Die Loader bereiten Anzeige-Felder vor (projekt_anzeige_vorbereiten), damit
+Templates pro Zeile nichts mehr parsen oder umrechnen müssen.
+"""
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+ZEITZONE_NAME = os.environ.get('APP_ZEITZONE', 'Europe/Berlin')
+ZEITZONE = ZoneInfo(ZEITZONE_NAME)
+UTC = timezone.utc
+
+
+def jetzt():
+    """Aktueller Zeitpunkt in UTC (mit tzinfo)"""
+    return datetime.now(UTC)
+
+
+def als_utc(wert):
+    """
+    datetime oder ISO-String -> datetime in UTC. Werte ohne Zeitzone
+    (alte Daten) gelten als UTC. None/'' bleiben None.
+    """
+    if not wert:
+        return None
+    if isinstance(wert, str):
+        wert = datetime.fromisoformat(wert.replace('Z', '+00:00'))
+    if wert.tzinfo is None:
+        return wert.replace(tzinfo=UTC)
+    return wert.astimezone(UTC)
+
+
+def lokal(wert):
+    wert = als_utc(wert)
+    return wert.astimezone(ZEITZONE) if wert else None
+
+
+def lokaler_tag(wert):
+    """Kalendertag in ZEITZONE (date bleibt date)"""
+    if isinstance(wert, date) and not isinstance(wert, datetime):
+        return wert
+    wert = lokal(wert)
+    return wert.date() if wert else None
+
+
+def kalendertag(wert):
+    """
+    Tag aus einer Eingabe: Formular-Datum (str oder naives datetime) bleibt
+    der eingegebene Tag, ein Zeitpunkt mit Zeitzone wird zum lokalen Tag.
+    """
+    if isinstance(wert, str):
+        return date.fromisoformat(wert[:10])
+    if isinstance(wert, datetime):
+        return lokaler_tag(wert) if wert.tzinfo else wert.date()
+    return wert
+
+
+def tag_beginn(tag):
+    """Mitternacht des lokalen Kalendertags als UTC-Zeitpunkt"""
+    return datetime.combine(kalendertag(tag), time(), ZEITZONE).astimezone(UTC)
+
+
+def tag_ende(tag):
+    """Beginn des folgenden lokalen Tags (exklusive Obergrenze)"""
+    return tag_beginn(kalendertag(tag) + timedelta(days=1))
+
+
+# Gleiches Format wie iso_utc(), in SQL ausgerechnet
+ISO_UTC_SQL = "to_char({spalte} AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS\"Z\"')"
+
+
+def iso_utc(wert):
+    """Einheitlicher ISO-String für JavaScript und Sortierung: 2025-01-31T08:15:00Z"""
+    wert = als_utc(wert)
+    return wert.strftime('%Y-%m-%dT%H:%M:%SZ') if wert else None
+
+
+def uhrzeit(wert):
+    wert = lokal(wert)
+    return wert.strftime('%H:%M') if wert else ''
+
+
+def datum_kurz(wert):
+    wert = lokal(wert)
+    return wert.strftime('%d.%m.') if wert else ''
+
+
+def datum(wert):
+    wert = lokal(wert)
+    return wert.strftime('%d.%m.%Y') if wert else ''
+
+
+def minuten_zwischen(start, ende=None):
+    """Volle Minuten von start bis ende (Standard: jetzt), nie negativ"""
+    ende = als_utc(ende) if ende else jetzt()
+    return max(0, int((ende - als_utc(start)).total_seconds() // 60))
+
+
+def dauer_seit(start):
+    minuten = minuten_zwischen(start)
+    return f"{minuten // 60}h {minuten % 60}m"
+
+
+def projekt_anzeige_vorbereiten(projekt):
+    """
+    Ergänzt ein geladenes Projekt (beide Versionen) um fertige Anzeige-Felder:
+    erstellt_uhrzeit/erstellt_datum, bei Sitzungen start_uhrzeit/end_uhrzeit,
+    bei aktiven Sitzungen die laufende Dauer. start/end werden zu iso_utc().
+    """
+    projekt['erstellt_uhrzeit'] = uhrzeit(projekt.get('erstellt_am'))
+    projekt['erstellt_datum'] = datum_kurz(projekt.get('erstellt_am'))
+
+    for sitzung in projekt.get('aktive_sitzungen', {}).values():
+        start = als_utc(sitzung['start'])
+        sitzung['start'] = iso_utc(start)
+        sitzung['start_uhrzeit'] = uhrzeit(start)
+        sitzung['dauer'] = dauer_seit(start)
+
+    for teilbereich in projekt.get('teilbereiche', {}).values():
+        for sitzung in teilbereich.get('sitzungen', []):
+            start, ende = als_utc(sitzung.get('start')), als_utc(sitzung.get('end'))
+            sitzung['start'] = iso_utc(start)
+            sitzung['end'] = iso_utc(ende)
+            sitzung['start_uhrzeit'] = uhrzeit(start)
+            sitzung['end_uhrzeit'] = uhrzeit(ende)
+    return projekt